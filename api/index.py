@@ -0,0 +1,537 @@
+"""
+Simulator API - HTTP service for the web front end and training sessions.
+Exposes fleet simulation, single and batch diagnosis, manual search and
+LLM analysis. Engines and clients are created once per process and shared
+by every request; blocking work runs in worker pools off the event loop.
+Run locally with: uvicorn api.index:app --reload
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar, copy_context
+from pathlib import Path
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from diagnostics.engine import DiagnosticsEngine
+from diagnostics.escalation import EscalationPolicy
+from simulator.fleet import FAULT_EFFECTS, FleetSimulator
+from simulator.rack_simulator import NORMAL_RANGES
+from simulator.telemetry_stream import DEFAULT_TICK_HZ, TelemetryStream, parse_racks
+from telemetry.history import DEFAULT_MAX_POINTS, RollupStore
+from utils import tracing
+
+
+# Threads for blocking I/O and short CPU work (search, fleet steps)
+THREAD_POOL_WORKERS = int(os.getenv("API_THREAD_WORKERS", "16"))
+
+# Processes for large batch diagnoses
+PROCESS_POOL_WORKERS = int(os.getenv("API_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Batches at least this large are split across the process pool (pickling
+# results costs about as much as diagnosing them, so smaller batches stay in-process)
+PROCESS_POOL_MIN_BATCH = 50000
+
+# Simulated fleets kept in memory; the least recently used is dropped beyond this
+MAX_FLEETS = 256
+
+# Largest fleet a session may create
+MAX_FLEET_RACKS = 20000
+
+# Largest fleet that may record history (about 2.4 MB of rollups per rack)
+MAX_HISTORY_RACKS = 500
+
+# Most points a history query may ask for per series
+MAX_HISTORY_POINTS = 5000
+
+# Web form fields and the sensor names DiagnosticsEngine uses
+FORM_FIELDS = {
+    "suction_pressure": "suction_pressure_psig",
+    "head_pressure": "discharge_pressure_psig",
+    "compressor_temp": "discharge_temp_f",
+    "superheat": "superheat_f",
+    "subcooling": "subcooling_f",
+    "ambient_temp": "ambient_temp_f",
+}
+
+# Alarm implied by each web form diagnostic type
+FORM_ALARMS = {
+    "low_suction": "low_suction_pressure",
+    "high_head": "high_discharge_pressure",
+    "high_superheat": "high_superheat",
+    "low_subcooling": "low_subcooling",
+}
+
+# Shared instances, created on first use
+_instances: Dict[str, Any] = {}
+_instances_lock = threading.RLock()
+
+# Simulated fleets by id, least recently used first
+_fleets: "OrderedDict[str, FleetSimulator]" = OrderedDict()
+_fleet_locks: Dict[str, threading.Lock] = {}
+_streams: Dict[str, TelemetryStream] = {}
+_fleets_lock = threading.Lock()
+
+# Worker pools, created at startup
+_pools: Dict[str, Any] = {}
+
+# Stage timings for the current request
+_timings: ContextVar[Optional[List]] = ContextVar("timings", default=None)
+
+# Engine used inside process-pool workers
+_worker_engine: Optional[DiagnosticsEngine] = None
+
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    """Return the shared instance called name, creating it once."""
+    instance = _instances.get(name)
+    if instance is None:
+        with _instances_lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def get_engine() -> DiagnosticsEngine:
+    """Shared rule-based diagnostics engine."""
+    return _get_or_create("engine", DiagnosticsEngine)
+
+
+def get_escalation() -> EscalationPolicy:
+    """Shared LLM escalation policy, so the budget covers every session."""
+    provider = os.getenv("LLM_PROVIDER", "gemini")
+    return _get_or_create("escalation", lambda: EscalationPolicy(provider, normal_ranges=NORMAL_RANGES))
+
+
+def get_vector_search():
+    """Shared manual search (its embedding and result caches are shared too)."""
+    def create():
+        from embeddings.vector_search import VectorSearch
+        return VectorSearch()
+    return _get_or_create("vector_search", create)
+
+
+def get_llm():
+    """Shared LLM interface (one executor, rate limit and response cache)."""
+    def create():
+        from llm.interface import LLMInterface
+        return LLMInterface(provider=os.getenv("LLM_PROVIDER", "gemini"))
+    return _get_or_create("llm", create)
+
+
+def _as_dict(result: Any) -> Dict:
+    """Shallow dictionary of a result dataclass (dataclasses.asdict deep-copies, ~30x slower)."""
+    return dict(vars(result))
+
+
+def _init_worker():
+    """Create the diagnostics engine once per worker process."""
+    global _worker_engine
+    _worker_engine = DiagnosticsEngine()
+
+
+def _diagnose_chunk(states: List[Dict]) -> List[Dict]:
+    """Diagnose part of a batch inside a worker process."""
+    return [_as_dict(result) for result in _worker_engine.diagnose_many(states)]
+
+
+@contextmanager
+def timed(stage: str):
+    """Record how long a stage of the current request took (Server-Timing header)."""
+    started = time.perf_counter()
+    try:
+        with tracing.span(f"api.{stage}"):
+            yield
+    finally:
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((stage, (time.perf_counter() - started) * 1000))
+
+
+async def run_in_thread(function: Callable, *args) -> Any:
+    """Run blocking work in the shared thread pool (inside the caller's trace)."""
+    return await asyncio.get_running_loop().run_in_executor(_pools["threads"], copy_context().run, function, *args)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm shared instances and worker pools before serving requests."""
+    _pools["threads"] = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS, thread_name_prefix="api")
+    _pools["processes"] = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS, initializer=_init_worker)
+    get_engine()
+    get_escalation()
+    
+    # Import the search stack and provider SDK now rather than on the first request
+    try:
+        await run_in_thread(get_vector_search)
+        await run_in_thread(get_llm().ensure_provider)
+    except Exception as e:
+        print(f"Warm-up incomplete: {str(e)}")
+    yield
+    _pools["processes"].shutdown(cancel_futures=True)
+    _pools["threads"].shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="Refrigeration Rack Simulator API", lifespan=lifespan)
+
+
+class TimingMiddleware:
+    """
+    Adds Server-Timing (per stage) and X-Response-Time headers.
+    Plain ASGI rather than @app.middleware, which re-pipes every chunk of a
+    streamed body through an extra task and adds CPU per SSE client.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        timings: List = []
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                stages = [f"{stage};dur={ms:.2f}" for stage, ms in timings]
+                stages.append(f"total;dur={total_ms:.2f}")
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", ", ".join(stages).encode("latin-1")),
+                    (b"x-response-time", f"{total_ms:.2f}ms".encode("latin-1")),
+                ]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+
+
+app.add_middleware(TimingMiddleware)
+
+
+class FleetRequest(BaseModel):
+    """Create a simulated fleet."""
+    racks: int = Field(100, ge=1, le=MAX_FLEET_RACKS)
+    seed: Optional[int] = None
+    tick_hz: float = Field(DEFAULT_TICK_HZ, gt=0, le=50)  # Live stream simulation rate
+    fault_rate: float = Field(0.0, ge=0.0, le=1.0)  # Random faults per rack and tick while streaming
+    history: bool = False  # Keep min/max/mean rollups of every step for trend charts
+
+
+class StepRequest(BaseModel):
+    """Advance a fleet and optionally inject faults."""
+    steps: int = Field(1, ge=1, le=1000)
+    fault_rate: float = Field(0.0, ge=0.0, le=1.0)
+    faults: Dict[int, str] = Field(default_factory=dict)  # rack index -> fault type
+    include_states: bool = False
+    diagnose: bool = False
+
+
+class DiagnoseRequest(BaseModel):
+    """Diagnose one rack: sensor readings, or the web form's type and inputs."""
+    sensor_data: Optional[Dict[str, Any]] = None
+    type: Optional[str] = None
+    inputs: Dict[str, float] = Field(default_factory=dict)
+    include_manuals: bool = True
+    include_llm: bool = True
+
+
+class BatchDiagnoseRequest(BaseModel):
+    """Diagnose many racks."""
+    states: List[Dict[str, Any]]
+
+
+class SearchRequest(BaseModel):
+    """Search the manuals."""
+    query: str
+    component_type: Optional[str] = None
+    max_results: int = Field(5, ge=1, le=50)
+    mode: str = "vector"
+
+
+class AnalyzeRequest(BaseModel):
+    """Ask the LLM about one rack."""
+    sensor_data: Dict[str, Any]
+    manual_context: Optional[List[str]] = None
+    force: bool = False  # Ask even if the policy would not (still within the LLM budget)
+
+
+def form_to_sensor_data(diagnostic_type: Optional[str], inputs: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Convert the web form's fields into DiagnosticsEngine sensor readings.
+
+    Args:
+        diagnostic_type: Form diagnostic type (e.g. "low_suction")
+        inputs: Form values keyed by form field name
+
+    Returns:
+        Sensor data dictionary with an alarm for the selected type
+    """
+    sensor_data: Dict[str, Any] = {FORM_FIELDS.get(name, name): value for name, value in inputs.items()}
+    alarm = FORM_ALARMS.get(diagnostic_type or "")
+    sensor_data["alarms"] = [alarm] if alarm else []
+    return sensor_data
+
+
+def _get_fleet(fleet_id: str):
+    """Look up a fleet and its lock, marking it recently used."""
+    with _fleets_lock:
+        fleet = _fleets.get(fleet_id)
+        if fleet is None:
+            raise HTTPException(status_code=404, detail=f"Unknown fleet: {fleet_id}")
+        _fleets.move_to_end(fleet_id)
+        return fleet, _fleet_locks[fleet_id]
+
+
+async def _search_context(sensor_data: Dict, diagnosis: str) -> List:
+    """Manual sections for a diagnosis; empty if search is unavailable."""
+    symptoms = list(sensor_data.get("alarms") or [])
+    try:
+        with timed("search"):
+            return await run_in_thread(get_vector_search().get_diagnostic_context, diagnosis, symptoms)
+    except Exception as e:
+        print(f"Manual search unavailable: {str(e)}")
+        return []
+
+
+async def _analyze(sensor_data: Dict, result, manual_context: List, force: bool = False) -> Dict:
+    """Run the escalation policy and, if it agrees (or force is set and the budget allows), the LLM."""
+    llm = get_llm()
+    policy = get_escalation()
+    cached = llm.has_cached_response(sensor_data, manual_context)
+    decision = policy.decide(sensor_data, result, cached=cached)
+    if force:
+        decision = policy.force(decision, cached=cached)
+        if not decision.escalate:
+            raise HTTPException(status_code=429, detail=f"LLM budget exhausted: {decision.reason}")
+    policy.commit(decision)
+    analysis = {"escalation": _as_dict(decision), "llm_summary": None}
+    if not decision.escalate:
+        return analysis
+    
+    started = time.perf_counter()
+    try:
+        with timed("llm"):
+            response = await llm.aask_llm(sensor_data, manual_context)
+    except Exception as e:
+        analysis["llm_summary"] = f"LLM analysis unavailable: {str(e)}"
+        return analysis
+    if not cached:
+        policy.record_latency(time.perf_counter() - started)
+    analysis["llm_summary"] = response.text
+    analysis["llm_references"] = response.source_references
+    return analysis
+
+
+@app.get("/api/health")
+async def health():
+    """Liveness check, listing which shared instances are warm."""
+    return {"status": "ok", "warm": sorted(_instances), "fleets": len(_fleets)}
+
+
+@app.get("/api/metrics")
+async def metrics(format: str = "prometheus", traces: bool = False):
+    """
+    Stage latency histograms and counters (tracing must be on: RACK_TRACING=1).
+    format=prometheus gives the text exposition format, format=json plain data
+    (with recent span trees if traces=true).
+    """
+    if format == "json":
+        return tracing.metrics.to_dict(include_traces=traces)
+    if format != "prometheus":
+        raise HTTPException(status_code=422, detail="format must be prometheus or json")
+    return PlainTextResponse(tracing.export_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/api/fleet")
+async def create_fleet(request: FleetRequest):
+    """Create a simulated fleet and return its id."""
+    if request.history and request.racks > MAX_HISTORY_RACKS:
+        raise HTTPException(status_code=422, detail=f"History is limited to fleets of {MAX_HISTORY_RACKS} racks")
+    with timed("create"):
+        fleet = await run_in_thread(FleetSimulator, request.racks, request.seed)
+        if request.history:
+            fleet.history = RollupStore(len(fleet))
+    fleet_id = uuid.uuid4().hex
+    lock = threading.Lock()
+    with _fleets_lock:
+        _fleets[fleet_id] = fleet
+        _fleet_locks[fleet_id] = lock
+        _streams[fleet_id] = TelemetryStream(fleet, lock, request.tick_hz, request.fault_rate)
+        while len(_fleets) > MAX_FLEETS:
+            evicted, _ = _fleets.popitem(last=False)
+            _fleet_locks.pop(evicted, None)
+            _streams.pop(evicted).close()
+    return {"fleet_id": fleet_id, "racks": len(fleet), "summary": fleet.summary()}
+
+
+@app.post("/api/fleet/{fleet_id}/step")
+async def step_fleet(fleet_id: str, request: StepRequest):
+    """Inject faults, advance the fleet and optionally diagnose every rack."""
+    fleet, lock = _get_fleet(fleet_id)
+    for rack, fault_type in request.faults.items():
+        if fault_type not in FAULT_EFFECTS or not 0 <= rack < len(fleet):
+            raise HTTPException(status_code=422, detail=f"Invalid fault {fault_type!r} for rack {rack}")
+
+    def advance():
+        with lock:
+            for rack, fault_type in request.faults.items():
+                fleet.simulate_fault(rack, fault_type)
+            new_faults = fleet.step(request.steps, request.fault_rate)
+            states = fleet.get_states() if request.include_states or request.diagnose else None
+            return fleet.step_count, new_faults.tolist(), states, fleet.summary()
+
+    with timed("simulate"):
+        step_count, new_faults, states, summary = await run_in_thread(advance)
+
+    body: Dict[str, Any] = {"step": step_count, "new_faults": new_faults, "summary": summary}
+    if request.include_states:
+        body["states"] = states
+    if request.diagnose:
+        with timed("diagnose"):
+            results = await run_in_thread(get_engine().diagnose_many, states)
+        body["diagnoses"] = [_as_dict(result) for result in results]
+    return body
+
+
+@app.get("/api/fleet/{fleet_id}/stream")
+async def stream_fleet(fleet_id: str, racks: Optional[str] = None, hz: float = 2.0):
+    """
+    Live telemetry as Server-Sent Events. The first frame is a keyframe
+    with every watched reading; later frames hold only values that changed
+    at display precision. racks selects a subset ("0-9,12"), hz the frame rate.
+    """
+    fleet, _ = _get_fleet(fleet_id)
+    try:
+        selection = parse_racks(racks, len(fleet))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    subscription = _streams[fleet_id].subscribe(selection, hz)
+    return StreamingResponse(
+        subscription.frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/fleet/{fleet_id}/stream/stats")
+async def stream_stats(fleet_id: str):
+    """Encoding work and fan-out of a fleet's live stream."""
+    _get_fleet(fleet_id)
+    stream = _streams[fleet_id]
+    return {**stream.stats, "subscribers": stream.subscriber_count, "groups": stream.group_count}
+
+
+@app.get("/api/fleet/{fleet_id}/history")
+async def fleet_history(fleet_id: str,
+                        rack: Optional[int] = None,
+                        channels: Optional[str] = None,
+                        start: Optional[float] = None,
+                        end: Optional[float] = None,
+                        points: int = DEFAULT_MAX_POINTS):
+    """
+    Min/max/mean trends for a chart. The resolution (1 s, 1 min, 15 min or
+    1 h) is picked so the range fits in at most `points` points; start and
+    end are Unix times (default: the last hour). Without rack, the trends
+    cover the whole fleet. channels is a comma-separated list of sensor names.
+    """
+    fleet, _ = _get_fleet(fleet_id)
+    if fleet.history is None:
+        raise HTTPException(status_code=404, detail="This fleet does not record history (create it with history=true)")
+    if not 1 <= points <= MAX_HISTORY_POINTS:
+        raise HTTPException(status_code=422, detail=f"points must be between 1 and {MAX_HISTORY_POINTS}")
+
+    names = [name.strip() for name in channels.split(",") if name.strip()] if channels else None
+    try:
+        with timed("history"):
+            return await run_in_thread(fleet.history.query, rack, names, start, end, points)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/api/diagnose")
+async def diagnose(request: DiagnoseRequest):
+    """Diagnose one rack, with manual sections and an LLM summary when warranted."""
+    sensor_data = request.sensor_data or form_to_sensor_data(request.type, request.inputs)
+
+    with timed("diagnose"):
+        result = get_engine().diagnose(sensor_data)
+    body: Dict[str, Any] = _as_dict(result)
+    body["manual_reference"] = result.source_references[0] if result.source_references else None
+
+    manual_chunks = await _search_context(sensor_data, result.diagnosis) if request.include_manuals else []
+    body["manual_chunks"] = [_as_dict(chunk) for chunk in manual_chunks]
+
+    if request.include_llm:
+        body.update(await _analyze(sensor_data, result, manual_chunks))
+    return body
+
+
+@app.post("/api/diagnose/batch")
+async def diagnose_batch(request: BatchDiagnoseRequest):
+    """Diagnose many racks; very large batches are split across processes."""
+    states = request.states
+    with timed("diagnose"):
+        if len(states) >= PROCESS_POOL_MIN_BATCH and PROCESS_POOL_WORKERS > 1:
+            loop = asyncio.get_running_loop()
+            size = -(-len(states) // PROCESS_POOL_WORKERS)
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(_pools["processes"], _diagnose_chunk, states[start:start + size])
+                for start in range(0, len(states), size)
+            ))
+            results = [result for part in parts for result in part]
+        else:
+            results = [_as_dict(result) for result in await run_in_thread(get_engine().diagnose_many, states)]
+    return {"count": len(results), "results": results}
+
+
+@app.post("/api/search")
+async def search(request: SearchRequest):
+    """Search the manuals."""
+    try:
+        with timed("search"):
+            results = await run_in_thread(
+                lambda: get_vector_search().search_manuals(
+                    request.query,
+                    component_type=request.component_type,
+                    max_results=request.max_results,
+                    mode=request.mode
+                )
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"results": [_as_dict(result) for result in results]}
+
+
+@app.post("/api/analyze")
+async def analyze(request: AnalyzeRequest):
+    """LLM analysis of one rack, gated by the escalation policy (force still spends the LLM budget)."""
+    with timed("diagnose"):
+        result = get_engine().diagnose(request.sensor_data)
+    manual_context = request.manual_context
+    if manual_context is None:
+        manual_context = await _search_context(request.sensor_data, result.diagnosis)
+    body = {"diagnosis": _as_dict(result)}
+    body.update(await _analyze(request.sensor_data, result, manual_context, force=request.force))
+    return body
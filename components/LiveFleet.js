@@ -0,0 +1,134 @@
+import { useEffect, useRef, useState } from "react";
+
+/**
+ * Live fleet view fed by /api/fleet/{id}/stream (Server-Sent Events).
+ * Frames carry only changed readings as [rack, channel, value] triples,
+ * so the page keeps its own copy of the state and patches it.
+ */
+
+// Readings shown as table columns (channel names from the stream)
+const COLUMNS = [
+  { channel: "suction_pressure_psig", label: "Suction (psig)" },
+  { channel: "discharge_pressure_psig", label: "Discharge (psig)" },
+  { channel: "discharge_temp_f", label: "Disch. Temp (F)" },
+  { channel: "superheat_f", label: "Superheat (F)" },
+  { channel: "subcooling_f", label: "Subcooling (F)" },
+  { channel: "compressor_amps", label: "Amps" }
+];
+
+// Channel drawn as a trend line, and how many points to keep
+const TREND_CHANNEL = "suction_pressure_psig";
+const TREND_POINTS = 60;
+
+// Redraw at most this often, however fast frames arrive
+const RENDER_INTERVAL_MS = 250;
+
+function Sparkline({ points }) {
+  if (points.length < 2) return null;
+  const min = Math.min(...points);
+  const max = Math.max(...points);
+  const span = max - min || 1;
+  const path = points
+    .map((v, i) => `${(i / (TREND_POINTS - 1)) * 100},${20 - ((v - min) / span) * 20}`)
+    .join(" ");
+  return (
+    <svg width="100" height="20" viewBox="0 0 100 20">
+      <polyline points={path} fill="none" stroke="#2563eb" strokeWidth="1" />
+    </svg>
+  );
+}
+
+export default function LiveFleet() {
+  const [fleetId, setFleetId] = useState(null);
+  const [racks, setRacks] = useState("0-9");
+  const [hz, setHz] = useState(2);
+  const [, setRenderTick] = useState(0);
+
+  // Stream state lives in refs so frames don't each trigger a render
+  const channels = useRef([]);
+  const readings = useRef({});
+  const alarms = useRef({});
+  const trends = useRef({});
+
+  // Create a fleet to watch
+  const startFleet = async () => {
+    const res = await fetch("/api/fleet", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ racks: 200, fault_rate: 0.0005 })
+    });
+    setFleetId((await res.json()).fleet_id);
+  };
+
+  // Subscribe to the stream and patch local state with each frame
+  useEffect(() => {
+    if (!fleetId) return;
+    const source = new EventSource(`/api/fleet/${fleetId}/stream?racks=${encodeURIComponent(racks)}&hz=${hz}`);
+    source.onmessage = event => {
+      const frame = JSON.parse(event.data);
+      if (frame.key) {
+        channels.current = frame.channels;
+        readings.current = {};
+      }
+      for (const [rack, col, value] of frame.d) {
+        const channel = channels.current[col];
+        (readings.current[rack] = readings.current[rack] || {})[channel] = value;
+      }
+      Object.assign(alarms.current, frame.alarms || {});
+      for (const rack of Object.keys(readings.current)) {
+        const trend = (trends.current[rack] = trends.current[rack] || []);
+        trend.push(readings.current[rack][TREND_CHANNEL]);
+        if (trend.length > TREND_POINTS) trend.shift();
+      }
+    };
+    const timer = setInterval(() => setRenderTick(t => t + 1), RENDER_INTERVAL_MS);
+    return () => {
+      source.close();
+      clearInterval(timer);
+    };
+  }, [fleetId, racks, hz]);
+
+  return (
+    <section style={{ marginTop: "2rem" }}>
+      <h2>Live Fleet</h2>
+      {!fleetId ? (
+        <button onClick={startFleet}>Start Live Fleet</button>
+      ) : (
+        <div style={{ marginBottom: 12 }}>
+          <label>
+            Racks:{" "}
+            <input value={racks} onChange={e => setRacks(e.target.value)} style={{ width: 100 }} />
+          </label>
+          <label style={{ marginLeft: 12 }}>
+            Updates/s:{" "}
+            <select value={hz} onChange={e => setHz(Number(e.target.value))}>
+              {[1, 2, 5, 10].map(v => <option key={v} value={v}>{v}</option>)}
+            </select>
+          </label>
+        </div>
+      )}
+      {fleetId && (
+        <table style={{ fontSize: 12, borderCollapse: "collapse", width: "100%" }}>
+          <thead>
+            <tr>
+              <th>Rack</th>
+              {COLUMNS.map(c => <th key={c.channel}>{c.label}</th>)}
+              <th>Suction Trend</th>
+              <th>Alarms</th>
+            </tr>
+          </thead>
+          <tbody>
+            {Object.entries(readings.current).map(([rack, values]) => (
+              <tr key={rack} style={{ background: (alarms.current[rack] || []).length ? "#fee2e2" : "transparent" }}>
+                <td>{rack}</td>
+                {COLUMNS.map(c => <td key={c.channel}>{values[c.channel]}</td>)}
+                <td><Sparkline points={trends.current[rack] || []} /></td>
+                <td>{(alarms.current[rack] || []).join(", ")}</td>
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      )}
+    </section>
+  );
+}
@@ -6,6 +6,8 @@ Follows AI Coding Guidelines with modular design and apprentice-friendly comment
 from typing import Dict, List, Optional, Union
 from dataclasses import dataclass
 
+from utils.tracing import traced
+
 
 @dataclass
 class DiagnosticResult:
@@ -44,6 +46,7 @@ class DiagnosticsEngine:
         # TODO: Implement loading from component_specs.json
         return {}
 
+    @traced("diagnostics.diagnose")
     def diagnose(self, sensor_data: Dict[str, Union[float, bool]]) -> DiagnosticResult:
         """
         Main diagnostic function that evaluates sensor data and returns diagnosis.
@@ -79,6 +82,34 @@ class DiagnosticsEngine:
             source_references=source_refs
         )
 
+    @traced("diagnostics.diagnose_many")
+    def diagnose_many(self, states: List[Dict[str, Union[float, bool]]]) -> List[DiagnosticResult]:
+        """
+        Diagnose many racks in one call (e.g., a fleet step or a batch request).
+        Manual references are looked up once per distinct diagnosis.
+
+        Args:
+            states: Sensor readings per rack, as for diagnose()
+
+        Returns:
+            One DiagnosticResult per state, in order
+        """
+        references: Dict[str, List[str]] = {}
+        results = []
+        for sensor_data in states:
+            safety_warnings = self._check_safety_conditions(sensor_data)
+            diagnosis, confidence, next_steps = self._analyze_symptoms(sensor_data)
+            if diagnosis not in references:
+                references[diagnosis] = self._get_source_references(diagnosis)
+            results.append(DiagnosticResult(
+                diagnosis=diagnosis,
+                confidence=confidence,
+                next_steps=next_steps,
+                safety_warnings=safety_warnings,
+                source_references=list(references[diagnosis])
+            ))
+        return results
+
     def _check_safety_conditions(self, data: Dict) -> List[str]:
         """
         Check for safety-critical conditions that require immediate attention.
@@ -94,8 +125,8 @@ class DiagnosticsEngine:
                 "Shut down if persistent."
             )
         
-        # Check suction pressure
-        if data.get("suction_pressure_psig", 0) < self.safety_thresholds["min_suction_pressure_psig"]:
+        # Check suction pressure (only if measured; partial readings are allowed)
+        if data.get("suction_pressure_psig", float("inf")) < self.safety_thresholds["min_suction_pressure_psig"]:
             warnings.append(
                 f"WARNING: Suction pressure {data['suction_pressure_psig']} psig below "
                 f"minimum safe limit of {self.safety_thresholds['min_suction_pressure_psig']} psig. "
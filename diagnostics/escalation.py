@@ -0,0 +1,297 @@
+"""
+EscalationPolicy - Decides when a rule diagnosis needs an LLM second opinion.
+Sits between DiagnosticsEngine and LLMInterface so confident rule results,
+normal racks and over-budget requests do not spend an LLM round-trip.
+"""
+
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+from collections import Counter, deque
+from dataclasses import dataclass
+import time
+
+from diagnostics.engine import DiagnosticResult
+
+
+# Rule results at or above this confidence are trusted without the LLM
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+
+# Severity of a safety warning, from the prefix DiagnosticsEngine gives it
+SAFETY_SEVERITY = {
+    "CRITICAL": 2,
+    "WARNING": 1,
+}
+
+# Warnings at or above this severity always escalate, even over budget
+SAFETY_ESCALATION_SEVERITY = 2
+
+# Rough cost in USD of one diagnostic call (~2k prompt tokens) per provider
+PROVIDER_CALL_COSTS = {
+    "gemini": 0.0005,
+    "openai": 0.001,
+    "claude": 0.006,
+    "local": 0.0,
+}
+
+# Expected seconds per call until real latencies have been recorded
+PROVIDER_EXPECTED_LATENCY = {
+    "gemini": 4.0,
+    "openai": 3.0,
+    "claude": 5.0,
+    "local": 0.1,
+}
+
+# Weight of the newest latency sample in the running estimate
+LATENCY_SMOOTHING = 0.2
+
+# Decisions kept for inspection
+DECISION_LOG_SIZE = 1000
+
+
+@dataclass
+class EscalationDecision:
+    """Whether one diagnosis goes to the LLM, and why."""
+    escalate: bool
+    code: str  # safety, normal, confident, cached, latency, budget, ambiguous or forced
+    reason: str
+    confidence: float
+    severity: int
+    estimated_cost: float
+    timestamp: float
+
+
+def safety_severity(warnings: Sequence[str]) -> int:
+    """
+    Get the highest severity among safety warnings.
+
+    Args:
+        warnings: Safety warnings from a DiagnosticResult
+
+    Returns:
+        0 for none, otherwise the largest SAFETY_SEVERITY value found
+    """
+    severity = 0
+    for warning in warnings:
+        prefix = warning.split(":", 1)[0].strip().upper()
+        severity = max(severity, SAFETY_SEVERITY.get(prefix, 1))
+    return severity
+
+
+class EscalationPolicy:
+    """
+    Per-request gate in front of the LLM.
+    Order of checks: safety, normal readings, rule confidence, cached answer,
+    latency budget, call and cost budget.
+    """
+
+    def __init__(self,
+                 provider: str = "gemini",
+                 confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+                 latency_budget_seconds: float = 30.0,
+                 max_calls_per_window: int = 60,
+                 cost_budget_per_window: float = 1.0,
+                 window_seconds: float = 3600.0,
+                 normal_ranges: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Initialize the policy.
+
+        Args:
+            provider: LLM provider, selects the cost and latency estimates
+            confidence_threshold: Rule confidence that makes the LLM unnecessary
+            latency_budget_seconds: Longest expected LLM wait worth taking
+            max_calls_per_window: LLM calls allowed per window
+            cost_budget_per_window: Estimated USD allowed per window
+            window_seconds: Length of the rolling budget window
+            normal_ranges: Sensor ranges (e.g. RackSimulator.normal_ranges);
+                readings inside them with no alarms need no explanation
+        """
+        self.provider = provider
+        self.confidence_threshold = confidence_threshold
+        self.latency_budget_seconds = latency_budget_seconds
+        self.max_calls_per_window = max_calls_per_window
+        self.cost_budget_per_window = cost_budget_per_window
+        self.window_seconds = window_seconds
+        self.normal_ranges = normal_ranges or {}
+        self.cost_per_call = PROVIDER_CALL_COSTS.get(provider, max(PROVIDER_CALL_COSTS.values()))
+        self.expected_latency = PROVIDER_EXPECTED_LATENCY.get(provider, 5.0)
+
+        # (timestamp, cost) of every call charged in the current window
+        self._calls: Deque[Tuple[float, float]] = deque()
+        self.decisions: Deque[EscalationDecision] = deque(maxlen=DECISION_LOG_SIZE)
+
+    def decide(self,
+               sensor_data: Dict,
+               result: DiagnosticResult,
+               cached: bool = False) -> EscalationDecision:
+        """
+        Decide whether to ask the LLM about one diagnosis. Nothing is charged
+        here; call commit() with the decision once the LLM is actually asked.
+
+        Args:
+            sensor_data: Readings the diagnosis was made from
+            result: Rule-based diagnosis
+            cached: True if the LLM answer for this request is already cached
+
+        Returns:
+            EscalationDecision with the reason recorded
+        """
+        now = time.time()
+        severity = safety_severity(result.safety_warnings)
+
+        if severity >= SAFETY_ESCALATION_SEVERITY:
+            escalate, code = True, "safety"
+            reason = "safety-critical warning; escalated regardless of budget"
+        elif not result.safety_warnings and not self._is_abnormal(sensor_data):
+            escalate, code = False, "normal"
+            reason = "readings within normal ranges and no alarms"
+        elif result.confidence >= self.confidence_threshold:
+            escalate, code = False, "confident"
+            reason = f"rule confidence {result.confidence:.2f} >= {self.confidence_threshold:.2f}"
+        elif cached:
+            escalate, code = True, "cached"
+            reason = "ambiguous result; cached LLM answer costs nothing"
+        elif self.expected_latency > self.latency_budget_seconds:
+            escalate, code = False, "latency"
+            reason = (f"expected LLM latency {self.expected_latency:.1f}s exceeds "
+                      f"budget {self.latency_budget_seconds:.1f}s")
+        else:
+            over_budget = self._budget_exceeded(now)
+            if over_budget:
+                escalate, code, reason = False, "budget", over_budget
+            else:
+                escalate, code = True, "ambiguous"
+                reason = f"rule confidence {result.confidence:.2f} < {self.confidence_threshold:.2f}"
+
+        # Safety escalations bypass the budget but still count against it
+        cost = self.cost_per_call if escalate and code != "cached" else 0.0
+
+        decision = EscalationDecision(
+            escalate=escalate,
+            code=code,
+            reason=reason,
+            confidence=result.confidence,
+            severity=severity,
+            estimated_cost=cost,
+            timestamp=now
+        )
+        self.decisions.append(decision)
+        return decision
+
+    def decide_many(self,
+                    requests: Sequence[Tuple[Dict, DiagnosticResult]],
+                    cached: Optional[Sequence[bool]] = None) -> List[EscalationDecision]:
+        """
+        Decide for a batch of racks (fleet mode). The budget goes to the
+        most urgent first: highest safety severity, then lowest confidence.
+        Escalations are committed as they are decided, so the caller is
+        expected to ask the LLM about every escalated rack.
+
+        Args:
+            requests: (sensor_data, result) pairs
+            cached: Per-request cache flags, in the same order
+
+        Returns:
+            Decisions in the same order as requests
+        """
+        cached = cached or [False] * len(requests)
+        severities = [safety_severity(result.safety_warnings) for _, result in requests]
+        order = sorted(
+            range(len(requests)),
+            key=lambda i: (-severities[i], requests[i][1].confidence)
+        )
+
+        decisions: List[Optional[EscalationDecision]] = [None] * len(requests)
+        for index in order:
+            sensor_data, result = requests[index]
+            decisions[index] = self.decide(sensor_data, result, cached[index])
+            self.commit(decisions[index])
+        return decisions
+
+    def force(self, decision: EscalationDecision, cached: bool = False) -> EscalationDecision:
+        """
+        Override a decision not to escalate (an explicit request for analysis).
+        Forcing skips the confidence and latency checks, not the budget.
+
+        Args:
+            decision: Decision returned by decide()
+            cached: True if the LLM answer for this request is already cached
+
+        Returns:
+            decision itself if it already escalates, otherwise a "forced"
+            decision to commit(), or a "budget" one if the budget is used up
+        """
+        if decision.escalate:
+            return decision
+
+        now = time.time()
+        over_budget = None if cached else self._budget_exceeded(now)
+        forced = EscalationDecision(
+            escalate=over_budget is None,
+            code="forced" if over_budget is None else "budget",
+            reason=f"analysis requested ({decision.reason})" if over_budget is None else over_budget,
+            confidence=decision.confidence,
+            severity=decision.severity,
+            estimated_cost=0.0 if cached or over_budget else self.cost_per_call,
+            timestamp=now
+        )
+        self.decisions.append(forced)
+        return forced
+
+    def commit(self, decision: EscalationDecision):
+        """
+        Charge an escalation against the budget once the LLM is asked.
+        Decisions that did not escalate, or were served from cache, cost nothing.
+
+        Args:
+            decision: Decision returned by decide()
+        """
+        if decision.escalate and decision.estimated_cost > 0:
+            self._calls.append((time.time(), decision.estimated_cost))
+
+    def record_latency(self, seconds: float):
+        """
+        Fold an observed LLM call duration into the latency estimate.
+
+        Args:
+            seconds: Wall time of the call
+        """
+        self.expected_latency += LATENCY_SMOOTHING * (seconds - self.expected_latency)
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Count recorded decisions by outcome.
+
+        Returns:
+            Dictionary with escalated/skipped totals and a count per code
+        """
+        counts = Counter(decision.code for decision in self.decisions)
+        escalated = sum(1 for decision in self.decisions if decision.escalate)
+        return {
+            "escalated": escalated,
+            "skipped": len(self.decisions) - escalated,
+            **counts,
+        }
+
+    def _is_abnormal(self, sensor_data: Dict) -> bool:
+        """True if there are alarms or a reading outside its normal range."""
+        if sensor_data.get("alarms"):
+            return True
+        for name, (low, high) in self.normal_ranges.items():
+            value = sensor_data.get(name)
+            if isinstance(value, (int, float)) and not low <= value <= high:
+                return True
+        return False
+
+    def _budget_exceeded(self, now: float) -> Optional[str]:
+        """Reason one more call would exceed the call or cost budget, or None if it fits."""
+        calls, spent = self._window_usage(now)
+        if calls >= self.max_calls_per_window:
+            return f"call budget used ({calls}/{self.max_calls_per_window} this window)"
+        if spent + self.cost_per_call > self.cost_budget_per_window:
+            return f"cost budget used (${spent:.4f} of ${self.cost_budget_per_window:.2f} this window)"
+        return None
+
+    def _window_usage(self, now: float) -> Tuple[int, float]:
+        """Calls and estimated cost charged within the rolling window."""
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+        return len(self._calls), sum(cost for _, cost in self._calls)
@@ -0,0 +1,259 @@
+"""
+Clients - Process-wide registry of vector store and embedding clients.
+Clients are created lazily on first use and shared by every VectorSearch
+and EmbeddingPipeline instance, so constructing those objects is cheap and
+never opens duplicate connections.
+
+Backends (VECTOR_BACKEND environment variable):
+    supabase - Supabase pgvector store with OpenAI embeddings (default)
+    local    - In-process LocalVectorIndex (the ingestion mirror), queried with
+               the embedding model recorded with it; an empty or stand-in
+               mirror uses HashingEmbeddings and needs no credentials
+               (tests, offline training rigs)
+"""
+
+from typing import Dict, List
+import hashlib
+import math
+import os
+import re
+import threading
+
+from dotenv import load_dotenv
+
+from embeddings.inverted_index import INVERTED_INDEX_PATH, InvertedIndex
+from embeddings.local_index import LOCAL_INDEX_DIR, LocalVectorIndex
+
+
+# Table and match function used by the Supabase store
+SUPABASE_TABLE = "document_embeddings"
+SUPABASE_QUERY = "match_documents"
+
+# Dimensions of the local stand-in embeddings
+HASHING_DIMENSIONS = 256
+
+# Model name recorded for HashingEmbeddings vectors (dimensions appended)
+HASHING_MODEL_PREFIX = "hashing-"
+
+# OpenAIEmbeddings' default model, assumed for mirrors saved without a model name
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+_lock = threading.RLock()
+_clients: Dict[str, object] = {}
+_env_loaded = False
+
+
+class HashingEmbeddings:
+    """
+    Deterministic, credential-free embeddings for the local backend.
+    Words and word pairs are hashed into a fixed-size signed vector, so
+    texts sharing terms land near each other. Not a semantic model, but
+    stable across runs and good enough for offline rigs and tests.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimensions: Length of every embedding vector
+        """
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        """Hash one text's terms into a unit-length vector."""
+        words = re.findall(r"[a-z0-9]+(?:[-./][a-z0-9]+)*", text.lower())
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        vector = [0.0] * self.dimensions
+        for term in terms:
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query."""
+        return self._embed(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts."""
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async form of embed_query, for the ingestion pipeline."""
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async form of embed_documents, for the ingestion pipeline."""
+        return self.embed_documents(texts)
+
+
+def embedding_model_name(embeddings) -> str:
+    """
+    Name an embedding model, as recorded with the vectors it produces.
+
+    Args:
+        embeddings: HashingEmbeddings, OpenAIEmbeddings or similar
+
+    Returns:
+        e.g. "hashing-256" or "text-embedding-ada-002"
+    """
+    if isinstance(embeddings, HashingEmbeddings):
+        return f"{HASHING_MODEL_PREFIX}{embeddings.dimensions}"
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+def _load_env():
+    """Read .env once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_backend() -> str:
+    """
+    Get the configured vector backend.
+
+    Returns:
+        "supabase" or "local"
+    """
+    _load_env()
+    backend = os.getenv("VECTOR_BACKEND", "supabase").lower()
+    if backend not in ("supabase", "local"):
+        raise ValueError(f"Unsupported vector backend: {backend}")
+    return backend
+
+
+def _get_or_create(name: str, factory):
+    """Return the shared client called name, creating it on first use."""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+    return client
+
+
+def get_supabase_client():
+    """
+    Get the shared Supabase client. Its HTTP connection pool is reused by
+    every caller in the process.
+
+    Returns:
+        supabase Client
+    """
+    def create():
+        from supabase.client import create_client
+
+        _load_env()
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_ANON_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError("Supabase credentials not found in environment variables")
+
+        return create_client(supabase_url, supabase_key)
+
+    return _get_or_create("supabase", create)
+
+
+def get_embeddings():
+    """
+    Get the shared embedding model for the configured backend. The local
+    backend uses the model the mirror was built with, so queries match it.
+
+    Returns:
+        OpenAIEmbeddings (supabase backend, or a mirror of OpenAI vectors)
+        or HashingEmbeddings (an empty or stand-in local mirror)
+    """
+    def create():
+        _load_env()
+        if get_backend() == "local":
+            model = _mirror_embedding_model(get_local_index())
+            if model.startswith(HASHING_MODEL_PREFIX):
+                return HashingEmbeddings(int(model[len(HASHING_MODEL_PREFIX):]))
+
+            from langchain_community.embeddings import OpenAIEmbeddings
+
+            return OpenAIEmbeddings(model=model)
+
+        from langchain_community.embeddings import OpenAIEmbeddings
+
+        return OpenAIEmbeddings()
+
+    return _get_or_create("embeddings", create)
+
+
+def _mirror_embedding_model(index: LocalVectorIndex) -> str:
+    """Model the local mirror was built with (the hashing stand-in while it is empty)."""
+    if index.embedding_model is not None:
+        return index.embedding_model
+    if index.dimensions in (None, HASHING_DIMENSIONS):
+        return f"{HASHING_MODEL_PREFIX}{HASHING_DIMENSIONS}"
+    # Mirrors saved before the model was recorded came from the supabase backend's default model
+    return OPENAI_EMBEDDING_MODEL
+
+
+def get_local_index() -> LocalVectorIndex:
+    """
+    Get the shared local vector index (the ingestion mirror).
+
+    Returns:
+        LocalVectorIndex loaded from manuals/processed/vector_index
+    """
+    def create():
+        _load_env()
+        return LocalVectorIndex.load(
+            LOCAL_INDEX_DIR,
+            storage=os.getenv("VECTOR_INDEX_STORAGE", "float32").lower()
+        )
+
+    return _get_or_create("local_index", create)
+
+
+def get_keyword_index() -> InvertedIndex:
+    """
+    Get the shared BM25 keyword index that ingestion adds to, so every
+    EmbeddingPipeline in the process saves the same additions.
+
+    Returns:
+        InvertedIndex loaded from manuals/processed/inverted_index.json
+    """
+    return _get_or_create("keyword_index", lambda: InvertedIndex.load(INVERTED_INDEX_PATH))
+
+
+def get_vector_store():
+    """
+    Get the shared vector store for the configured backend.
+
+    Returns:
+        SupabaseVectorStore (supabase backend) or LocalVectorIndex (local backend)
+    """
+    if get_backend() == "local":
+        return get_local_index()
+
+    def create():
+        from langchain_community.vectorstores import SupabaseVectorStore
+
+        return SupabaseVectorStore(
+            client=get_supabase_client(),
+            embedding=get_embeddings(),
+            table_name=SUPABASE_TABLE,
+            query_name=SUPABASE_QUERY
+        )
+
+    return _get_or_create("vector_store", create)
+
+
+def reset_clients():
+    """Drop every shared client, e.g. after changing environment variables."""
+    global _env_loaded
+    with _lock:
+        _clients.clear()
+        _env_loaded = False
@@ -3,17 +3,30 @@ EmbeddingPipeline - Processes PDF manuals into vector embeddings for semantic se
 Uses LangChain and Supabase for document processing and storage.
 """
 
-from typing import Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 import os
 from pathlib import Path
 from dataclasses import dataclass
-from langchain_community.document_loaders import PyPDFLoader, UnstructuredPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import SupabaseVectorStore
-from supabase.client import Client, create_client
-from dotenv import load_dotenv
 import json
+import uuid
+
+from embeddings.clients import (
+    embedding_model_name,
+    get_embeddings,
+    get_keyword_index,
+    get_local_index,
+    get_vector_store,
+)
+from embeddings.page_cache import PAGE_CACHE_DIR, PageCache
+from embeddings.local_index import LOCAL_INDEX_DIR
+from embeddings.inverted_index import INVERTED_INDEX_PATH, make_chunk_id
+from embeddings.search_cache import invalidate_search_cache
+from utils.tracing import count, observe, span, traced
+
+# LangChain is imported where it is used; importing it costs close to a second
+if TYPE_CHECKING:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_core.documents import Document
 
 
 @dataclass
@@ -25,46 +38,167 @@ class ProcessedDocument:
     page_number: int
 
 
+@traced("embedding.load_pages")
+def load_pdf_pages(pdf_path: str) -> List["Document"]:
+    """
+    Extract pages from a PDF manual.
+    Tries UnstructuredPDFLoader first and falls back to PyPDFLoader.
+    
+    Args:
+        pdf_path: Path to the PDF file
+    
+    Returns:
+        List of LangChain Documents with page text and layout metadata
+    """
+    from langchain_community.document_loaders import PyPDFLoader, UnstructuredPDFLoader
+    
+    try:
+        loader = UnstructuredPDFLoader(pdf_path)
+        return loader.load()
+    except Exception as e:
+        print(f"Error loading PDF with UnstructuredPDFLoader: {str(e)}")
+        print("Falling back to PyPDFLoader...")
+        loader = PyPDFLoader(pdf_path)
+        return loader.load()
+
+
+@traced("embedding.chunk")
+def chunk_pages(pages: List["Document"],
+                text_splitter: "RecursiveCharacterTextSplitter",
+                pdf_path: str,
+                component_type: Optional[str] = None,
+                manual_reference: Optional[str] = None,
+                manufacturer: Optional[str] = None,
+                model: Optional[str] = None) -> List[ProcessedDocument]:
+    """
+    Split extracted pages into chunks with search metadata.
+    
+    Args:
+        pages: Extracted page Documents
+        text_splitter: Splitter used to chunk the pages
+        pdf_path: Path to the PDF file the pages came from
+        component_type: Type of component (e.g., "compressor", "valve")
+        manual_reference: Reference to the manual (e.g., "Copeland AE4-1327")
+        manufacturer: Optional manufacturer name, indexed for filtering
+        model: Optional model number, indexed for filtering
+    
+    Returns:
+        List of ProcessedDocument objects
+    """
+    # Split into chunks
+    chunks = text_splitter.split_documents(pages)
+    
+    # Process chunks
+    processed_docs = []
+    for chunk in chunks:
+        # Extract metadata
+        metadata = {
+            "source": manual_reference or Path(pdf_path).stem,
+            "page": chunk.metadata.get("page", 0),
+            "component_type": component_type
+        }
+        if manufacturer:
+            metadata["manufacturer"] = manufacturer
+        if model:
+            metadata["model"] = model
+        metadata["chunk_id"] = make_chunk_id(
+            metadata["source"], metadata["page"], chunk.page_content
+        )
+        
+        # Create processed document
+        processed_doc = ProcessedDocument(
+            content=chunk.page_content,
+            metadata=metadata,
+            source=metadata["source"],
+            page_number=metadata["page"]
+        )
+        processed_docs.append(processed_doc)
+    
+    return processed_docs
+
+
 class EmbeddingPipeline:
     """
     Processes PDF manuals into vector embeddings for semantic search.
     Handles document loading, chunking, and storage in Supabase.
     """
 
-    def __init__(self):
-        """Initialize the embedding pipeline with required components."""
-        load_dotenv()
-        
-        # Initialize Supabase connection
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_ANON_KEY")
+    def __init__(self,
+                 chunk_size: int = 1000,
+                 chunk_overlap: int = 200,
+                 use_page_cache: bool = True):
+        """
+        Initialize the embedding pipeline with required components.
         
-        if not supabase_url or not supabase_key:
-            raise ValueError("Supabase credentials not found in environment variables")
+        Args:
+            chunk_size: Characters per chunk
+            chunk_overlap: Characters shared by neighbouring chunks
+            use_page_cache: Read extracted pages from manuals/processed/pages
+                instead of re-parsing unchanged PDFs
+        """
+        # Clients and indexes come from the shared registry on first use
+        self._embeddings = None
+        self._vector_store = None
+        self._keyword_index = None
+        self._local_index = None
         
-        # Create Supabase client
-        supabase_client: Client = create_client(supabase_url, supabase_key)
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
         
-        # Initialize components
-        self.embeddings = OpenAIEmbeddings()
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
             length_function=len
         )
         
-        # Initialize vector store with client
-        self.vector_store = SupabaseVectorStore(
-            client=supabase_client,
-            embedding=self.embeddings,
-            table_name="document_embeddings",
-            query_name="match_documents"
-        )
+        # Extracted page text, so changing chunk settings never re-parses PDFs
+        self.page_cache = PageCache(PAGE_CACHE_DIR) if use_page_cache else None
+
+    @property
+    def embeddings(self):
+        """Embedding model, shared across instances unless overridden."""
+        return self._embeddings if self._embeddings is not None else get_embeddings()
+
+    @embeddings.setter
+    def embeddings(self, value):
+        self._embeddings = value
 
+    @property
+    def vector_store(self):
+        """Vector store for the configured backend, shared unless overridden."""
+        return self._vector_store if self._vector_store is not None else get_vector_store()
+
+    @vector_store.setter
+    def vector_store(self, value):
+        self._vector_store = value
+
+    @property
+    def keyword_index(self):
+        """Keyword index for exact-token lookups, built alongside the embeddings."""
+        return self._keyword_index if self._keyword_index is not None else get_keyword_index()
+
+    @keyword_index.setter
+    def keyword_index(self, value):
+        self._keyword_index = value
+
+    @property
+    def local_index(self):
+        """
+        Local mirror of the embeddings, searchable with VECTOR_BACKEND=local
+        (the same instance that local-backend searches in this process use).
+        """
+        return self._local_index if self._local_index is not None else get_local_index()
+
+    @local_index.setter
+    def local_index(self, value):
+        self._local_index = value
+
+    @traced("embedding.process_manual")
     def process_manual(self,
                       pdf_path: str,
                       component_type: Optional[str] = None,
-                      manual_reference: Optional[str] = None) -> List[ProcessedDocument]:
+                      manual_reference: Optional[str] = None,
+                      manufacturer: Optional[str] = None,
+                      model: Optional[str] = None) -> List[ProcessedDocument]:
         """
         Process a PDF manual into vector embeddings.
         
@@ -72,61 +206,120 @@ class EmbeddingPipeline:
             pdf_path: Path to the PDF file
             component_type: Type of component (e.g., "compressor", "valve")
             manual_reference: Reference to the manual (e.g., "Copeland AE4-1327")
+            manufacturer: Optional manufacturer name, indexed for filtering
+            model: Optional model number, indexed for filtering
         
         Returns:
             List of ProcessedDocument objects
         """
-        # Load PDF
-        try:
-            loader = UnstructuredPDFLoader(pdf_path)
-            documents = loader.load()
-        except Exception as e:
-            print(f"Error loading PDF with UnstructuredPDFLoader: {str(e)}")
-            print("Falling back to PyPDFLoader...")
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-        
-        # Split into chunks
-        chunks = self.text_splitter.split_documents(documents)
-        
-        # Process chunks
-        processed_docs = []
-        for chunk in chunks:
-            # Extract metadata
-            metadata = {
-                "source": manual_reference or Path(pdf_path).stem,
-                "page": chunk.metadata.get("page", 0),
-                "component_type": component_type
-            }
-            
-            # Create processed document
-            processed_doc = ProcessedDocument(
-                content=chunk.page_content,
-                metadata=metadata,
-                source=metadata["source"],
-                page_number=metadata["page"]
-            )
-            processed_docs.append(processed_doc)
+        # Load PDF pages (from the page cache when this PDF was parsed before)
+        if self.page_cache is not None:
+            documents = self.page_cache.load_pages(pdf_path, load_pdf_pages)
+        else:
+            documents = load_pdf_pages(pdf_path)
         
-        return processed_docs
+        return chunk_pages(
+            documents,
+            self.text_splitter,
+            pdf_path,
+            component_type=component_type,
+            manual_reference=manual_reference,
+            manufacturer=manufacturer,
+            model=model
+        )
 
-    def store_embeddings(self, documents: List[ProcessedDocument]):
+    @traced("embedding.store_embeddings")
+    def store_embeddings(self, documents: List[ProcessedDocument], persist: bool = True):
         """
-        Store document embeddings in Supabase.
+        Store document embeddings in Supabase and the local indexes.
         
         Args:
             documents: List of ProcessedDocument objects to store
+            persist: Save the local indexes now; batch callers pass False
+                and call save_indexes() once after the last batch
         """
+        # Embed once and reuse the vectors for both the store and the local mirror
+        texts = [doc.content for doc in documents]
+        with span("embedding.embed"):
+            vectors = self.embeddings.embed_documents(texts)
+        count("embedded_chunks_total", len(texts))
+        count("embedded_bytes_total", sum(len(text.encode("utf-8")) for text in texts))
+        observe("embedding_batch_size", len(texts))
+        
+        self.upload_vectors(documents, vectors)
+        self.index_locally(documents, vectors)
+        if persist:
+            self.save_indexes()
+        else:
+            # The store changed now, even if the local indexes are saved later
+            invalidate_search_cache()
+
+    @traced("embedding.upload")
+    def upload_vectors(self, documents: List[ProcessedDocument], vectors: List[List[float]]):
+        """
+        Upsert embedded chunks into the vector store.
+        
+        Args:
+            documents: ProcessedDocument objects that were embedded
+            vectors: Embedding for each document
+        """
+        # With the local backend the store is the local mirror, which index_locally() fills
+        vector_store = self.vector_store
+        if vector_store is self.local_index:
+            return
+        
+        from langchain_core.documents import Document
+        
         # Convert to LangChain document format
         docs = []
         for doc in documents:
-            docs.append({
-                "page_content": doc.content,
-                "metadata": doc.metadata
-            })
+            docs.append(Document(
+                page_content=doc.content,
+                metadata=doc.metadata
+            ))
+        
+        # Deterministic row IDs make re-ingesting a manual an upsert, not a duplicate
+        ids = [
+            str(uuid.uuid5(uuid.NAMESPACE_URL, doc.metadata.get("chunk_id") or doc.content))
+            for doc in documents
+        ]
         
         # Add to vector store
-        self.vector_store.add_documents(docs)
+        vector_store.add_vectors(vectors, docs, ids)
+
+    @traced("embedding.index_locally")
+    def index_locally(self, documents: List[ProcessedDocument], vectors: List[List[float]]):
+        """
+        Add embedded chunks to the local vector mirror and the keyword index.
+        Call save_indexes() afterwards to persist them.
+        
+        Args:
+            documents: ProcessedDocument objects that were embedded
+            vectors: Embedding for each document
+        """
+        # Mirror into the local index so filtered searches can run in-process
+        self.local_index.add(
+            vectors,
+            [doc.content for doc in documents],
+            [doc.metadata for doc in documents],
+            embedding_model=embedding_model_name(self.embeddings)
+        )
+        
+        # Add to the keyword index so BM25 sees the same chunks
+        self.keyword_index.add_chunks(
+            (doc.metadata["chunk_id"], doc.content, doc.metadata)
+            for doc in documents
+            if "chunk_id" in doc.metadata
+        )
+
+    @traced("embedding.save_indexes")
+    def save_indexes(self):
+        """Persist the local indexes and invalidate cached search results."""
+        self.local_index.save(LOCAL_INDEX_DIR)
+        self.keyword_index.save(INVERTED_INDEX_PATH)
+        
+        # Cached search results no longer reflect the index
+        invalidate_search_cache()
 
     def process_directory(self,
                          input_dir: str,
@@ -155,10 +348,14 @@ class EmbeddingPipeline:
                 component_type=component_type
             )
             
-            # Store embeddings
-            self.store_embeddings(processed_docs)
+            # Store embeddings (local indexes are saved once, below)
+            self.store_embeddings(processed_docs, persist=False)
             
             print(f"Processed {len(processed_docs)} chunks from {pdf_file.name}")
+        
+        # Persist local indexes once, after every manual has been stored
+        if pdf_files:
+            self.save_indexes()
 
     def update_component_specs(self, specs_path: str = "component_specs.json"):
         """
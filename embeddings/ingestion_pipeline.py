@@ -0,0 +1,352 @@
+"""
+IngestionPipeline - Pipelined asyncio ingestion of PDF manuals.
+Parsing, embedding and vector-store writes run as separate stages joined
+by bounded queues, so a full library ingest is limited by the slowest
+stage instead of the sum of all three.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import asyncio
+import os
+import time
+
+from embeddings.embedding_pipeline import (
+    EmbeddingPipeline,
+    ProcessedDocument,
+    chunk_pages,
+    load_pdf_pages,
+)
+from embeddings.page_cache import PAGE_CACHE_DIR, PageCache
+from utils.rate_limiter import AsyncTokenBucket
+
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+@dataclass
+class ManualJob:
+    """One manual to ingest, with the metadata its chunks should carry."""
+    pdf_path: str
+    component_type: Optional[str] = None
+    manual_reference: Optional[str] = None
+    manufacturer: Optional[str] = None
+    model: Optional[str] = None
+
+
+@dataclass
+class StageMetrics:
+    """Throughput and queue-depth counters for one pipeline stage."""
+    name: str
+    workers: int = 1
+    items: int = 0
+    chunks: int = 0
+    busy_seconds: float = 0.0
+    errors: int = 0
+    queue_samples: int = 0
+    queue_depth_total: int = 0
+    max_queue_depth: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    def record_queue_depth(self, depth: int):
+        """Sample the depth of this stage's input queue."""
+        self.queue_samples += 1
+        self.queue_depth_total += depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    @property
+    def wall_seconds(self) -> float:
+        """Seconds from pipeline start until this stage finished."""
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def chunks_per_second(self) -> float:
+        """Chunks handled per second of wall time."""
+        return self.chunks / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """Share of this stage's worker capacity that was busy (0-1)."""
+        capacity = self.wall_seconds * self.workers
+        return min(1.0, self.busy_seconds / capacity) if capacity else 0.0
+
+    @property
+    def average_queue_depth(self) -> float:
+        """Mean number of items waiting in this stage's input queue."""
+        return self.queue_depth_total / self.queue_samples if self.queue_samples else 0.0
+
+
+def parse_manual(job: ManualJob,
+                 chunk_size: int,
+                 chunk_overlap: int,
+                 use_page_cache: bool) -> Tuple[List[ProcessedDocument], Dict[str, List]]:
+    """
+    Parse and chunk one manual. Runs in a worker process.
+
+    Args:
+        job: Manual to parse
+        chunk_size: Characters per chunk
+        chunk_overlap: Characters shared by neighbouring chunks
+        use_page_cache: Read/write extracted pages in manuals/processed/pages
+
+    Returns:
+        (ProcessedDocument objects, new PDF hash memo entries for the parent to save)
+    """
+    new_hashes: Dict[str, List] = {}
+    if use_page_cache:
+        # Concurrent workers rewriting hashes.json would drop each other's entries
+        page_cache = PageCache(PAGE_CACHE_DIR, autosave_hashes=False)
+        pages = page_cache.load_pages(job.pdf_path, load_pdf_pages)
+        new_hashes = page_cache.take_new_hashes()
+    else:
+        pages = load_pdf_pages(job.pdf_path)
+
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len
+    )
+    documents = chunk_pages(
+        pages,
+        text_splitter,
+        job.pdf_path,
+        component_type=job.component_type,
+        manual_reference=job.manual_reference,
+        manufacturer=job.manufacturer,
+        model=job.model
+    )
+    return documents, new_hashes
+
+
+class AsyncIngestionPipeline:
+    """
+    Three-stage ingestion pipeline:
+    parse (process pool) -> embed (concurrent, rate-limited batches)
+    -> write (thread pool sharing the store client's connection pool).
+    """
+
+    def __init__(self,
+                 pipeline: EmbeddingPipeline,
+                 parse_workers: Optional[int] = None,
+                 embed_concurrency: int = 4,
+                 embed_batch_size: int = 64,
+                 embed_requests_per_second: float = 5.0,
+                 write_concurrency: int = 4,
+                 queue_size: int = 8,
+                 chunk_size: int = 1000,
+                 chunk_overlap: int = 200,
+                 use_page_cache: bool = True):
+        """
+        Initialize the pipeline.
+
+        Args:
+            pipeline: EmbeddingPipeline providing the embedding model, store and indexes
+            parse_workers: Processes used for PDF parsing (defaults to CPU count)
+            embed_concurrency: Embedding requests allowed in flight at once
+            embed_batch_size: Chunks sent per embedding request
+            embed_requests_per_second: Sustained embedding request rate limit
+            write_concurrency: Vector-store writes allowed in flight at once
+            queue_size: Capacity of each queue between stages
+            chunk_size: Characters per chunk
+            chunk_overlap: Characters shared by neighbouring chunks
+            use_page_cache: Read extracted pages from manuals/processed/pages
+        """
+        self.pipeline = pipeline
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.embed_concurrency = embed_concurrency
+        self.embed_batch_size = embed_batch_size
+        self.rate_limiter = AsyncTokenBucket(embed_requests_per_second)
+        self.write_concurrency = write_concurrency
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.use_page_cache = use_page_cache
+        self.metrics: Dict[str, StageMetrics] = {}
+        self.failures: List[str] = []
+
+    def ingest(self, jobs: List[ManualJob]) -> Dict[str, StageMetrics]:
+        """
+        Ingest manuals, blocking until every stage has finished.
+
+        Args:
+            jobs: Manuals to ingest
+
+        Returns:
+            Metrics for each stage
+        """
+        return asyncio.run(self.run(jobs))
+
+    async def run(self, jobs: List[ManualJob]) -> Dict[str, StageMetrics]:
+        """
+        Ingest manuals with all three stages running concurrently.
+
+        Args:
+            jobs: Manuals to ingest
+
+        Returns:
+            Metrics for each stage
+        """
+        self.metrics = {
+            "parse": StageMetrics("parse", workers=self.parse_workers),
+            "embed": StageMetrics("embed", workers=self.embed_concurrency),
+            "write": StageMetrics("write", workers=self.write_concurrency),
+        }
+        self.failures = []
+
+        # Bounded queues give back-pressure: a fast stage waits instead of piling up work
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as parse_pool, \
+                ThreadPoolExecutor(max_workers=self.write_concurrency) as write_pool:
+            parse_task = asyncio.create_task(self._parse_stage(jobs, parse_pool, embed_queue))
+            embed_tasks = [
+                asyncio.create_task(self._embed_worker(embed_queue, write_queue))
+                for _ in range(self.embed_concurrency)
+            ]
+            write_tasks = [
+                asyncio.create_task(self._write_worker(write_queue, write_pool))
+                for _ in range(self.write_concurrency)
+            ]
+
+            # Shut stages down in order once their input is exhausted
+            await parse_task
+            for _ in embed_tasks:
+                await embed_queue.put(_DONE)
+            await asyncio.gather(*embed_tasks)
+            self.metrics["embed"].finished = time.monotonic()
+
+            for _ in write_tasks:
+                await write_queue.put(_DONE)
+            await asyncio.gather(*write_tasks)
+            self.metrics["write"].finished = time.monotonic()
+
+        # Persist local indexes once, after every chunk has been written
+        self.pipeline.save_indexes()
+        return self.metrics
+
+    async def _parse_stage(self,
+                           jobs: List[ManualJob],
+                           parse_pool: ProcessPoolExecutor,
+                           embed_queue: asyncio.Queue):
+        """Parse manuals in worker processes and queue their chunks in batches."""
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics["parse"]
+        # Workers return their new PDF hashes; only this process writes hashes.json
+        hash_memo = PageCache(PAGE_CACHE_DIR) if self.use_page_cache else None
+
+        async def parse_one(job: ManualJob):
+            started = time.monotonic()
+            try:
+                documents, new_hashes = await loop.run_in_executor(
+                    parse_pool,
+                    parse_manual,
+                    job,
+                    self.chunk_size,
+                    self.chunk_overlap,
+                    self.use_page_cache
+                )
+            except Exception as e:
+                metrics.errors += 1
+                self.failures.append(f"{Path(job.pdf_path).name}: parse failed: {e}")
+                return
+            if hash_memo is not None:
+                hash_memo.merge_hashes(new_hashes)
+            metrics.busy_seconds += time.monotonic() - started
+            metrics.items += 1
+            metrics.chunks += len(documents)
+            print(f"Parsed {Path(job.pdf_path).name} ({len(documents)} chunks)")
+
+            # Split into embedding-sized batches
+            for start in range(0, len(documents), self.embed_batch_size):
+                self.metrics["embed"].record_queue_depth(embed_queue.qsize())
+                await embed_queue.put(documents[start:start + self.embed_batch_size])
+
+        # Keep every parse worker busy without submitting the whole library at once
+        semaphore = asyncio.Semaphore(self.parse_workers)
+
+        async def bounded(job: ManualJob):
+            async with semaphore:
+                await parse_one(job)
+
+        await asyncio.gather(*(bounded(job) for job in jobs))
+        if hash_memo is not None:
+            hash_memo.save_hashes()
+        metrics.finished = time.monotonic()
+
+    async def _embed_worker(self, embed_queue: asyncio.Queue, write_queue: asyncio.Queue):
+        """Embed queued chunk batches, respecting the request rate limit."""
+        metrics = self.metrics["embed"]
+        while True:
+            batch = await embed_queue.get()
+            if batch is _DONE:
+                return
+
+            await self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                vectors = await self.pipeline.embeddings.aembed_documents([doc.content for doc in batch])
+            except Exception as e:
+                metrics.errors += 1
+                self.failures.append(f"embedding batch of {len(batch)} chunks failed: {e}")
+                continue
+            metrics.busy_seconds += time.monotonic() - started
+            metrics.items += 1
+            metrics.chunks += len(batch)
+
+            self.metrics["write"].record_queue_depth(write_queue.qsize())
+            await write_queue.put((batch, vectors))
+
+    async def _write_worker(self, write_queue: asyncio.Queue, write_pool: ThreadPoolExecutor):
+        """Upsert embedded batches into the vector store and the local indexes."""
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics["write"]
+        while True:
+            item = await write_queue.get()
+            if item is _DONE:
+                return
+
+            batch, vectors = item
+            started = time.monotonic()
+            try:
+                await loop.run_in_executor(write_pool, self.pipeline.upload_vectors, batch, vectors)
+            except Exception as e:
+                metrics.errors += 1
+                self.failures.append(f"store write of {len(batch)} chunks failed: {e}")
+                continue
+
+            # Local indexes are updated on the event loop thread, one batch at a time
+            self.pipeline.index_locally(batch, vectors)
+            metrics.busy_seconds += time.monotonic() - started
+            metrics.items += 1
+            metrics.chunks += len(batch)
+
+    def format_metrics(self) -> str:
+        """
+        Format per-stage metrics as a small table.
+        The stage with the highest utilization is the bottleneck.
+
+        Returns:
+            Multi-line report string
+        """
+        lines = [
+            f"{'stage':<8}{'items':>7}{'chunks':>8}{'busy s':>9}{'util':>7}"
+            f"{'chunks/s':>10}{'avg queue':>11}{'max queue':>11}{'errors':>8}"
+        ]
+        for metrics in self.metrics.values():
+            lines.append(
+                f"{metrics.name:<8}{metrics.items:>7}{metrics.chunks:>8}"
+                f"{metrics.busy_seconds:>9.2f}{metrics.utilization:>7.0%}{metrics.chunks_per_second:>10.1f}"
+                f"{metrics.average_queue_depth:>11.1f}{metrics.max_queue_depth:>11}{metrics.errors:>8}"
+            )
+
+        if self.metrics:
+            bottleneck = max(self.metrics.values(), key=lambda m: m.utilization)
+            lines.append(f"Bottleneck: {bottleneck.name}")
+        return "\n".join(lines)
@@ -0,0 +1,238 @@
+"""
+InvertedIndex - Keyword index over manual chunks for BM25 retrieval.
+Built at ingestion time so exact tokens (model numbers, alarm codes,
+part numbers) can be found without an embedding call.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+from pathlib import Path
+import hashlib
+import json
+import math
+import re
+
+from embeddings.local_index import metadata_matches
+
+
+# Default on-disk location, next to the other ingestion outputs
+INVERTED_INDEX_PATH = Path("manuals/processed/inverted_index.json")
+
+# Words joined by "-", "/" or "." stay together (e.g. "zb58kce-tfd", "10-6")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Standard BM25 tuning constants
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search terms.
+    Compound tokens such as "ZB58KCE-TFD" are kept whole and also
+    split into their parts, so "zb58kce" alone still matches.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms (with repeats, for term frequency counting)
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def make_chunk_id(source: str, page: int, content: str) -> str:
+    """
+    Build a stable ID for a chunk, shared by the keyword and vector indexes.
+
+    Args:
+        source: Manual reference the chunk came from
+        page: Page number of the chunk
+        content: Chunk text
+
+    Returns:
+        Short hex digest identifying the chunk
+    """
+    digest = hashlib.sha1(f"{source}|{page}|{content}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def is_exact_token_query(query: str) -> bool:
+    """
+    Check whether a query looks like a part/model/alarm code lookup.
+    These are short queries where at least one word contains a digit,
+    e.g. "ZB58KCE-TFD" or "AKV 10-6".
+
+    Args:
+        query: Search query
+
+    Returns:
+        True if keyword matching alone should answer the query
+    """
+    words = query.split()
+    if not words or len(words) > 4:
+        return False
+    return any(any(ch.isdigit() for ch in word) for word in words)
+
+
+class InvertedIndex:
+    """
+    Compact term -> posting list index with BM25 scoring.
+    Each posting maps a chunk number to the term frequency in that chunk.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: List[int] = []
+        self.chunks: List[Dict] = []  # {"chunk_id", "content", "metadata"}
+        self.chunk_numbers: Dict[str, int] = {}  # chunk_id -> position in chunks
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_chunk(self, chunk_id: str, content: str, metadata: Dict):
+        """
+        Add one chunk to the index. Chunks already indexed are skipped.
+
+        Args:
+            chunk_id: Stable chunk ID (see make_chunk_id)
+            content: Chunk text
+            metadata: Chunk metadata (source, page, component_type, ...)
+        """
+        if chunk_id in self.chunk_numbers:
+            return
+
+        number = len(self.chunks)
+        self.chunks.append({"chunk_id": chunk_id, "content": content, "metadata": metadata})
+        self.chunk_numbers[chunk_id] = number
+
+        # Count terms and append to each term's posting list
+        terms = tokenize(content)
+        for term, frequency in Counter(terms).items():
+            self.postings.setdefault(term, {})[number] = frequency
+
+        self.doc_lengths.append(len(terms))
+        self.total_length += len(terms)
+
+    def add_chunks(self, chunks: Iterable[Tuple[str, str, Dict]]):
+        """
+        Add several chunks to the index.
+
+        Args:
+            chunks: Iterable of (chunk_id, content, metadata) tuples
+        """
+        for chunk_id, content, metadata in chunks:
+            self.add_chunk(chunk_id, content, metadata)
+
+    def search(self,
+               query: str,
+               k: int = 5,
+               filter: Optional[Dict] = None) -> List[Tuple[Dict, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Search query
+            k: Maximum number of results to return
+            filter: Optional metadata values every result must match
+
+        Returns:
+            List of (chunk, score) tuples, best first
+        """
+        if not self.chunks:
+            return []
+
+        doc_count = len(self.chunks)
+        average_length = self.total_length / doc_count or 1.0
+        scores: Dict[int, float] = {}
+
+        # Only chunks that share a term with the query are ever touched
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+
+            idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for number, frequency in posting.items():
+                length_norm = 1 - BM25_B + BM25_B * self.doc_lengths[number] / average_length
+                term_score = idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                scores[number] = scores.get(number, 0.0) + term_score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+        results = []
+        for number, score in ranked:
+            chunk = self.chunks[number]
+            if filter and not metadata_matches(chunk["metadata"], filter):
+                continue
+            results.append((chunk, score))
+            if len(results) >= k:
+                break
+
+        return results
+
+    def save(self, path: Path = INVERTED_INDEX_PATH):
+        """
+        Save the index as compact JSON.
+
+        Args:
+            path: Output file path
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = {
+            "chunks": self.chunks,
+            "doc_lengths": self.doc_lengths,
+            # Posting lists stored as flat [chunk, tf, chunk, tf, ...] arrays
+            "postings": {
+                term: [value for pair in posting.items() for value in pair]
+                for term, posting in self.postings.items()
+            },
+        }
+
+        # Write then rename so readers never see a half-written file
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path = INVERTED_INDEX_PATH) -> "InvertedIndex":
+        """
+        Load an index saved with save(). Returns an empty index if missing.
+
+        Args:
+            path: Index file path
+
+        Returns:
+            InvertedIndex instance
+        """
+        index = cls()
+        path = Path(path)
+        if not path.exists():
+            return index
+
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        index.chunks = data["chunks"]
+        index.doc_lengths = data["doc_lengths"]
+        index.total_length = sum(index.doc_lengths)
+        index.chunk_numbers = {
+            chunk["chunk_id"]: number for number, chunk in enumerate(index.chunks)
+        }
+        index.postings = {
+            term: dict(zip(flat[0::2], flat[1::2]))
+            for term, flat in data["postings"].items()
+        }
+        return index
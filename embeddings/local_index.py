@@ -0,0 +1,570 @@
+"""
+LocalVectorIndex - In-process vector index over manual chunks.
+Keeps embeddings in a NumPy matrix and narrows filtered queries with
+per-field metadata indexes before any vectors are scored.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import time
+
+import numpy as np
+
+from embeddings.quantization import QUANTIZERS, load_quantizer, save_quantizer
+
+
+# Default on-disk location, next to the other ingestion outputs
+LOCAL_INDEX_DIR = Path("manuals/processed/vector_index")
+
+# Metadata fields with an exact-match index (value -> rows)
+INDEXED_FIELDS = ("component_type", "source", "manufacturer", "model")
+
+# Metadata fields that accept a (low, high) inclusive range filter
+RANGE_FIELDS = ("page",)
+
+# Vector storage modes: full floats, or compressed codes plus a float re-rank
+STORAGE_MODES = ("float32", "int8", "pq")
+
+# Quantized search re-ranks this many candidates per requested result
+DEFAULT_RERANK_FACTORS = {"float32": 1, "int8": 4, "pq": 10}
+
+
+@dataclass
+class IndexedChunk:
+    """A stored chunk, shaped like a LangChain Document for VectorSearch."""
+    page_content: str
+    metadata: Dict
+
+
+def metadata_matches(metadata: Dict, filter: Dict) -> bool:
+    """
+    Check one chunk's metadata against a filter.
+    Range fields take a (low, high) pair; other fields must match exactly.
+
+    Args:
+        metadata: Chunk metadata
+        filter: Field -> value (or (low, high) for range fields)
+
+    Returns:
+        True if the chunk passes every filter condition
+    """
+    for field, expected in filter.items():
+        value = metadata.get(field)
+        if field in RANGE_FIELDS and isinstance(expected, (tuple, list)):
+            low, high = expected
+            if value is None or not low <= value <= high:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class MetadataIndex:
+    """
+    Per-field metadata indexes used to pre-filter rows before scoring.
+    Exact-match fields map each value to its list of rows; range fields keep
+    rows sorted by value for binary search. Combined conditions are
+    intersected as bitmaps (a Python int with bit i set for row i).
+    """
+
+    def __init__(self):
+        """Initialize empty field indexes."""
+        self.row_count = 0
+        self.value_rows: Dict[str, Dict] = {field: {} for field in INDEXED_FIELDS}
+        self.range_values: Dict[str, List[float]] = {field: [] for field in RANGE_FIELDS}
+        self._range_sorted: Dict[str, Optional[Tuple[np.ndarray, np.ndarray]]] = {
+            field: None for field in RANGE_FIELDS
+        }
+        self._bitmaps: Dict[Tuple[str, object], int] = {}
+
+    def add(self, metadata: Dict):
+        """
+        Index the metadata of the next row.
+
+        Args:
+            metadata: Chunk metadata
+        """
+        for field in INDEXED_FIELDS:
+            value = metadata.get(field)
+            if value is not None:
+                self.value_rows[field].setdefault(value, []).append(self.row_count)
+
+        for field in RANGE_FIELDS:
+            value = metadata.get(field)
+            # Rows without a value sort last and never match a range
+            self.range_values[field].append(np.inf if value is None else value)
+            self._range_sorted[field] = None
+
+        # Cached bitmaps are rebuilt on demand after new rows arrive
+        self._bitmaps.clear()
+        self.row_count += 1
+
+    def _value_bitmap(self, field: str, value) -> int:
+        """Return (and cache) the bitmap of rows where field == value."""
+        key = (field, value)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            rows = self.value_rows[field].get(value, [])
+            bitmap = self._rows_to_bitmap(np.asarray(rows, dtype=np.int64)) if rows else 0
+            self._bitmaps[key] = bitmap
+        return bitmap
+
+    def _range_rows(self, field: str, low: float, high: float) -> np.ndarray:
+        """Return the rows whose field value lies within [low, high]."""
+        # Sort once after new rows arrive, then every range is two binary searches
+        if self._range_sorted[field] is None:
+            values = np.asarray(self.range_values[field], dtype=np.float64)
+            order = np.argsort(values, kind="stable")
+            self._range_sorted[field] = (values[order], order)
+
+        sorted_values, order = self._range_sorted[field]
+        start = np.searchsorted(sorted_values, low, side="left")
+        stop = np.searchsorted(sorted_values, high, side="right")
+        return np.sort(order[start:stop])
+
+    def _rows_to_bitmap(self, rows: np.ndarray) -> int:
+        """Convert an array of row numbers to a bitmap."""
+        mask = np.zeros(self.row_count, dtype=bool)
+        mask[rows] = True
+        return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+    def _bitmap_to_rows(self, bitmap: int) -> np.ndarray:
+        """Convert a bitmap to a sorted array of row numbers."""
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        raw = np.frombuffer(bitmap.to_bytes((self.row_count + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder="little")[:self.row_count])
+
+    def candidate_rows(self, filter: Dict) -> Tuple[Optional[np.ndarray], Dict]:
+        """
+        Narrow the rows to those matching the indexed part of a filter.
+
+        Args:
+            filter: Field -> value (or (low, high) for range fields)
+
+        Returns:
+            Tuple of (candidate rows, or None for "all rows"; leftover
+            filter conditions that have no index and must be checked per row)
+        """
+        exact = []
+        range_rows = []
+        leftover = {}
+
+        for field, expected in filter.items():
+            if field in INDEXED_FIELDS:
+                exact.append((field, expected))
+            elif field in RANGE_FIELDS and isinstance(expected, (tuple, list)):
+                range_rows.append(self._range_rows(field, *expected))
+            else:
+                leftover[field] = expected
+
+        # A single condition uses its row list directly, so the cost
+        # is proportional to the number of matching rows
+        if len(exact) + len(range_rows) == 0:
+            return None, leftover
+        if len(exact) == 1 and not range_rows:
+            field, value = exact[0]
+            return np.asarray(self.value_rows[field].get(value, []), dtype=np.int64), leftover
+        if len(range_rows) == 1 and not exact:
+            return range_rows[0], leftover
+
+        # Combined conditions: intersect bitmaps with a bitwise AND
+        bitmaps = [self._value_bitmap(field, value) for field, value in exact]
+        bitmaps.extend(self._rows_to_bitmap(rows) for rows in range_rows)
+        combined = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            combined &= bitmap
+
+        return self._bitmap_to_rows(combined), leftover
+
+
+class LocalVectorIndex:
+    """
+    In-process vector index with metadata pre-filtering.
+    Provides the same search methods VectorSearch uses on SupabaseVectorStore.
+    In "int8" or "pq" storage mode, candidates are scored from compressed
+    codes and only the best few are re-ranked with the float vectors,
+    which stay memory-mapped on disk when the index is loaded.
+    """
+
+    # VectorSearch can pass (low, high) page ranges straight through
+    supports_range_filters = True
+
+    def __init__(self,
+                 dimensions: Optional[int] = None,
+                 storage: str = "float32",
+                 rerank_factor: Optional[int] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimensions: Embedding size (taken from the first vectors if omitted)
+            storage: "float32", "int8" or "pq"
+            rerank_factor: Candidates re-ranked per result in quantized modes
+                (defaults to DEFAULT_RERANK_FACTORS for the storage mode)
+        """
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"Unsupported storage mode: {storage}")
+
+        self.dimensions = dimensions
+        self.embedding_model: Optional[str] = None  # Model that produced the vectors, if recorded
+        self.storage = storage
+        self.rerank_factor = rerank_factor or DEFAULT_RERANK_FACTORS[storage]
+        self.quantizer = QUANTIZERS[storage]() if storage != "float32" else None
+        self.vectors = np.empty((0, dimensions or 0), dtype=np.float32)
+        self.chunks: List[IndexedChunk] = []
+        self.chunk_rows: Dict[str, int] = {}
+        self.metadata_index = MetadataIndex()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self,
+            vectors: Sequence[Sequence[float]],
+            contents: Sequence[str],
+            metadatas: Sequence[Dict],
+            embedding_model: Optional[str] = None):
+        """
+        Add chunks and their embeddings. Chunks with a known chunk_id are skipped.
+
+        Args:
+            vectors: Embedding for each chunk
+            contents: Text of each chunk
+            metadatas: Metadata of each chunk (chunk_id, source, page, ...)
+            embedding_model: Model that produced the vectors; recorded with
+                the index, and must match the model of vectors already stored
+        """
+        if embedding_model is not None and self.embedding_model not in (None, embedding_model) and len(self):
+            raise ValueError(
+                f"Index holds {self.embedding_model} embeddings; cannot add {embedding_model} embeddings"
+            )
+        if len(vectors) and self.dimensions is not None and len(self) and len(vectors[0]) != self.dimensions:
+            raise ValueError(f"Index holds {self.dimensions}-dimension embeddings, got {len(vectors[0])}")
+        if embedding_model is not None:
+            self.embedding_model = embedding_model
+
+        new_vectors = []
+        for vector, content, metadata in zip(vectors, contents, metadatas):
+            chunk_id = metadata.get("chunk_id")
+            if chunk_id is not None and chunk_id in self.chunk_rows:
+                continue
+
+            if chunk_id is not None:
+                self.chunk_rows[chunk_id] = len(self.chunks)
+            self.chunks.append(IndexedChunk(page_content=content, metadata=metadata))
+            self.metadata_index.add(metadata)
+            new_vectors.append(vector)
+
+        if not new_vectors:
+            return
+
+        # Store unit-length rows so a dot product is cosine similarity
+        matrix = np.asarray(new_vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        if self.dimensions is None:
+            self.dimensions = matrix.shape[1]
+        existing = self.vectors if len(self.vectors) else np.empty((0, self.dimensions), dtype=np.float32)
+        self.vectors = np.vstack([existing, matrix])
+
+        if self.quantizer is not None:
+            if self.quantizer.wants_training(len(self.vectors)):
+                # Relearn from everything stored, not just this batch, and re-encode it all
+                everything = np.asarray(self.vectors, dtype=np.float32)
+                self.quantizer.train(everything)
+                self.quantizer.add(everything)
+            else:
+                self.quantizer.add(matrix)
+
+    def quantize(self, storage: str, **quantizer_options) -> "LocalVectorIndex":
+        """
+        Switch the index to a storage mode, encoding every stored vector.
+
+        Args:
+            storage: "float32", "int8" or "pq"
+            **quantizer_options: Passed to the quantizer (e.g. subvectors=32 for pq)
+
+        Returns:
+            This index, for chaining
+        """
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"Unsupported storage mode: {storage}")
+
+        self.storage = storage
+        self.rerank_factor = DEFAULT_RERANK_FACTORS[storage]
+        self.quantizer = None
+        if storage != "float32":
+            self.quantizer = QUANTIZERS[storage](**quantizer_options)
+            if len(self.vectors):
+                matrix = np.asarray(self.vectors, dtype=np.float32)
+                self.quantizer.train(matrix)
+                self.quantizer.add(matrix)
+        return self
+
+    def memory_bytes(self) -> int:
+        """
+        Bytes of vector data held in memory. Memory-mapped float vectors
+        only count in float32 mode, where every search reads all of them.
+
+        Returns:
+            Approximate resident size of the vector data
+        """
+        if self.quantizer is None:
+            return self.vectors.nbytes
+        resident_floats = 0 if isinstance(self.vectors, np.memmap) else self.vectors.nbytes
+        return self.quantizer.memory_bytes() + resident_floats
+
+    def _filter_rows(self, filter: Optional[Dict]) -> Tuple[Optional[np.ndarray], Dict]:
+        """Resolve a filter to candidate rows plus any unindexed conditions."""
+        if not filter:
+            return None, {}
+        return self.metadata_index.candidate_rows(filter)
+
+    def _top_k(self,
+               scores: np.ndarray,
+               rows: Optional[np.ndarray],
+               k: int,
+               leftover: Dict) -> List[Tuple[IndexedChunk, float]]:
+        """Pick the best k rows from one query's scores."""
+        if leftover:
+            # Unindexed conditions: walk rows best-first until k pass
+            order = np.argsort(-scores)
+        else:
+            k_eff = min(k, len(scores))
+            if k_eff == 0:
+                return []
+            order = np.argpartition(-scores, k_eff - 1)[:k_eff]
+            order = order[np.argsort(-scores[order])]
+
+        results = []
+        for position in order:
+            row = int(rows[position]) if rows is not None else int(position)
+            chunk = self.chunks[row]
+            if leftover and not metadata_matches(chunk.metadata, leftover):
+                continue
+            results.append((chunk, float(scores[position])))
+            if len(results) >= k:
+                break
+        return results
+
+    def similarity_search_by_vector_with_relevance_scores(
+            self,
+            query: Sequence[float],
+            k: int = 4,
+            filter: Optional[Dict] = None) -> List[Tuple[IndexedChunk, float]]:
+        """
+        Find the chunks most similar to a query embedding.
+        Filtered queries only score rows that pass the metadata indexes.
+
+        Args:
+            query: Query embedding
+            k: Maximum number of results to return
+            filter: Optional metadata filter
+
+        Returns:
+            List of (chunk, cosine similarity) tuples, best first
+        """
+        return self.similarity_search_many_by_vector([query], k=k, filter=filter)[0]
+
+    def similarity_search_many_by_vector(
+            self,
+            queries: Sequence[Sequence[float]],
+            k: int = 4,
+            filter: Optional[Dict] = None) -> List[List[Tuple[IndexedChunk, float]]]:
+        """
+        Find the most similar chunks for several query embeddings in one
+        matrix multiplication.
+
+        Args:
+            queries: Query embeddings
+            k: Maximum number of results per query
+            filter: Optional metadata filter applied to every query
+
+        Returns:
+            One list of (chunk, cosine similarity) tuples per query
+        """
+        if not len(self.chunks) or not len(queries):
+            return [[] for _ in queries]
+
+        rows, leftover = self._filter_rows(filter)
+        if rows is not None and not len(rows):
+            return [[] for _ in queries]
+
+        query_matrix = np.asarray(queries, dtype=np.float32)
+        if query_matrix.shape[1] != self.dimensions:
+            raise ValueError(
+                f"Query embeddings have {query_matrix.shape[1]} dimensions but the index holds "
+                f"{self.dimensions} ({self.embedding_model or 'unrecorded model'}); "
+                "search with the model the index was built with"
+            )
+        query_matrix /= np.maximum(np.linalg.norm(query_matrix, axis=1, keepdims=True), 1e-12)
+
+        if self.quantizer is not None:
+            return self._quantized_search(query_matrix, rows, k, leftover)
+
+        candidates = self.vectors if rows is None else self.vectors[rows]
+        scores = query_matrix @ candidates.T
+
+        return [self._top_k(query_scores, rows, k, leftover) for query_scores in scores]
+
+    def _quantized_search(self,
+                          query_matrix: np.ndarray,
+                          rows: Optional[np.ndarray],
+                          k: int,
+                          leftover: Dict) -> List[List[Tuple[IndexedChunk, float]]]:
+        """
+        Score candidates from compressed codes, then re-rank the best
+        k * rerank_factor of them with exact float dot products.
+        """
+        if leftover:
+            # Unindexed conditions are resolved up front so the re-rank pool only holds matches
+            pool = range(len(self.chunks)) if rows is None else rows
+            rows = np.asarray(
+                [row for row in pool if metadata_matches(self.chunks[row].metadata, leftover)],
+                dtype=np.int64
+            )
+            if not len(rows):
+                return [[] for _ in query_matrix]
+
+        approximate = self.quantizer.scores(query_matrix, rows)
+        pool_size = min(approximate.shape[1], k * self.rerank_factor)
+
+        results = []
+        for query_vector, query_scores in zip(query_matrix, approximate):
+            pool = np.argpartition(-query_scores, pool_size - 1)[:pool_size]
+            pool_rows = np.sort(pool if rows is None else rows[pool])
+            exact = np.asarray(self.vectors[pool_rows], dtype=np.float32) @ query_vector
+            results.append(self._top_k(exact, pool_rows, k, {}))
+        return results
+
+    def recall_report(self,
+                      queries: Optional[np.ndarray] = None,
+                      k: int = 10,
+                      storages: Sequence[str] = ("int8", "pq"),
+                      sample_size: int = 200,
+                      seed: int = 0) -> List[Dict]:
+        """
+        Compare quantized storage modes against exact float search.
+
+        Args:
+            queries: Query embeddings (defaults to a sample of stored vectors)
+            k: Results per query used for recall@k
+            storages: Storage modes to evaluate
+            sample_size: Number of stored vectors sampled when queries is None
+            seed: Random seed for the query sample
+
+        Returns:
+            One dictionary per mode with recall, memory and query latency
+        """
+        if queries is None:
+            rng = np.random.default_rng(seed)
+            picks = rng.choice(len(self.chunks), min(sample_size, len(self.chunks)), replace=False)
+            queries = np.asarray(self.vectors[np.sort(picks)], dtype=np.float32)
+
+        def run(index: "LocalVectorIndex") -> Tuple[List[set], float]:
+            started = time.perf_counter()
+            hits = [
+                {id(chunk) for chunk, _ in result}
+                for result in index.similarity_search_many_by_vector(queries, k=k)
+            ]
+            return hits, (time.perf_counter() - started) * 1000 / len(queries)
+
+        # Exact float search is the ground truth
+        exact = LocalVectorIndex(storage="float32")
+        exact.vectors, exact.chunks = self.vectors, self.chunks
+        truth, exact_ms = run(exact)
+        report = [{
+            "storage": "float32",
+            "recall_at_k": 1.0,
+            "memory_bytes": self.vectors.nbytes,
+            "ms_per_query": round(exact_ms, 3),
+        }]
+
+        for storage in storages:
+            candidate = LocalVectorIndex(storage="float32")
+            candidate.vectors, candidate.chunks = self.vectors, self.chunks
+            candidate.quantize(storage)
+            found, candidate_ms = run(candidate)
+            recall = np.mean([len(a & b) / max(len(a), 1) for a, b in zip(truth, found)])
+            report.append({
+                "storage": storage,
+                "recall_at_k": round(float(recall), 4),
+                "memory_bytes": candidate.quantizer.memory_bytes(),
+                "ms_per_query": round(candidate_ms, 3),
+            })
+        return report
+
+    def save(self, directory: Path = LOCAL_INDEX_DIR):
+        """
+        Save vectors (as .npy), chunks and the embedding model (as JSON) to a directory.
+
+        Args:
+            directory: Output directory
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.save(directory / "vectors.npy", self.vectors)
+        with open(directory / "index.json", "w") as f:
+            json.dump({"embedding_model": self.embedding_model, "dimensions": self.dimensions}, f)
+        quantizer_path = directory / "quantizer.npz"
+        if self.quantizer is not None:
+            save_quantizer(self.quantizer, quantizer_path)
+        elif quantizer_path.exists():
+            quantizer_path.unlink()
+        with open(directory / "chunks.json", "w") as f:
+            json.dump(
+                [{"content": chunk.page_content, "metadata": chunk.metadata} for chunk in self.chunks],
+                f,
+                separators=(",", ":")
+            )
+
+    @classmethod
+    def load(cls,
+             directory: Path = LOCAL_INDEX_DIR,
+             storage: str = "float32") -> "LocalVectorIndex":
+        """
+        Load an index saved with save(). Returns an empty index if missing.
+        In quantized modes the float vectors are memory-mapped rather than
+        read into RAM; only re-ranked rows are ever paged in.
+
+        Args:
+            directory: Index directory
+            storage: "float32", "int8" or "pq"
+
+        Returns:
+            LocalVectorIndex instance
+        """
+        index = cls(storage=storage)
+        directory = Path(directory)
+        if not (directory / "vectors.npy").exists():
+            return index
+
+        with open(directory / "chunks.json", "r") as f:
+            stored = json.load(f)
+
+        if storage == "float32":
+            index.vectors = np.load(directory / "vectors.npy")
+        else:
+            index.vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+
+            # Reuse saved codes when they match, otherwise encode now
+            quantizer_path = directory / "quantizer.npz"
+            saved = load_quantizer(quantizer_path) if quantizer_path.exists() else None
+            if (saved is not None and saved.name == storage and len(saved.codes) == len(index.vectors)
+                    and not saved.wants_training(len(index.vectors))):
+                index.quantizer = saved
+            else:
+                index.quantize(storage)
+        index.dimensions = index.vectors.shape[1] if index.vectors.ndim == 2 else None
+        if (directory / "index.json").exists():
+            with open(directory / "index.json", "r") as f:
+                index.embedding_model = json.load(f).get("embedding_model")
+        for row, item in enumerate(stored):
+            metadata = item["metadata"]
+            index.chunks.append(IndexedChunk(page_content=item["content"], metadata=metadata))
+            index.metadata_index.add(metadata)
+            if metadata.get("chunk_id") is not None:
+                index.chunk_rows[metadata["chunk_id"]] = row
+        return index
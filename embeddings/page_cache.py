@@ -0,0 +1,298 @@
+"""
+PageCache - Persistent cache of extracted PDF page text.
+Stores each manual's pages in one memory-mappable file under
+manuals/processed/pages, keyed by the PDF's content hash and the loader
+version, so re-chunking never has to parse the PDF again.
+"""
+
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+from pathlib import Path
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# Default cache location, next to the other ingestion outputs
+PAGE_CACHE_DIR = Path("manuals/processed/pages")
+
+# Bump when PDF extraction changes, so old cache files are ignored
+LOADER_VERSION = "1"
+
+# File layout: MAGIC, 8-byte header length, JSON header, UTF-8 page text
+MAGIC = b"HVPAGES1"
+HEADER_SIZE = struct.Struct("<Q")
+
+# Bytes read per step when hashing a PDF
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class CachedManual:
+    """
+    Read-only view of one cached manual. Page text is sliced straight
+    out of a memory map, so opening a manual does not read its text.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Open a cache file.
+
+        Args:
+            path: Path to a .pages file written by PageCache
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a page cache file: {self.path}")
+
+        header_start = len(MAGIC) + HEADER_SIZE.size
+        (header_length,) = HEADER_SIZE.unpack_from(self._map, len(MAGIC))
+        self.header = json.loads(self._map[header_start:header_start + header_length])
+        self._text_start = header_start + header_length
+
+    def __len__(self) -> int:
+        return len(self.header["pages"])
+
+    def page_text(self, number: int) -> str:
+        """
+        Get the text of one page.
+
+        Args:
+            number: Page position in the cache file (0-based)
+
+        Returns:
+            Page text
+        """
+        page = self.header["pages"][number]
+        start = self._text_start + page["offset"]
+        return self._map[start:start + page["length"]].decode("utf-8")
+
+    def documents(self) -> List["Document"]:
+        """
+        Get every page as a LangChain Document with its layout metadata.
+
+        Returns:
+            List of Document objects, one per extracted page or element
+        """
+        from langchain_core.documents import Document
+
+        return [
+            Document(page_content=self.page_text(number), metadata=page["metadata"])
+            for number, page in enumerate(self.header["pages"])
+        ]
+
+    def close(self):
+        """Release the memory map."""
+        self._map.close()
+
+
+class PageCache:
+    """
+    Cache of extracted page text keyed by PDF content hash and loader version.
+    """
+
+    def __init__(self,
+                 cache_dir: Path = PAGE_CACHE_DIR,
+                 loader_version: str = LOADER_VERSION,
+                 autosave_hashes: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding .pages files
+            loader_version: Extraction version stored in the cache key
+            autosave_hashes: Write the hash memo as soon as cache lookups add
+                to it; worker processes pass False and hand take_new_hashes()
+                to the parent, so only one process writes hashes.json
+        """
+        self.cache_dir = Path(cache_dir)
+        self.loader_version = loader_version
+        self.autosave_hashes = autosave_hashes
+        self._hash_index_path = self.cache_dir / "hashes.json"
+        self._hash_index: Optional[Dict[str, List]] = None
+        self._hash_index_dirty = False
+        self._new_hashes: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def _load_hash_index(self) -> Dict[str, List]:
+        """Load the path -> [size, mtime_ns, sha256] memo used to skip re-hashing."""
+        if self._hash_index is None:
+            try:
+                with open(self._hash_index_path, "r") as f:
+                    self._hash_index = json.load(f)
+            except (OSError, ValueError):
+                self._hash_index = {}
+        return self._hash_index
+
+    def pdf_hash(self, pdf_path: str, save: bool = True, stat: Optional[os.stat_result] = None) -> str:
+        """
+        Get the SHA-256 of a PDF. Unchanged files (same size and
+        modification time) reuse the hash recorded last time.
+
+        Args:
+            pdf_path: Path to the PDF file
+            save: Write the hash memo to disk now; pass False when hashing
+                many files and call save_hashes() once at the end
+            stat: os.stat() result for pdf_path, if the caller already has it
+
+        Returns:
+            Hex digest of the file contents
+        """
+        stat = stat or os.stat(pdf_path)
+        key = os.path.abspath(pdf_path)
+
+        with self._lock:
+            memo = self._load_hash_index().get(key)
+        if memo and memo[0] == stat.st_size and memo[1] == stat.st_mtime_ns:
+            return memo[2]
+
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        sha = digest.hexdigest()
+
+        with self._lock:
+            entry = [stat.st_size, stat.st_mtime_ns, sha]
+            self._load_hash_index()[key] = entry
+            self._new_hashes[key] = entry
+            self._hash_index_dirty = True
+        if save:
+            self.save_hashes()
+        return sha
+
+    def take_new_hashes(self) -> Dict[str, List]:
+        """
+        Get the hash memo entries added since the last call (e.g. to return
+        them from a worker process for the parent to merge_hashes()).
+
+        Returns:
+            Dictionary of path -> [size, mtime_ns, sha256]
+        """
+        with self._lock:
+            entries, self._new_hashes = self._new_hashes, {}
+        return entries
+
+    def merge_hashes(self, entries: Dict[str, List]):
+        """
+        Add hash memo entries computed elsewhere; call save_hashes() to write them.
+
+        Args:
+            entries: Result of another PageCache's take_new_hashes()
+        """
+        if not entries:
+            return
+        with self._lock:
+            self._load_hash_index().update(entries)
+            self._hash_index_dirty = True
+
+    def save_hashes(self):
+        """Write the PDF hash memo to disk if any hash was added."""
+        with self._lock:
+            if not self._hash_index_dirty:
+                return
+            index = self._load_hash_index()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = self._hash_index_path.with_name(f"hashes.{os.getpid()}.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(index, f)
+            temp_path.replace(self._hash_index_path)
+            self._hash_index_dirty = False
+
+    def cache_path(self, pdf_path: str) -> Path:
+        """
+        Get the cache file path for a PDF.
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            Path of the .pages file for this PDF and loader version
+        """
+        sha = self.pdf_hash(pdf_path, save=self.autosave_hashes)
+        return self.cache_dir / f"{sha}-v{self.loader_version}.pages"
+
+    def get(self, pdf_path: str) -> Optional[CachedManual]:
+        """
+        Open the cached pages for a PDF if they exist.
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            CachedManual, or None on a cache miss
+        """
+        path = self.cache_path(pdf_path)
+        return CachedManual(path) if path.exists() else None
+
+    def put(self, pdf_path: str, documents: List["Document"]) -> Path:
+        """
+        Write extracted pages for a PDF to the cache.
+
+        Args:
+            pdf_path: Path to the PDF file
+            documents: Extracted pages (LangChain Documents)
+
+        Returns:
+            Path of the written cache file
+        """
+        path = self.cache_path(pdf_path)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Concatenate page text and record where each page starts
+        pages = []
+        blobs = []
+        offset = 0
+        for document in documents:
+            blob = document.page_content.encode("utf-8")
+            pages.append({"offset": offset, "length": len(blob), "metadata": document.metadata})
+            blobs.append(blob)
+            offset += len(blob)
+
+        header = json.dumps({
+            "pdf": Path(pdf_path).name,
+            "loader_version": self.loader_version,
+            "pages": pages,
+        }, separators=(",", ":"), default=str).encode("utf-8")
+
+        # Write then rename so a crash never leaves a truncated cache file
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(HEADER_SIZE.pack(len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        temp_path.replace(path)
+        return path
+
+    def load_pages(self,
+                   pdf_path: str,
+                   loader: Callable[[str], List["Document"]]) -> List["Document"]:
+        """
+        Get a PDF's pages from the cache, parsing and caching them on a miss.
+
+        Args:
+            pdf_path: Path to the PDF file
+            loader: Function that extracts pages from a PDF path
+
+        Returns:
+            List of page Documents
+        """
+        cached = self.get(pdf_path)
+        if cached is not None:
+            try:
+                return cached.documents()
+            finally:
+                cached.close()
+
+        documents = loader(pdf_path)
+        self.put(pdf_path, documents)
+        return documents
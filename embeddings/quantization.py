@@ -0,0 +1,293 @@
+"""
+Quantization - Compressed storage for LocalVectorIndex embeddings.
+Scalar int8 and product quantization trade a little recall for a large
+cut in memory; LocalVectorIndex re-ranks the top candidates with the
+full float vectors to win most of that recall back.
+"""
+
+from typing import Dict, Optional
+from pathlib import Path
+
+import numpy as np
+
+
+# Rows scored per block, so int8 -> float conversion never copies the whole matrix
+SCORE_BLOCK_ROWS = 8192
+
+
+class Int8Quantizer:
+    """
+    Scalar quantizer: each vector is stored as int8 codes plus one float scale.
+    Uses about a quarter of the memory of float32 storage.
+    """
+
+    name = "int8"
+
+    def __init__(self):
+        """Initialize an empty quantizer."""
+        self.codes = np.empty((0, 0), dtype=np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+
+    def train(self, vectors: np.ndarray):
+        """Int8 needs no training; present for a uniform interface."""
+
+    def wants_training(self, rows: int) -> bool:
+        """Int8 never needs (re)training; present for a uniform interface."""
+        return False
+
+    def add(self, vectors: np.ndarray):
+        """
+        Encode vectors and append them to the stored codes.
+
+        Args:
+            vectors: Float matrix of shape (rows, dimensions)
+        """
+        # Symmetric per-vector scale maps the largest component to +/-127
+        peaks = np.maximum(np.abs(vectors).max(axis=1), 1e-12).astype(np.float32)
+        codes = np.round(vectors / peaks[:, None] * 127).astype(np.int8)
+
+        self.codes = codes if not len(self.codes) else np.vstack([self.codes, codes])
+        self.scales = np.concatenate([self.scales, peaks / 127])
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Approximate dot products between queries and stored vectors.
+
+        Args:
+            queries: Float matrix of shape (queries, dimensions)
+            rows: Rows to score, or None for all rows
+
+        Returns:
+            Matrix of shape (queries, rows) with approximate scores
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        scales = self.scales if rows is None else self.scales[rows]
+
+        result = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            result[:, start:start + len(block)] = queries @ block.T
+        return result * scales
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory by the codes and scales."""
+        return self.codes.nbytes + self.scales.nbytes
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays needed to restore this quantizer."""
+        return {"codes": self.codes, "scales": self.scales}
+
+    def restore(self, state: Dict[str, np.ndarray]):
+        """Restore arrays saved with state()."""
+        self.codes = state["codes"]
+        self.scales = state["scales"]
+
+
+class ProductQuantizer:
+    """
+    Product quantizer: vectors are split into sub-vectors, and each
+    sub-vector is replaced by the index of its nearest trained centroid.
+    Each vector costs one byte per sub-vector.
+    """
+
+    name = "pq"
+
+    def __init__(self,
+                 subvectors: Optional[int] = None,
+                 centroids: int = 256,
+                 iterations: int = 12,
+                 train_size: int = 10000,
+                 seed: int = 0):
+        """
+        Initialize an untrained product quantizer.
+
+        Args:
+            subvectors: Number of sub-vectors (bytes per stored vector);
+                defaults to one per 8 dimensions
+            centroids: Centroids per sub-vector (at most 256)
+            iterations: k-means iterations during training
+            train_size: Maximum vectors sampled for training
+            seed: Random seed, so training is repeatable
+        """
+        self.subvectors = subvectors
+        self.centroids = min(centroids, 256)
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (subvectors, centroids, sub_dim)
+        self.codes = np.empty((0, subvectors or 0), dtype=np.uint8)
+        self.dimensions = 0
+        self.trained_on = 0  # Vectors the codebooks were learned from
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """Pad vectors to a multiple of subvectors and split them."""
+        sub_dim = -(-self.dimensions // self.subvectors)
+        padded = np.zeros((len(vectors), sub_dim * self.subvectors), dtype=np.float32)
+        padded[:, :vectors.shape[1]] = vectors
+        return padded.reshape(len(vectors), self.subvectors, sub_dim)
+
+    def train(self, vectors: np.ndarray):
+        """
+        Learn one codebook per sub-vector with k-means. Codes encoded with
+        earlier codebooks are discarded, so add() every vector again after.
+
+        Args:
+            vectors: Float matrix of shape (rows, dimensions)
+        """
+        rng = np.random.default_rng(self.seed)
+        self.dimensions = vectors.shape[1]
+        if self.subvectors is None:
+            self.subvectors = max(1, self.dimensions // 8)
+
+        sample = vectors
+        if len(vectors) > self.train_size:
+            sample = vectors[rng.choice(len(vectors), self.train_size, replace=False)]
+        parts = self._split(np.asarray(sample, dtype=np.float32))
+
+        centroid_count = min(self.centroids, len(sample))
+        codebooks = []
+        for m in range(self.subvectors):
+            data = parts[:, m, :]
+            centers = data[rng.choice(len(data), centroid_count, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(data, centers)
+
+                # Move each center to the mean of its members (empty centers stay put)
+                counts = np.bincount(assignment, minlength=centroid_count)
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assignment, data)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            codebooks.append(centers)
+        self.codebooks = np.stack(codebooks)
+        self.codes = np.empty((0, self.subvectors), dtype=np.uint8)
+        self.trained_on = len(sample)
+
+    def wants_training(self, rows: int) -> bool:
+        """
+        Check whether codebooks should be (re)learned for a store of this size.
+        Codebooks learned from the first small batch (e.g. one manual) fit
+        later data badly, so they are relearned each time the store doubles
+        until a full train_size sample has been used.
+
+        Args:
+            rows: Vectors in the store
+
+        Returns:
+            True if train() should run on the whole store
+        """
+        if self.codebooks is None:
+            return True
+        return self.trained_on < self.train_size and rows >= 2 * self.trained_on
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        """Index of the nearest center (squared distance) for each row."""
+        distances = (
+            (data ** 2).sum(axis=1, keepdims=True)
+            - 2 * data @ centers.T
+            + (centers ** 2).sum(axis=1)
+        )
+        return distances.argmin(axis=1)
+
+    def add(self, vectors: np.ndarray):
+        """
+        Encode vectors and append them to the stored codes.
+
+        Args:
+            vectors: Float matrix of shape (rows, dimensions)
+        """
+        if self.codebooks is None:
+            self.train(vectors)
+
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.stack(
+            [self._nearest(parts[:, m, :], self.codebooks[m]) for m in range(self.subvectors)],
+            axis=1
+        ).astype(np.uint8)
+        self.codes = codes if not len(self.codes) else np.vstack([self.codes, codes])
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Approximate dot products using per-query lookup tables.
+
+        Args:
+            queries: Float matrix of shape (queries, dimensions)
+            rows: Rows to score, or None for all rows
+
+        Returns:
+            Matrix of shape (queries, rows) with approximate scores
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+
+        # tables[q, m, c] = dot(query q's sub-vector m, centroid c)
+        tables = np.einsum("qmd,mcd->qmc", self._split(queries), self.codebooks)
+
+        result = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for m in range(self.subvectors):
+            result += tables[:, m, codes[:, m]]
+        return result
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory by the codes and codebooks."""
+        return self.codes.nbytes + (self.codebooks.nbytes if self.codebooks is not None else 0)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays needed to restore this quantizer."""
+        return {
+            "codes": self.codes,
+            "codebooks": self.codebooks,
+            "dimensions": np.array(self.dimensions),
+            "trained_on": np.array(self.trained_on),
+            "centroids": np.array(self.centroids),
+            "train_size": np.array(self.train_size),
+        }
+
+    def restore(self, state: Dict[str, np.ndarray]):
+        """Restore arrays saved with state()."""
+        self.codes = state["codes"]
+        self.codebooks = state["codebooks"]
+        self.dimensions = int(state["dimensions"])
+        self.subvectors = self.codebooks.shape[0]
+        # The configured centroid count, not the codebooks' (a small first sample
+        # trains fewer), so relearning on more data can use all of them
+        if "centroids" in state:
+            self.centroids = int(state["centroids"])
+            self.train_size = int(state["train_size"])
+        # Files saved before trained_on was recorded get relearned on the next add()
+        self.trained_on = int(state["trained_on"]) if "trained_on" in state else 0
+
+
+# Storage modes accepted by LocalVectorIndex
+QUANTIZERS = {
+    "int8": Int8Quantizer,
+    "pq": ProductQuantizer,
+}
+
+
+def save_quantizer(quantizer, path: Path):
+    """
+    Save a quantizer's arrays to a .npz file.
+
+    Args:
+        quantizer: Int8Quantizer or ProductQuantizer
+        path: Output file path
+    """
+    np.savez(path, kind=np.array(quantizer.name), **quantizer.state())
+
+
+def load_quantizer(path: Path):
+    """
+    Load a quantizer saved with save_quantizer().
+
+    Args:
+        path: Quantizer file path
+
+    Returns:
+        Int8Quantizer or ProductQuantizer
+    """
+    with np.load(path) as data:
+        state = {key: data[key] for key in data.files}
+    quantizer = QUANTIZERS[str(state.pop("kind"))]()
+    quantizer.restore(state)
+    return quantizer
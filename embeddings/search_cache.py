@@ -0,0 +1,156 @@
+"""
+SearchCache - Process-wide caches for vector search lookups.
+Keeps query embeddings and search results in bounded LRU caches with a TTL.
+"""
+
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import time
+
+
+# Marker file touched by ingestion so other processes drop stale results
+INDEX_VERSION_MARKER = Path("manuals/processed/index_version")
+
+# How often (seconds) a lookup may stat the marker file
+MARKER_CHECK_INTERVAL = 1.0
+
+
+class TTLCache:
+    """
+    Bounded least-recently-used cache where entries also expire after a TTL.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 900.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept before evicting the oldest
+            ttl_seconds: Seconds an entry stays valid after it was stored
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            The cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                # Expired entries are dropped on read
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get hit/miss counters for the cache.
+
+        Returns:
+            Dictionary with entries, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared by every VectorSearch instance in this process
+query_embedding_cache = TTLCache(max_entries=4096, ttl_seconds=24 * 3600)
+search_result_cache = TTLCache(max_entries=1024, ttl_seconds=15 * 60)
+
+# Last seen marker state, so we only clear once per ingestion
+_marker_state = {"checked_at": 0.0, "mtime_ns": None}
+_marker_lock = threading.Lock()
+
+
+def _read_marker_mtime() -> Optional[int]:
+    """Return the marker file modification time, or None if it does not exist."""
+    try:
+        return INDEX_VERSION_MARKER.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def check_index_version():
+    """
+    Drop cached search results if another process has updated the index.
+    The marker file is checked at most once per MARKER_CHECK_INTERVAL.
+    """
+    now = time.monotonic()
+    if now - _marker_state["checked_at"] < MARKER_CHECK_INTERVAL:
+        return
+
+    with _marker_lock:
+        _marker_state["checked_at"] = now
+        mtime_ns = _read_marker_mtime()
+        if mtime_ns != _marker_state["mtime_ns"]:
+            # First check just records the state; later changes clear results
+            if _marker_state["mtime_ns"] is not None or mtime_ns is not None:
+                search_result_cache.clear()
+            _marker_state["mtime_ns"] = mtime_ns
+
+
+def invalidate_search_cache():
+    """
+    Clear cached search results after the index has been updated.
+    Also touches the marker file so other processes drop their results.
+    Query embeddings stay valid because they do not depend on the index.
+    """
+    search_result_cache.clear()
+
+    try:
+        INDEX_VERSION_MARKER.parent.mkdir(parents=True, exist_ok=True)
+        INDEX_VERSION_MARKER.touch()
+    except OSError:
+        # A read-only checkout still gets in-process invalidation
+        return
+
+    with _marker_lock:
+        _marker_state["mtime_ns"] = _read_marker_mtime()
+        _marker_state["checked_at"] = time.monotonic()
@@ -5,14 +5,58 @@ Uses LangChain for embedding and similarity search of refrigeration manuals.
 
 from typing import Dict, List, Optional, Union
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from langchain_community.vectorstores import SupabaseVectorStore
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from supabase.client import Client, create_client
-from dotenv import load_dotenv
 import json
 
+from embeddings.clients import get_embeddings, get_vector_store
+from embeddings.local_index import RANGE_FIELDS, metadata_matches
+from embeddings.inverted_index import INVERTED_INDEX_PATH, InvertedIndex, is_exact_token_query
+from embeddings.search_cache import (
+    check_index_version,
+    query_embedding_cache,
+    search_result_cache,
+)
+from utils.tracing import count, observe, span, traced
+
+
+# Supported search_manuals modes
+SEARCH_MODES = ("vector", "keyword", "hybrid")
+
+# Hybrid search: share of the fused score that comes from vector similarity
+HYBRID_VECTOR_WEIGHT = 0.5
+
+# Hybrid search: candidates fetched per side, as a multiple of max_results
+HYBRID_CANDIDATE_FACTOR = 3
+
+# search_many: concurrent round-trips allowed against a remote vector store
+MAX_CONCURRENT_SEARCHES = 8
+
+# Parsed component_specs.json references, keyed by file modification time
+_component_refs: Dict = {"mtime_ns": None, "refs": {}}
+
+# Keyword index shared by every VectorSearch instance, reloaded when the file changes
+_keyword_index: Dict = {"mtime_ns": None, "index": InvertedIndex()}
+
+
+def _get_keyword_index() -> InvertedIndex:
+    """
+    Get the shared BM25 keyword index, reloading it after ingestion rewrites it.
+    
+    Returns:
+        InvertedIndex built by EmbeddingPipeline (empty if none exists yet)
+    """
+    try:
+        mtime_ns = INVERTED_INDEX_PATH.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    
+    if mtime_ns != _keyword_index["mtime_ns"]:
+        _keyword_index["index"] = InvertedIndex.load(INVERTED_INDEX_PATH)
+        _keyword_index["mtime_ns"] = mtime_ns
+    
+    return _keyword_index["index"]
+
 
 @dataclass
 class SearchResult:
@@ -30,41 +74,63 @@ class VectorSearch:
     """
 
     def __init__(self):
-        """Initialize vector search with Supabase connection."""
-        load_dotenv()
-        
-        # Initialize Supabase connection
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_ANON_KEY")
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("Supabase credentials not found in environment variables")
-        
-        # Create Supabase client
-        supabase_client: Client = create_client(supabase_url, supabase_key)
-        
-        # Initialize embeddings
-        self.embeddings = OpenAIEmbeddings()
+        """
+        Initialize vector search. Store and embedding clients come from the
+        shared registry in embeddings.clients and are only created on first use.
+        """
+        self._embeddings = None
+        self._vector_store = None
+
+    @property
+    def embeddings(self):
+        """Embedding model, shared across instances unless overridden."""
+        return self._embeddings if self._embeddings is not None else get_embeddings()
+
+    @embeddings.setter
+    def embeddings(self, value):
+        self._embeddings = value
+
+    @property
+    def vector_store(self):
+        """
+        Vector store, shared across instances unless overridden.
+        VECTOR_BACKEND=local searches the index mirrored by EmbeddingPipeline;
+        VECTOR_INDEX_STORAGE=int8 or pq keeps it compressed in memory.
+        """
+        return self._vector_store if self._vector_store is not None else get_vector_store()
+
+    @vector_store.setter
+    def vector_store(self, value):
+        self._vector_store = value
+
+    def _embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query, reusing the shared embedding cache when possible.
         
-        # Initialize vector store with client
-        self.vector_store = SupabaseVectorStore(
-            client=supabase_client,
-            embedding=self.embeddings,
-            table_name="document_embeddings",
-            query_name="match_documents"
-        )
+        Args:
+            query: Normalized search query
         
-        # Initialize text splitter for chunking documents
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len
-        )
+        Returns:
+            Embedding vector for the query
+        """
+        embedding = query_embedding_cache.get(query)
+        if embedding is None:
+            count("embedding_cache_misses_total")
+            with span("retrieval.embed_query"):
+                embedding = self.embeddings.embed_query(query)
+            query_embedding_cache.set(query, embedding)
+        else:
+            count("embedding_cache_hits_total")
+        return embedding
 
+    @traced("retrieval.search_manuals")
     def search_manuals(self, 
                       query: str,
                       component_type: Optional[str] = None,
-                      max_results: int = 5) -> List[SearchResult]:
+                      max_results: int = 5,
+                      use_cache: bool = True,
+                      mode: str = "vector",
+                      metadata_filter: Optional[Dict] = None) -> List[SearchResult]:
         """
         Search refrigeration manuals for relevant information.
         
@@ -72,23 +138,286 @@ class VectorSearch:
             query: Search query (e.g., "high discharge temperature")
             component_type: Optional component type to filter results
             max_results: Maximum number of results to return
+            use_cache: Reuse cached embeddings and results for repeat queries
+            mode: "vector" (embedding similarity), "keyword" (BM25 only),
+                or "hybrid" (BM25 and vector scores fused)
+            metadata_filter: Optional extra filters on source, manufacturer,
+                model, or a page range as {"page": (first, last)}
         
         Returns:
             List of SearchResult objects with content and metadata
         """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        
+        # Collapse whitespace so trivially different queries share cache entries
+        query = " ".join(query.split())
+        
         # Prepare metadata filter if component type is specified
-        filter_dict = None
-        if component_type:
-            filter_dict = {"component_type": component_type}
+        filter_dict = self._build_filter(component_type, metadata_filter)
+        
+        # Repeat lookups are answered from the shared result cache
+        cache_key = (query, self._filter_key(filter_dict), max_results, mode)
+        if use_cache:
+            check_index_version()
+            cached = search_result_cache.get(cache_key)
+            if cached is not None:
+                count("search_cache_hits_total", mode=mode)
+                return list(cached)
+            count("search_cache_misses_total", mode=mode)
+        
+        if mode == "vector":
+            search_results = self._vector_search(query, filter_dict, max_results, use_cache)
+        elif mode == "keyword":
+            search_results = self._keyword_search(query, filter_dict, max_results)
+        else:
+            search_results = self._hybrid_search(query, filter_dict, max_results, use_cache)
+        
+        if use_cache:
+            search_result_cache.set(cache_key, search_results)
+        
+        return list(search_results)
+
+    @traced("retrieval.search_many")
+    def search_many(self,
+                    queries: List[str],
+                    component_type: Optional[str] = None,
+                    max_results: int = 5,
+                    use_cache: bool = True,
+                    mode: str = "vector",
+                    metadata_filter: Optional[Dict] = None) -> Dict[str, List[SearchResult]]:
+        """
+        Search manuals for many queries at once.
+        Duplicate queries are searched once, all missing embeddings are
+        fetched in a single batched call, and the store lookups run together
+        (one matrix operation for stores that support it, otherwise
+        concurrent round-trips).
+        
+        Args:
+            queries: Search queries (e.g., one per diagnosis)
+            component_type: Optional component type to filter results
+            max_results: Maximum number of results per query
+            use_cache: Reuse cached embeddings and results for repeat queries
+            mode: Search mode, as in search_manuals
+            metadata_filter: Optional extra filters, as in search_manuals
+        
+        Returns:
+            Dictionary mapping each query to its list of SearchResult objects
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        
+        # De-duplicate after normalizing whitespace, keeping first-seen order
+        normalized = {query: " ".join(query.split()) for query in queries}
+        unique_queries = list(dict.fromkeys(normalized.values()))
+        
+        filter_dict = self._build_filter(component_type, metadata_filter)
+        filter_key = self._filter_key(filter_dict)
+        
+        # Answer what we can from the shared result cache
+        results: Dict[str, List[SearchResult]] = {}
+        if use_cache:
+            check_index_version()
+            for query in unique_queries:
+                cached = search_result_cache.get((query, filter_key, max_results, mode))
+                if cached is not None:
+                    results[query] = list(cached)
+        pending = [query for query in unique_queries if query not in results]
+        count("search_cache_hits_total", len(results), mode=mode)
+        count("search_cache_misses_total", len(pending), mode=mode)
+        
+        if pending:
+            if mode == "vector":
+                vectors = self._embed_queries(pending, use_cache)
+                fresh = self._vector_search_many(pending, vectors, filter_dict, max_results)
+            else:
+                # Batch-embed into the shared cache for hybrid searches to pick up;
+                # keyword lookups, and exact-token hybrid lookups, need no embedding
+                if mode == "hybrid" and use_cache:
+                    self._embed_queries(
+                        [query for query in pending if not is_exact_token_query(query)]
+                    )
+                
+                def search(query: str) -> List[SearchResult]:
+                    if mode == "keyword":
+                        return self._keyword_search(query, filter_dict, max_results)
+                    return self._hybrid_search(query, filter_dict, max_results, use_cache)
+                
+                # Each search is now local work or one round-trip
+                with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SEARCHES) as executor:
+                    fresh = dict(zip(pending, executor.map(search, pending)))
+            
+            for query, search_results in fresh.items():
+                if use_cache:
+                    search_result_cache.set((query, filter_key, max_results, mode), search_results)
+                results[query] = search_results
+        
+        # Return results under the caller's original query strings
+        return {query: list(results[normalized[query]]) for query in queries}
+
+    def _embed_queries(self, queries: List[str], use_cache: bool = True) -> List[List[float]]:
+        """
+        Embed several queries with one batched embedding call.
+        Queries already in the shared embedding cache are not re-embedded.
+        
+        Args:
+            queries: Normalized search queries
+            use_cache: Read and fill the shared embedding cache
+        
+        Returns:
+            Embedding vectors in the same order as queries
+        """
+        embeddings = {}
+        if use_cache:
+            for query in queries:
+                cached = query_embedding_cache.get(query)
+                if cached is not None:
+                    embeddings[query] = cached
+        
+        missing = [query for query in queries if query not in embeddings]
+        # Only misses are counted here: hybrid searches re-read embeddings this call cached
+        count("embedding_cache_misses_total", len(missing))
+        if missing:
+            # One request for the whole batch instead of one per query
+            observe("embedding_batch_size", len(missing))
+            with span("retrieval.embed_queries"):
+                vectors = self.embeddings.embed_documents(missing)
+            for query, embedding in zip(missing, vectors):
+                embeddings[query] = embedding
+                if use_cache:
+                    query_embedding_cache.set(query, embedding)
+        
+        return [embeddings[query] for query in queries]
+
+    def _vector_search_many(self,
+                            queries: List[str],
+                            vectors: List[List[float]],
+                            filter_dict: Optional[Dict],
+                            max_results: int) -> Dict[str, List[SearchResult]]:
+        """
+        Run vector similarity search for several queries together.
+        
+        Args:
+            queries: Normalized search queries
+            vectors: Embedding of each query (from _embed_queries)
+            filter_dict: Optional metadata filter
+            max_results: Maximum number of results per query
+        
+        Returns:
+            Dictionary mapping each query to its list of SearchResult objects
+        """
+        # Stores that can score a whole batch at once do it in one pass
+        batch_search = getattr(self.vector_store, "similarity_search_many_by_vector", None)
+        if batch_search is not None:
+            with span("retrieval.store_search_many"):
+                batches = batch_search(vectors, k=max_results, filter=filter_dict)
+        else:
+            # Remote stores get one concurrent set of round-trips
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SEARCHES) as executor:
+                batches = list(executor.map(
+                    lambda vector: self._store_search(vector, filter_dict, max_results),
+                    vectors
+                ))
+        
+        return {
+            query: self._to_search_results(batch)
+            for query, batch in zip(queries, batches)
+        }
+
+    def _vector_search(self,
+                       query: str,
+                       filter_dict: Optional[Dict],
+                       max_results: int,
+                       use_cache: bool = True) -> List[SearchResult]:
+        """
+        Rank chunks by embedding similarity in the vector store.
         
+        Args:
+            query: Normalized search query
+            filter_dict: Optional metadata filter
+            max_results: Maximum number of results to return
+            use_cache: Reuse a cached query embedding
+        
+        Returns:
+            List of SearchResult objects, best first
+        """
         # Perform similarity search
-        results = self.vector_store.similarity_search_with_score(
-            query,
-            k=max_results,
-            filter=filter_dict
+        embedding = self._embed_query(query) if use_cache else self.embeddings.embed_query(query)
+        results = self._store_search(embedding, filter_dict, max_results)
+        return self._to_search_results(results)
+
+    @traced("retrieval.store_search")
+    def _store_search(self, embedding: List[float], filter_dict: Optional[Dict], k: int) -> List:
+        """
+        Query the vector store with one embedding.
+        Stores without range filter support get the range conditions
+        applied afterwards on an enlarged candidate set.
+        
+        Args:
+            embedding: Query embedding
+            filter_dict: Optional metadata filter
+            k: Maximum number of results to return
+        
+        Returns:
+            List of (Document, score) tuples
+        """
+        store_filter, post_filter = filter_dict, None
+        if filter_dict and not getattr(self.vector_store, "supports_range_filters", False):
+            store_filter = {key: value for key, value in filter_dict.items() if key not in RANGE_FIELDS}
+            post_filter = {key: value for key, value in filter_dict.items() if key in RANGE_FIELDS}
+        
+        if not post_filter:
+            return self.vector_store.similarity_search_by_vector_with_relevance_scores(
+                embedding,
+                k=k,
+                filter=store_filter or None
+            )
+        
+        results = self.vector_store.similarity_search_by_vector_with_relevance_scores(
+            embedding,
+            k=k * HYBRID_CANDIDATE_FACTOR,
+            filter=store_filter or None
         )
+        return [(doc, score) for doc, score in results if metadata_matches(doc.metadata, post_filter)][:k]
+
+    @staticmethod
+    def _build_filter(component_type: Optional[str], metadata_filter: Optional[Dict]) -> Optional[Dict]:
+        """
+        Combine the component type and any extra metadata filters.
+        
+        Args:
+            component_type: Optional component type
+            metadata_filter: Optional extra filters
         
-        # Convert to SearchResult objects
+        Returns:
+            Filter dictionary, or None when nothing is filtered
+        """
+        filter_dict = dict(metadata_filter or {})
+        if component_type:
+            filter_dict["component_type"] = component_type
+        return filter_dict or None
+
+    @staticmethod
+    def _filter_key(filter_dict: Optional[Dict]) -> tuple:
+        """Turn a filter into a hashable, order-independent cache key."""
+        if not filter_dict:
+            return ()
+        return tuple(sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in filter_dict.items()
+        ))
+
+    @staticmethod
+    def _to_search_results(results: List) -> List[SearchResult]:
+        """
+        Convert (document, score) pairs from the vector store to SearchResults.
+        
+        Args:
+            results: List of (Document, score) tuples
+        
+        Returns:
+            List of SearchResult objects
+        """
         search_results = []
         for doc, score in results:
             search_results.append(SearchResult(
@@ -100,6 +429,116 @@ class VectorSearch:
         
         return search_results
 
+    @traced("retrieval.keyword_search")
+    def _keyword_search(self,
+                        query: str,
+                        filter_dict: Optional[Dict],
+                        max_results: int) -> List[SearchResult]:
+        """
+        Rank chunks by BM25 keyword score using the ingestion-time index.
+        
+        Args:
+            query: Normalized search query
+            filter_dict: Optional metadata filter
+            max_results: Maximum number of results to return
+        
+        Returns:
+            List of SearchResult objects, best first
+        """
+        results = _get_keyword_index().search(query, k=max_results, filter=filter_dict)
+        
+        return [
+            SearchResult(
+                content=chunk["content"],
+                metadata=chunk["metadata"],
+                similarity_score=score,
+                source_reference=chunk["metadata"].get("source", "Unknown")
+            )
+            for chunk, score in results
+        ]
+
+    def _hybrid_search(self,
+                       query: str,
+                       filter_dict: Optional[Dict],
+                       max_results: int,
+                       use_cache: bool = True) -> List[SearchResult]:
+        """
+        Fuse BM25 and vector scores into one ranking.
+        Part/model number lookups that BM25 can answer skip the embedding call.
+        
+        Args:
+            query: Normalized search query
+            filter_dict: Optional metadata filter
+            max_results: Maximum number of results to return
+            use_cache: Reuse a cached query embedding
+        
+        Returns:
+            List of SearchResult objects, best first
+        """
+        # Fetch extra candidates from each side so fusion has room to reorder
+        candidate_count = max_results * HYBRID_CANDIDATE_FACTOR
+        keyword_results = self._keyword_search(query, filter_dict, candidate_count)
+        
+        # Exact-token queries (e.g. "ZB58KCE-TFD") are answered by BM25 alone
+        if keyword_results and is_exact_token_query(query):
+            return keyword_results[:max_results]
+        
+        vector_results = self._vector_search(query, filter_dict, candidate_count, use_cache)
+        
+        # Normalize each score list to 0-1 so they can be combined
+        fused: Dict[str, float] = {}
+        by_key: Dict[str, SearchResult] = {}
+        for weight, results in ((1 - HYBRID_VECTOR_WEIGHT, keyword_results),
+                                (HYBRID_VECTOR_WEIGHT, vector_results)):
+            if not results:
+                continue
+            scores = [result.similarity_score for result in results]
+            low, high = min(scores), max(scores)
+            for result in results:
+                key = result.metadata.get("chunk_id") or result.content
+                normalized = (result.similarity_score - low) / (high - low) if high > low else 1.0
+                fused[key] = fused.get(key, 0.0) + weight * normalized
+                by_key.setdefault(key, result)
+        
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:max_results]
+        return [
+            SearchResult(
+                content=by_key[key].content,
+                metadata=by_key[key].metadata,
+                similarity_score=score,
+                source_reference=by_key[key].source_reference
+            )
+            for key, score in ranked
+        ]
+
+    @staticmethod
+    def _get_manual_reference(component_name: str) -> Optional[str]:
+        """
+        Look up a component's manual reference in component_specs.json.
+        The parsed file is kept until its modification time changes.
+        
+        Args:
+            component_name: Name of the component (e.g., "ZB58KCE-TFD")
+        
+        Returns:
+            Manual reference string, or None if the component is unknown
+        """
+        mtime_ns = os.stat("component_specs.json").st_mtime_ns
+        if _component_refs["mtime_ns"] != mtime_ns:
+            with open("component_specs.json", "r") as f:
+                specs = json.load(f)
+            
+            # Flatten categories into one name -> reference lookup
+            refs = {}
+            for category in specs["components"].values():
+                for name, data in category.items():
+                    refs.setdefault(name, data.get("manual_reference"))
+            
+            _component_refs["refs"] = refs
+            _component_refs["mtime_ns"] = mtime_ns
+        
+        return _component_refs["refs"].get(component_name)
+
     def get_component_manuals(self, 
                             component_name: str,
                             max_results: int = 3) -> List[SearchResult]:
@@ -113,16 +552,8 @@ class VectorSearch:
         Returns:
             List of SearchResult objects with component-specific information
         """
-        # Load component specs to get manual references
-        with open("component_specs.json", "r") as f:
-            specs = json.load(f)
-        
         # Find component in specs
-        component_ref = None
-        for category in specs["components"].values():
-            if component_name in category:
-                component_ref = category[component_name]["manual_reference"]
-                break
+        component_ref = self._get_manual_reference(component_name)
         
         if not component_ref:
             raise ValueError(f"Component {component_name} not found in specifications")
@@ -155,4 +586,25 @@ class VectorSearch:
         return self.search_manuals(
             query=query,
             max_results=max_results
-        ) 
\ No newline at end of file
+        )
+
+    def get_diagnostic_contexts(self,
+                                diagnoses: List[Dict],
+                                max_results: int = 5) -> List[List[SearchResult]]:
+        """
+        Get manual sections for many diagnoses at once (e.g., a fleet pass).
+        Costs about one search no matter how many diagnoses are given.
+        
+        Args:
+            diagnoses: List of {"diagnosis": str, "symptoms": List[str]} entries
+            max_results: Maximum number of results per diagnosis
+        
+        Returns:
+            List of SearchResult lists, in the same order as diagnoses
+        """
+        queries = [
+            f"{item['diagnosis']} {' '.join(item.get('symptoms', []))}"
+            for item in diagnoses
+        ]
+        results = self.search_many(queries, max_results=max_results)
+        return [results[query] for query in queries]
@@ -0,0 +1,262 @@
+"""
+ContextPacker - Fits retrieved manual context into a token budget.
+Drops near-duplicate chunks, trims the overlap between neighbouring
+chunks, and keeps the best-scoring chunks that fit, so prompt size stays
+predictable however much retrieval returns.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Set
+from dataclasses import dataclass, field
+import math
+import re
+
+
+# Context tokens allowed per provider (system state is counted in the same budget)
+CONTEXT_TOKEN_BUDGETS = {
+    "gemini": 2000,
+    "openai": 2000,
+    "claude": 2000,
+    "local": 1000,
+}
+
+# Budget for providers not listed above
+DEFAULT_TOKEN_BUDGET = 2000
+
+# Share of a chunk's word shingles already selected that makes it a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# Words per shingle when comparing chunks
+SHINGLE_WORDS = 5
+
+# Shortest shared text treated as a chunk-boundary overlap (chunks overlap by 200 chars)
+MIN_BOUNDARY_OVERLAP = 40
+
+# Heuristic tokenizer: words, numbers and single punctuation marks
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"\w+")
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text.
+    Uses tiktoken when installed; otherwise estimates from words and
+    punctuation (long words count as several tokens).
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Token count
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+
+    if _encoding:
+        return len(_encoding.encode(text))
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_PATTERN.findall(text))
+
+
+@dataclass
+class ContextChunk:
+    """One retrieved manual section with its retrieval score."""
+    text: str
+    score: float
+    reference: Optional[str] = None
+
+
+@dataclass
+class PackedContext:
+    """Chunks chosen for a prompt, with token accounting."""
+    chunks: List[ContextChunk]
+    tokens: int
+    tokens_before: int
+    budget: int
+    duplicates_removed: int = 0
+    overlap_tokens_trimmed: int = 0
+    dropped_for_budget: int = 0
+    references: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        """Tokens kept out of the prompt compared to sending every chunk."""
+        return self.tokens_before - self.tokens
+
+    @property
+    def text(self) -> str:
+        """Chunks joined for the prompt, best first."""
+        return "\n".join(chunk.text for chunk in self.chunks)
+
+    def report(self) -> Dict[str, int]:
+        """
+        Summarize the packing.
+
+        Returns:
+            Dictionary of token and chunk counts
+        """
+        return {
+            "budget": self.budget,
+            "tokens": self.tokens,
+            "tokens_before": self.tokens_before,
+            "tokens_saved": self.tokens_saved,
+            "chunks": len(self.chunks),
+            "duplicates_removed": self.duplicates_removed,
+            "overlap_tokens_trimmed": self.overlap_tokens_trimmed,
+            "dropped_for_budget": self.dropped_for_budget,
+        }
+
+
+def to_chunks(context: Sequence[Any]) -> List[ContextChunk]:
+    """
+    Normalize retrieval output into ContextChunks.
+    Accepts SearchResult objects (content, similarity_score, source_reference),
+    (text, score) tuples, dictionaries with content/score keys, or plain
+    strings, which are scored by their position in the list.
+
+    Args:
+        context: Retrieved manual sections
+
+    Returns:
+        List of ContextChunk objects
+    """
+    chunks = []
+    for position, item in enumerate(context):
+        if isinstance(item, ContextChunk):
+            chunks.append(item)
+        elif isinstance(item, str):
+            chunks.append(ContextChunk(item, -float(position)))
+        elif isinstance(item, (tuple, list)):
+            chunks.append(ContextChunk(str(item[0]), float(item[1])))
+        elif isinstance(item, dict):
+            chunks.append(ContextChunk(
+                item.get("content", ""),
+                float(item.get("similarity_score", item.get("score", -position))),
+                item.get("source_reference")
+            ))
+        else:
+            chunks.append(ContextChunk(
+                item.content,
+                float(getattr(item, "similarity_score", -position)),
+                getattr(item, "source_reference", None)
+            ))
+    return chunks
+
+
+def _shingles(text: str) -> Set[int]:
+    """Hashed word n-grams of a text."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + SHINGLE_WORDS])) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _boundary_overlap(earlier: str, later: str) -> int:
+    """
+    Length of text at the start of `later` that repeats the end of `earlier`
+    (how neighbouring chunks from the text splitter overlap).
+    """
+    probe = later[:MIN_BOUNDARY_OVERLAP]
+    if len(probe) < MIN_BOUNDARY_OVERLAP:
+        return 0
+    position = earlier.find(probe)
+    while position != -1:
+        tail = earlier[position:]
+        if later.startswith(tail):
+            return len(tail)
+        position = earlier.find(probe, position + 1)
+    return 0
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into a token budget:
+    rank by score, drop near-duplicates, trim boundary overlaps, fill the budget.
+    """
+
+    def __init__(self, budget: int = DEFAULT_TOKEN_BUDGET,
+                 near_duplicate_threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        """
+        Initialize the packer.
+
+        Args:
+            budget: Maximum tokens of packed context
+            near_duplicate_threshold: Share of a chunk's shingles already
+                covered by selected chunks at which it is dropped (0-1)
+        """
+        self.budget = budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+
+    @classmethod
+    def for_provider(cls, provider: str, budget: Optional[int] = None) -> "ContextPacker":
+        """
+        Create a packer with the provider's configured budget.
+
+        Args:
+            provider: Provider name
+            budget: Explicit budget overriding the provider default
+
+        Returns:
+            ContextPacker instance
+        """
+        return cls(budget or CONTEXT_TOKEN_BUDGETS.get(provider, DEFAULT_TOKEN_BUDGET))
+
+    def pack(self, context: Sequence[Any], reserved_tokens: int = 0) -> PackedContext:
+        """
+        Choose the chunks that go into the prompt.
+
+        Args:
+            context: Retrieved sections (see to_chunks for accepted forms)
+            reserved_tokens: Part of the budget already used (e.g. system state)
+
+        Returns:
+            PackedContext with the selected chunks and token accounting
+        """
+        chunks = to_chunks(context)
+        counts = [count_tokens(chunk.text) for chunk in chunks]
+        budget = max(0, self.budget - reserved_tokens)
+        packed = PackedContext(chunks=[], tokens=0, tokens_before=sum(counts), budget=self.budget)
+
+        # Best retrieval score first; ties keep retrieval order
+        order = sorted(range(len(chunks)), key=lambda i: -chunks[i].score)
+
+        covered: Set[int] = set()
+        for index in order:
+            chunk = chunks[index]
+            shingles = _shingles(chunk.text)
+            if shingles and len(shingles & covered) >= self.near_duplicate_threshold * len(shingles):
+                packed.duplicates_removed += 1
+                continue
+
+            # Cut text this chunk shares with a neighbouring chunk already chosen
+            text = chunk.text
+            for selected in packed.chunks:
+                overlap = _boundary_overlap(selected.text, text)
+                if overlap:
+                    text = text[overlap:].lstrip()
+                    continue
+                overlap = _boundary_overlap(text, selected.text)
+                if overlap:
+                    text = text[:len(text) - overlap].rstrip()
+
+            if not text:
+                packed.duplicates_removed += 1
+                continue
+            tokens = count_tokens(text) if text != chunk.text else counts[index]
+            if packed.tokens + tokens > budget:
+                packed.dropped_for_budget += 1
+                continue
+
+            packed.overlap_tokens_trimmed += counts[index] - tokens
+            packed.chunks.append(ContextChunk(text, chunk.score, chunk.reference))
+            packed.tokens += tokens
+            covered |= shingles
+            if chunk.reference and chunk.reference not in packed.references:
+                packed.references.append(chunk.reference)
+
+        return packed
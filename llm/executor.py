@@ -0,0 +1,188 @@
+"""
+LLMExecutor - Concurrent execution of LLM requests.
+Bounds in-flight requests, shares a token-bucket rate limit per provider,
+retries transient failures with jittered backoff and enforces deadlines.
+"""
+
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import os
+import random
+import time
+
+from utils.rate_limiter import AsyncTokenBucket
+
+
+T = TypeVar("T")
+
+# Sustained requests per second allowed per provider (override with LLM_REQUESTS_PER_SECOND)
+PROVIDER_RATE_LIMITS = {
+    "gemini": 1.0,
+    "openai": 8.0,
+    "claude": 4.0,
+    "local": 1000.0,
+}
+
+# HTTP statuses worth retrying: rate limited, server errors, overloaded
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Exception class names (across the Gemini, OpenAI and Anthropic SDKs) worth retrying
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+    "OverloadedError",
+    "ServiceUnavailable",
+    "ResourceExhausted",
+    "DeadlineExceeded",
+    "TooManyRequests",
+}
+
+# Token buckets shared by every executor talking to the same provider
+_rate_limiters: Dict[str, AsyncTokenBucket] = {}
+
+
+def get_rate_limiter(provider: str, requests_per_second: Optional[float] = None) -> AsyncTokenBucket:
+    """
+    Get the process-wide rate limiter for a provider.
+
+    Args:
+        provider: Provider name
+        requests_per_second: Limit to use when the bucket is first created
+
+    Returns:
+        AsyncTokenBucket shared by all requests to this provider
+    """
+    limiter = _rate_limiters.get(provider)
+    if limiter is None:
+        rate = requests_per_second or float(
+            os.getenv("LLM_REQUESTS_PER_SECOND", PROVIDER_RATE_LIMITS.get(provider, 1.0))
+        )
+        limiter = AsyncTokenBucket(rate)
+        _rate_limiters[provider] = limiter
+    return limiter
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Check whether a provider error is worth retrying.
+
+    Args:
+        error: Exception raised by a provider call
+
+    Returns:
+        True for rate limits, timeouts, connection and server errors
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status in TRANSIENT_STATUS_CODES
+
+
+class LLMExecutor:
+    """
+    Runs provider calls with bounded concurrency, a shared rate limit,
+    jittered retries and a deadline per request.
+    """
+
+    def __init__(self,
+                 provider: str,
+                 max_concurrency: int = 8,
+                 requests_per_second: Optional[float] = None,
+                 max_retries: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 8.0,
+                 deadline_seconds: float = 60.0):
+        """
+        Initialize the executor.
+
+        Args:
+            provider: Provider name, selects the shared rate limiter
+            max_concurrency: Requests allowed in flight at once
+            requests_per_second: Sustained request rate (defaults per provider)
+            max_retries: Retries after the first attempt for transient errors
+            base_delay: First backoff ceiling in seconds (doubles per retry)
+            max_delay: Largest backoff ceiling in seconds
+            deadline_seconds: Default time allowed per request, including
+                queueing, rate limiting and retries
+        """
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = get_rate_limiter(provider, requests_per_second)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "timeouts": 0}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limit for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(self,
+                  call: Callable[[], Awaitable[T]],
+                  deadline_seconds: Optional[float] = None) -> T:
+        """
+        Run one provider call.
+
+        Args:
+            call: Zero-argument coroutine function making the request
+            deadline_seconds: Overrides the default deadline for this request
+
+        Returns:
+            Whatever call returns
+
+        Raises:
+            TimeoutError: If the deadline passes first
+            Exception: The last provider error if retries are exhausted
+                or the error is not transient
+        """
+        deadline = deadline_seconds if deadline_seconds is not None else self.deadline_seconds
+        self.stats["requests"] += 1
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(self._attempt(call), timeout=deadline)
+        except asyncio.TimeoutError:
+            # A provider timeout that ran out of retries is not a deadline miss
+            if time.monotonic() - started < deadline:
+                self.stats["failures"] += 1
+                raise
+            self.stats["timeouts"] += 1
+            raise TimeoutError(f"{self.provider} request exceeded its {deadline:.1f}s deadline")
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+
+    async def _attempt(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Make the call, retrying transient errors with full-jitter backoff."""
+        attempt = 0
+        while True:
+            async with self._get_semaphore():
+                await self.rate_limiter.acquire()
+                try:
+                    return await call()
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_transient_error(e):
+                        raise
+                    error = e
+
+            # Back off outside the semaphore so other requests can use the slot
+            attempt += 1
+            self.stats["retries"] += 1
+            ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            delay = random.uniform(0, ceiling)
+
+            # Respect a server-provided Retry-After when the SDK exposes one
+            retry_after = getattr(error, "retry_after", None)
+            if isinstance(retry_after, (int, float)):
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
@@ -1,14 +1,35 @@
 """
 LLMInterface - Unified interface for interacting with different LLM providers.
-Supports Gemini (default), OpenAI, and Claude with consistent prompt formatting.
+Supports Gemini (default), OpenAI, and Claude with consistent prompt formatting,
+plus a deterministic "local" provider for offline runs and benchmarks.
 """
 
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import asyncio
 import os
-from dataclasses import dataclass
-import google.generativeai as genai
+import time
+from dataclasses import asdict, dataclass
 from dotenv import load_dotenv
 
+from llm.context_packer import ContextPacker, PackedContext, count_tokens, to_chunks
+from llm.executor import LLMExecutor
+from llm.local_model import LOCAL_MODEL_NAME, LocalModel
+from llm.response_cache import LLM_CACHE_PATH, ResponseCache, make_cache_key
+from utils import tracing
+from utils.tracing import count, span, traced
+
+
+# Completion length cap for Claude, which requires one
+CLAUDE_MAX_TOKENS = 1024
+
+# Supported providers and the API key each one needs
+PROVIDER_API_KEYS = {
+    "gemini": "GOOGLE_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "claude": "ANTHROPIC_API_KEY",
+    "local": None,
+}
+
 
 @dataclass
 class LLMResponse:
@@ -18,23 +39,111 @@ class LLMResponse:
     source_references: List[str]
 
 
+class LLMStream:
+    """
+    Text deltas from a streaming LLM call.
+    Iterate to receive text as it arrives; once iteration finishes,
+    `response` holds the assembled LLMResponse.
+    """
+
+    def __init__(self,
+                 deltas: Iterator[str],
+                 on_complete=None,
+                 cached: Optional[LLMResponse] = None,
+                 references: Optional[List[str]] = None):
+        """
+        Wrap a delta iterator.
+        
+        Args:
+            deltas: Iterator of text pieces from the provider
+            on_complete: Called with the final LLMResponse (e.g. to cache it)
+            cached: Complete response already known (cache hit)
+            references: Manual sections that went into the prompt
+        """
+        self._deltas = deltas
+        self._on_complete = on_complete
+        self._cached = cached
+        self._references = references or []
+        self.from_cache = cached is not None
+        self._parts: List[str] = []
+        self.started = time.perf_counter()
+        self.first_token_seconds: Optional[float] = None
+        self.response: Optional[LLMResponse] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for delta in self._deltas:
+            if not delta:
+                continue
+            if self.first_token_seconds is None:
+                self.first_token_seconds = time.perf_counter() - self.started
+            self._parts.append(delta)
+            yield delta
+        
+        self.response = self._cached or LLMResponse(
+            text="".join(self._parts),
+            confidence=0.85,  # Placeholder until responses are parsed
+            source_references=list(self._references)
+        )
+        if self._on_complete is not None:
+            self._on_complete(self.response)
+
+
 class LLMInterface:
     """
     Unified interface for interacting with different LLM providers.
     Handles prompt formatting, context management, and response parsing.
     """
 
-    def __init__(self, provider: str = "gemini"):
+    def __init__(self,
+                 provider: str = "gemini",
+                 use_cache: bool = True,
+                 cache: Optional[ResponseCache] = None,
+                 max_concurrency: int = 8,
+                 requests_per_second: Optional[float] = None,
+                 deadline_seconds: float = 60.0,
+                 context_budget: Optional[int] = None):
         """
         Initialize the LLM interface with specified provider.
         
         Args:
-            provider: LLM provider to use ("gemini", "openai", or "claude")
+            provider: LLM provider to use ("gemini", "openai", "claude" or "local")
+            use_cache: Reuse stored responses for identical requests
+            cache: Response cache to use (defaults to cache/llm_responses.sqlite)
+            max_concurrency: Requests in flight at once for aask_llm/ask_llm_many
+            requests_per_second: Provider rate limit (defaults per provider)
+            deadline_seconds: Default time allowed per async request, retries included
+            context_budget: Prompt tokens for system state and manual context
+                (defaults per provider)
         """
         load_dotenv()  # Load API keys from .env file
         
         self.provider = provider.lower()
-        self._initialize_provider()
+        if self.provider not in PROVIDER_API_KEYS:
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        
+        # The provider SDK is imported and configured on the first request,
+        # so starting the CLI needs neither the SDK load time nor an API key
+        self.model_name = self._get_model_name()
+        self.model = None
+        self.client = None
+        self._provider_ready = False
+        self._async_client = None
+        self._async_client_loop = None
+        
+        # Responses keyed by provider, model, template and inputs
+        self.cache = (cache or ResponseCache(LLM_CACHE_PATH)) if use_cache else None
+        
+        # Concurrency, rate limit, retries and deadlines for async requests
+        self.executor = LLMExecutor(
+            self.provider,
+            max_concurrency=max_concurrency,
+            requests_per_second=requests_per_second,
+            deadline_seconds=deadline_seconds
+        )
+        
+        # Manual context is de-duplicated and trimmed to a token budget
+        self.context_packer = ContextPacker.for_provider(self.provider, context_budget)
+        self.last_packing: Optional[PackedContext] = None
         
         # Default prompt template following MCP format
         self.prompt_template = """
@@ -57,58 +166,367 @@ class LLMInterface:
         Format your response in a clear, structured way suitable for apprentice technicians.
         """
 
+    def _get_model_name(self) -> str:
+        """Model used by the provider (environment overrides for OpenAI and Claude)."""
+        if self.provider == "gemini":
+            return "gemini-pro"
+        if self.provider == "local":
+            return LOCAL_MODEL_NAME
+        if self.provider == "openai":
+            return os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        return os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-latest")
+
+    def ensure_provider(self):
+        """Initialize the provider now (otherwise done before the first request)."""
+        if not self._provider_ready:
+            self._initialize_provider()
+            self._provider_ready = True
+
     def _initialize_provider(self):
-        """Initialize the selected LLM provider with API keys."""
+        """Import the provider SDK and configure it with API keys."""
+        key_name = PROVIDER_API_KEYS[self.provider]
+        if key_name and not os.getenv(key_name):
+            raise ValueError(f"{key_name} not found in environment variables")
+        
         if self.provider == "gemini":
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("GOOGLE_API_KEY not found in environment variables")
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            import google.generativeai as genai
+            genai.configure(api_key=os.getenv(key_name))
+            self.model = genai.GenerativeModel(self.model_name)
+        elif self.provider == "local":
+            # Optional artificial latency so offline benchmarks resemble a remote call
+            latency_ms = float(os.getenv("LOCAL_LLM_LATENCY_MS", "0"))
+            self.model = LocalModel(latency_seconds=latency_ms / 1000)
         elif self.provider == "openai":
-            # TODO: Implement OpenAI initialization
-            pass
+            import openai
+            self.client = openai.OpenAI()
         elif self.provider == "claude":
-            # TODO: Implement Claude initialization
-            pass
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+            import anthropic
+            self.client = anthropic.Anthropic()
 
+    @traced("llm.ask_llm")
     def ask_llm(self, 
                 system_state: Dict[str, Union[float, List[str]]],
-                manual_context: List[str]) -> LLMResponse:
+                manual_context: Sequence[Any],
+                use_cache: bool = True) -> LLMResponse:
         """
         Send a diagnostic query to the LLM with system state and manual context.
         
         Args:
             system_state: Current system sensor values and alarms
-            manual_context: Relevant sections from service manuals
+            manual_context: Relevant sections from service manuals (strings or
+                search results with scores)
+            use_cache: Set False to bypass the response cache for this call
         
         Returns:
             LLMResponse with diagnosis, confidence, and references
         """
-        # Format the prompt with system state and manual context
-        prompt = self.prompt_template.format(
-            system_state=self._format_system_state(system_state),
-            manual_context="\n".join(manual_context)
-        )
+        # Identical requests (same scenario re-run) are answered from disk
+        cache_key = self._cache_key(system_state, manual_context) if use_cache and self.cache else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            count("llm_cache_hits_total" if cached is not None else "llm_cache_misses_total", provider=self.provider)
+            if cached is not None:
+                return LLMResponse(**cached)
+        
+        # Format the prompt with system state and packed manual context
+        prompt, packed = self._format_prompt(system_state, manual_context)
+        self.ensure_provider()
+        self._record_prompt(prompt, packed)
         
         # Get response from selected provider
-        if self.provider == "gemini":
-            response = self._get_gemini_response(prompt)
-        elif self.provider == "openai":
-            response = self._get_openai_response(prompt)
-        elif self.provider == "claude":
-            response = self._get_claude_response(prompt)
+        with span("llm.provider_call", provider=self.provider):
+            if self.provider == "gemini":
+                response = self._get_gemini_response(prompt)
+            elif self.provider == "openai":
+                response = self._get_openai_response(prompt)
+            elif self.provider == "claude":
+                response = self._get_claude_response(prompt)
+            elif self.provider == "local":
+                response = self._get_local_response(prompt)
+        self._record_response(response.text)
+        
+        # References are the manual sections actually sent in the prompt
+        response.source_references = list(packed.references)
+        if cache_key is not None:
+            self.cache.set(cache_key, asdict(response))
+        
+        return response
+
+    def ask_llm_stream(self,
+                       system_state: Dict[str, Union[float, List[str]]],
+                       manual_context: Sequence[Any],
+                       use_cache: bool = True) -> LLMStream:
+        """
+        Streaming version of ask_llm: text arrives as the provider generates it,
+        so the first words can be shown long before the answer is complete.
+        
+        Args:
+            system_state: Current system sensor values and alarms
+            manual_context: Relevant sections from service manuals (strings or
+                search results with scores)
+            use_cache: Set False to bypass the response cache for this call
+        
+        Returns:
+            LLMStream yielding text deltas; its response attribute holds the
+            full LLMResponse after iteration
+        """
+        cache_key = self._cache_key(system_state, manual_context) if use_cache and self.cache else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            count("llm_cache_hits_total" if cached is not None else "llm_cache_misses_total", provider=self.provider)
+            if cached is not None:
+                # A cached answer arrives as a single delta
+                response = LLMResponse(**cached)
+                return LLMStream(iter([response.text]), cached=response)
+        
+        def store(response: LLMResponse):
+            self._record_response(response.text)
+            if cache_key is not None:
+                self.cache.set(cache_key, asdict(response))
+        
+        prompt, packed = self._format_prompt(system_state, manual_context)
+        self.ensure_provider()
+        self._record_prompt(prompt, packed)
+        return LLMStream(self._stream_deltas(prompt), on_complete=store, references=packed.references)
+
+    def _stream_deltas(self, prompt: str) -> Iterator[str]:
+        """
+        Yield completion text from the provider as it is generated.
+        
+        Args:
+            prompt: Formatted prompt
+        
+        Yields:
+            Text pieces in order
+        """
+        try:
+            if self.provider == "gemini":
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    yield chunk.text
+            elif self.provider == "local":
+                yield from self.model.stream_content(prompt)
+            elif self.provider == "openai":
+                stream = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True
+                )
+                for chunk in stream:
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content or ""
+            elif self.provider == "claude":
+                with self.client.messages.stream(
+                    model=self.model_name,
+                    max_tokens=CLAUDE_MAX_TOKENS,
+                    messages=[{"role": "user", "content": prompt}]
+                ) as stream:
+                    yield from stream.text_stream
+        except Exception as e:
+            raise RuntimeError(f"Error streaming response from {self.provider}: {str(e)}") from e
+
+    @traced("llm.aask_llm")
+    async def aask_llm(self,
+                       system_state: Dict[str, Union[float, List[str]]],
+                       manual_context: Sequence[Any],
+                       use_cache: bool = True,
+                       deadline_seconds: Optional[float] = None) -> LLMResponse:
+        """
+        Async version of ask_llm. Requests share the provider's rate limit and
+        concurrency cap, transient errors are retried with jittered backoff.
+        
+        Args:
+            system_state: Current system sensor values and alarms
+            manual_context: Relevant sections from service manuals (strings or
+                search results with scores)
+            use_cache: Set False to bypass the response cache for this call
+            deadline_seconds: Time allowed for this request (defaults to the interface's)
+        
+        Returns:
+            LLMResponse with diagnosis, confidence, and references
+        """
+        cache_key = self._cache_key(system_state, manual_context) if use_cache and self.cache else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            count("llm_cache_hits_total" if cached is not None else "llm_cache_misses_total", provider=self.provider)
+            if cached is not None:
+                return LLMResponse(**cached)
+        
+        prompt, packed = self._format_prompt(system_state, manual_context)
+        self.ensure_provider()
+        self._record_prompt(prompt, packed)
+        try:
+            with span("llm.provider_call", provider=self.provider):
+                text = await self.executor.run(lambda: self._acomplete(prompt), deadline_seconds)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error getting response from {self.provider}: {str(e)}") from e
+        self._record_response(text)
         
+        response = LLMResponse(
+            text=text,
+            confidence=0.85,  # Placeholder until responses are parsed
+            source_references=list(packed.references)
+        )
+        if cache_key is not None:
+            self.cache.set(cache_key, asdict(response))
         return response
 
+    def ask_llm_many(self,
+                     requests: List[Dict],
+                     use_cache: bool = True,
+                     deadline_seconds: Optional[float] = None) -> List[Union[LLMResponse, Exception]]:
+        """
+        Answer many diagnostic queries concurrently (e.g., every fault scenario
+        or a fleet sweep), up to the provider's allowed throughput.
+        Must not be called from inside a running event loop; use aask_llm there.
+        
+        Args:
+            requests: List of {"system_state": Dict, "manual_context": List[str]} entries
+            use_cache: Set False to bypass the response cache
+            deadline_seconds: Time allowed per request
+        
+        Returns:
+            One LLMResponse per request, in order; a failed request's
+            exception is returned in its place instead of being raised
+        """
+        async def run_all():
+            return await asyncio.gather(
+                *(
+                    self.aask_llm(
+                        request["system_state"],
+                        request.get("manual_context", []),
+                        use_cache=use_cache,
+                        deadline_seconds=deadline_seconds
+                    )
+                    for request in requests
+                ),
+                return_exceptions=True
+            )
+        
+        return asyncio.run(run_all())
+
+    def has_cached_response(self, system_state: Dict, manual_context: Sequence[Any]) -> bool:
+        """
+        Check whether ask_llm would be answered from the cache.
+        
+        Args:
+            system_state: Current system sensor values and alarms
+            manual_context: Relevant sections from service manuals
+        
+        Returns:
+            True if a stored response exists for this request
+        """
+        if self.cache is None:
+            return False
+        return self.cache.contains(self._cache_key(system_state, manual_context))
+
+    def _format_prompt(self, system_state: Dict, manual_context: Sequence[Any]) -> Tuple[str, PackedContext]:
+        """
+        Fill the prompt template with system state and manual context packed
+        into the remaining token budget.
+        
+        Args:
+            system_state: Current system sensor values and alarms
+            manual_context: Retrieved manual sections
+        
+        Returns:
+            Tuple of (prompt, PackedContext describing what was kept)
+        """
+        state_text = self._format_system_state(system_state)
+        packed = self.context_packer.pack(manual_context, reserved_tokens=count_tokens(state_text))
+        self.last_packing = packed
+        prompt = self.prompt_template.format(
+            system_state=state_text,
+            manual_context=packed.text
+        )
+        return prompt, packed
+
+    def _record_prompt(self, prompt: str, packed: PackedContext):
+        """Record prompt size metrics (skipped entirely when tracing is off)."""
+        if not tracing.enabled():
+            return
+        tokens = count_tokens(prompt)
+        tracing.observe("llm_prompt_tokens", tokens, provider=self.provider)
+        count("llm_prompt_tokens_total", tokens, provider=self.provider)
+        count("llm_context_tokens_saved_total", packed.tokens_saved, provider=self.provider)
+        tracing.current_span().set(prompt_tokens=tokens, context_chunks=len(packed.chunks))
+
+    def _record_response(self, text: str):
+        """Record response size metrics."""
+        if not tracing.enabled():
+            return
+        size = len(text.encode("utf-8"))
+        tracing.observe("llm_response_bytes", size, provider=self.provider)
+        count("llm_response_bytes_total", size, provider=self.provider)
+
+    def _get_async_client(self):
+        """OpenAI/Anthropic async client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            if self.provider == "openai":
+                import openai
+                self._async_client = openai.AsyncOpenAI()
+            else:
+                import anthropic
+                self._async_client = anthropic.AsyncAnthropic()
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def _acomplete(self, prompt: str) -> str:
+        """
+        Make one async completion call to the provider.
+        Errors are raised as-is so the executor can tell transient ones apart.
+        
+        Args:
+            prompt: Formatted prompt
+        
+        Returns:
+            Completion text
+        """
+        if self.provider == "gemini":
+            response = await self.model.generate_content_async(prompt)
+            return response.text
+        if self.provider == "local":
+            response = await self.model.generate_content_async(prompt)
+            return response.text
+        if self.provider == "openai":
+            response = await self._get_async_client().chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return response.choices[0].message.content or ""
+        response = await self._get_async_client().messages.create(
+            model=self.model_name,
+            max_tokens=CLAUDE_MAX_TOKENS,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    def _cache_key(self, system_state: Dict, manual_context: Sequence[Any]) -> str:
+        """Cache key for a request: provider, model, prompt template, budget and inputs."""
+        chunks = [(chunk.text, chunk.score) for chunk in to_chunks(manual_context)]
+        return make_cache_key(
+            self.provider,
+            self.model_name or "",
+            self.prompt_template,
+            {
+                "system_state": system_state,
+                "manual_context": chunks,
+                "context_budget": self.context_packer.budget,
+            }
+        )
+
     def _format_system_state(self, state: Dict) -> str:
-        """Format system state into a readable string."""
+        """Format system state into a readable string (empty values skipped, floats rounded)."""
         formatted = []
         for key, value in state.items():
+            if value is None or value == [] or value == "":
+                continue
             if isinstance(value, list):
-                formatted.append(f"{key}: {', '.join(value)}")
+                formatted.append(f"{key}: {', '.join(str(item) for item in value)}")
+            elif isinstance(value, float):
+                formatted.append(f"{key}: {value:.2f}")
             else:
                 formatted.append(f"{key}: {value}")
         return "\n".join(formatted)
@@ -121,17 +539,47 @@ class LLMInterface:
             return LLMResponse(
                 text=response.text,
                 confidence=0.85,  # Placeholder
-                source_references=["Copeland AE4-1327"]  # Placeholder
+                source_references=[]
             )
         except Exception as e:
             raise RuntimeError(f"Error getting response from Gemini: {str(e)}")
 
+    def _get_local_response(self, prompt: str) -> LLMResponse:
+        """Get response from the deterministic local model."""
+        response = self.model.generate_content(prompt)
+        return LLMResponse(
+            text=response.text,
+            confidence=0.85,  # Placeholder, as for Gemini
+            source_references=[]
+        )
+
     def _get_openai_response(self, prompt: str) -> LLMResponse:
         """Get response from OpenAI model."""
-        # TODO: Implement OpenAI response handling
-        raise NotImplementedError("OpenAI integration not yet implemented")
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return LLMResponse(
+                text=response.choices[0].message.content or "",
+                confidence=0.85,  # Placeholder
+                source_references=[]
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error getting response from OpenAI: {str(e)}")
 
     def _get_claude_response(self, prompt: str) -> LLMResponse:
         """Get response from Claude model."""
-        # TODO: Implement Claude response handling
-        raise NotImplementedError("Claude integration not yet implemented") 
\ No newline at end of file
+        try:
+            response = self.client.messages.create(
+                model=self.model_name,
+                max_tokens=CLAUDE_MAX_TOKENS,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            return LLMResponse(
+                text="".join(block.text for block in response.content if block.type == "text"),
+                confidence=0.85,  # Placeholder
+                source_references=[]
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error getting response from Claude: {str(e)}") 
\ No newline at end of file
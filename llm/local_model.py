@@ -0,0 +1,127 @@
+"""
+LocalModel - Deterministic offline stand-in for a hosted LLM.
+Builds a structured diagnostic answer from the prompt with simple rules,
+so the diagnose -> LLM path can run and be benchmarked without API keys.
+"""
+
+from typing import Iterator, List
+from dataclasses import dataclass
+import asyncio
+import hashlib
+import re
+import time
+
+from simulator.rack_simulator import NORMAL_RANGES
+
+
+# Name reported as the model for cache keys and logs
+LOCAL_MODEL_NAME = "local-rules-v1"
+
+# Characters per streamed chunk
+STREAM_CHUNK_SIZE = 24
+
+
+@dataclass
+class LocalResponse:
+    """Completion result, shaped like the Gemini SDK's response (text attribute)."""
+    text: str
+
+
+class LocalModel:
+    """
+    Rule-based model with a generate_content() call like the Gemini SDK.
+    The same prompt always produces the same text.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        """
+        Initialize the model.
+
+        Args:
+            latency_seconds: Artificial delay per request, to mimic a
+                remote provider when benchmarking
+        """
+        self.latency_seconds = latency_seconds
+        self.model_name = LOCAL_MODEL_NAME
+
+    def _answer(self, prompt: str) -> str:
+        """Build the answer text for a prompt."""
+        readings = {
+            name: float(value)
+            for name, value in re.findall(r"^\s*([a-z_]+): (-?\d+(?:\.\d+)?)\s*$", prompt, re.MULTILINE)
+        }
+        alarms = re.findall(r"^\s*alarms: (.+)$", prompt, re.MULTILINE)
+        references = re.findall(r"\[([^\]]+)\]", prompt)
+
+        findings: List[str] = []
+        for name, (low, high) in NORMAL_RANGES.items():
+            value = readings.get(name)
+            if value is None:
+                continue
+            if value < low:
+                findings.append(f"{name} is low at {value:.1f} (normal {low}-{high})")
+            elif value > high:
+                findings.append(f"{name} is high at {value:.1f} (normal {low}-{high})")
+
+        if findings:
+            diagnosis = "Abnormal readings: " + "; ".join(findings)
+        else:
+            diagnosis = "All readings are within normal operating ranges"
+
+        # Stable pseudo-confidence derived from the prompt itself
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        confidence = 0.6 + (digest % 30) / 100 if findings else 0.5
+
+        lines = [
+            f"1. Diagnosis: {diagnosis}",
+            f"2. Confidence: {confidence:.2f}",
+            "3. Next steps: Verify the readings with calibrated gauges, then follow the manual sections below",
+            "4. Safety warnings: " + ("Active alarms: " + alarms[0] if alarms and alarms[0].strip() else "None"),
+            "5. Manual references: " + (", ".join(dict.fromkeys(references)) or "None"),
+        ]
+        return "\n".join(lines)
+
+    def generate_content(self, prompt: str) -> LocalResponse:
+        """
+        Generate a complete answer.
+
+        Args:
+            prompt: Formatted prompt
+
+        Returns:
+            LocalResponse with the answer text
+        """
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return LocalResponse(text=self._answer(prompt))
+
+    async def generate_content_async(self, prompt: str) -> LocalResponse:
+        """
+        Async form of generate_content; the artificial latency does not block
+        other requests.
+
+        Args:
+            prompt: Formatted prompt
+
+        Returns:
+            LocalResponse with the answer text
+        """
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return LocalResponse(text=self._answer(prompt))
+
+    def stream_content(self, prompt: str) -> Iterator[str]:
+        """
+        Generate an answer as a sequence of text chunks. The artificial
+        latency is spent before the first chunk, like a remote model's
+        time to first token.
+
+        Args:
+            prompt: Formatted prompt
+
+        Yields:
+            Consecutive pieces of the answer text
+        """
+        text = self.generate_content(prompt).text
+        for start in range(0, len(text), STREAM_CHUNK_SIZE):
+            yield text[start:start + STREAM_CHUNK_SIZE]
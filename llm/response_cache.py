@@ -0,0 +1,219 @@
+"""
+ResponseCache - Disk-backed cache of LLM responses.
+Re-running a scenario with the same provider, model, prompt and inputs
+returns the stored response instead of paying for another completion.
+"""
+
+from typing import Any, Dict, Optional
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+# Default cache database location
+LLM_CACHE_PATH = Path("cache/llm_responses.sqlite")
+
+# Responses older than this are treated as misses and purged
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# Least recently used responses are evicted beyond this total size
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Sensor floats are rounded before hashing, so tiny jitter still hits the cache
+FLOAT_DIGITS = 3
+
+
+def _normalize(value: Any) -> Any:
+    """Put a value in a canonical form for hashing."""
+    if isinstance(value, float):
+        return round(value, FLOAT_DIGITS)
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def make_cache_key(provider: str, model: str, prompt_template: str, inputs: Dict) -> str:
+    """
+    Build the cache key for one LLM request.
+    Whitespace in strings is collapsed, dictionary keys are sorted and
+    floats are rounded, so equivalent requests share a key.
+
+    Args:
+        provider: Provider name (e.g. "gemini")
+        model: Model name
+        prompt_template: Template the prompt is formatted from
+        inputs: Values substituted into the template
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = json.dumps(
+        _normalize({
+            "provider": provider,
+            "model": model,
+            "template": prompt_template,
+            "inputs": inputs,
+        }),
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with TTL and total-size (LRU) eviction.
+    Safe to share between threads.
+    """
+
+    def __init__(self,
+                 path: Path = LLM_CACHE_PATH,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+            ttl_seconds: Age after which a response expires
+            max_bytes: Total stored response size before LRU eviction
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key from make_cache_key()
+
+        Returns:
+            Stored response dictionary, or None on a miss or expiry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def contains(self, key: str) -> bool:
+        """
+        Check for an unexpired response without counting a hit or miss.
+
+        Args:
+            key: Key from make_cache_key()
+
+        Returns:
+            True if get() would return a response
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def set(self, key: str, value: Dict):
+        """
+        Store a response, evicting expired and least recently used entries
+        if the cache grows past max_bytes.
+
+        Args:
+            key: Key from make_cache_key()
+            value: JSON-serializable response dictionary
+        """
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used until under max_bytes."""
+        self._connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+
+        (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get hit/miss counters and current size.
+
+        Returns:
+            Dictionary with entries, bytes, hits, misses and hit_rate
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
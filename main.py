@@ -1,5 +1,7 @@
 # main.py — Starter Scaffold for Supermarket Rack Simulator
 
+import os
+
 from diagnostics.engine import DiagnosticsEngine
 from simulator.rack_simulator import RackSimulator
 from llm.interface import LLMInterface
@@ -12,7 +14,8 @@ def main():
     # Set up modules
     simulator = RackSimulator()
     diagnostics = DiagnosticsEngine()
-    llm = LLMInterface(provider="gemini")  # Default can be Gemini, OpenAI later
+    # LLM_PROVIDER=local runs fully offline with the deterministic stand-in model
+    llm = LLMInterface(provider=os.getenv("LLM_PROVIDER", "gemini"))
     cli = SimulatorCLI(simulator, diagnostics, llm)
 
     # Launch interface
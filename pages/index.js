@@ -1,4 +1,5 @@
 import { useState } from "react";
+import LiveFleet from "../components/LiveFleet";
 
 /**
  * Diagnostic options and their required fields.
@@ -39,9 +40,15 @@ const DIAGNOSTICS = [
   }
 ];
 
+/**
+ * Default input values for a diagnostic type, so untouched fields are sent too.
+ */
+const defaultInputs = type =>
+  Object.fromEntries(DIAGNOSTICS.find(d => d.value === type).fields.map(f => [f.name, f.default]));
+
 export default function Home() {
   const [diagType, setDiagType] = useState(DIAGNOSTICS[0].value);
-  const [inputs, setInputs] = useState({});
+  const [inputs, setInputs] = useState(defaultInputs(DIAGNOSTICS[0].value));
   const [result, setResult] = useState(null);
   const [loading, setLoading] = useState(false);
 
@@ -86,7 +93,7 @@ export default function Home() {
           <b>Diagnostic Type:</b>
           <select
             value={diagType}
-            onChange={e => { setDiagType(e.target.value); setInputs({}); }}
+            onChange={e => { setDiagType(e.target.value); setInputs(defaultInputs(e.target.value)); }}
             style={{ marginLeft: 8, marginBottom: 16 }}
           >
             {DIAGNOSTICS.map(d => (
@@ -152,6 +159,7 @@ export default function Home() {
           </ul>
         </div>
       )}
+      <LiveFleet />
     </main>
   );
 } 
\ No newline at end of file
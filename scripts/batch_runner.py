@@ -0,0 +1,437 @@
+"""
+Batch Runner - Runs simulation scenarios headlessly and writes the results.
+Each scenario simulates a fleet, injects and clears faults on a schedule and
+diagnoses every rack at sample steps (optionally with manual search and the
+LLM). Scenarios run in parallel worker processes; results are written as
+they finish, as JSONL or CSV. The LLM budget (LLM_CALLS_PER_WINDOW,
+LLM_COST_PER_WINDOW) is split evenly across the workers.
+
+Scenario file: a JSON list or JSONL, one scenario per entry, e.g.
+    {"id": "low-charge", "racks": 20, "steps": 300, "seed": 1, "sample_every": 50,
+     "faults": [{"at_step": 100, "racks": [0, 1], "type": "low_charge"},
+                {"at_step": 250, "racks": [0], "type": "clear"}],
+     "repeat": 10, "retrieval": false, "llm": false}
+"""
+
+import argparse
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+import csv
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from diagnostics.engine import DiagnosticsEngine
+from diagnostics.escalation import EscalationPolicy
+from simulator.fleet import FAULT_EFFECTS, FAULT_TYPES, SENSOR_FIELDS, FleetSimulator
+from simulator.rack_simulator import NORMAL_RANGES
+
+
+# Defaults for fields a scenario leaves out
+SCENARIO_DEFAULTS = {
+    "racks": 1,
+    "steps": 100,
+    "seed": None,
+    "sample_every": None,  # Only the final step if not given
+    "fault_rate": 0.0,
+    "faults": [],
+    "repeat": 1,
+    "retrieval": False,
+    "llm": False,
+}
+
+# Largest fleet one scenario may simulate
+MAX_SCENARIO_RACKS = 20000
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+
+# Scenarios queued per worker (keeps memory flat for very long runs)
+QUEUED_PER_WORKER = 2
+
+# Output columns, in order (lists are joined with "; " in CSV output)
+RECORD_FIELDS = (
+    ["scenario", "seed", "step", "rack", "fault"]
+    + SENSOR_FIELDS
+    + ["alarms", "diagnosis", "confidence", "safety_warnings",
+       "escalate", "escalation_code", "references", "llm_summary"]
+)
+
+# LLM budget for the whole run per rolling hour (EscalationPolicy window);
+# each worker process gets an equal share, so the total never exceeds it
+LLM_CALLS_PER_WINDOW = 60
+LLM_COST_PER_WINDOW = 1.0
+
+# Per-process instances, created on first use in each worker
+_worker: Dict[str, Any] = {}
+
+# Worker processes sharing the LLM budget (set in each worker by _init_worker)
+_worker_count = 1
+
+
+def load_scenarios(path: Path) -> List[Dict]:
+    """
+    Read a scenario file and expand repeats into separate scenarios.
+
+    Args:
+        path: JSON list or JSONL file
+
+    Returns:
+        Validated scenarios with defaults filled in
+
+    Raises:
+        ValueError: If a scenario is malformed
+    """
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    scenarios = []
+    for number, entry in enumerate(entries, start=1):
+        scenario = {**SCENARIO_DEFAULTS, **entry}
+        scenario.setdefault("id", f"scenario-{number}")
+        _validate(scenario)
+        for repeat in range(scenario["repeat"]):
+            copy = dict(scenario)
+            if scenario["repeat"] > 1:
+                copy["id"] = f"{scenario['id']}#{repeat}"
+                copy["seed"] = None if scenario["seed"] is None else scenario["seed"] + repeat
+            scenarios.append(copy)
+    return scenarios
+
+
+def _validate(scenario: Dict):
+    """Check one scenario's fields (raises ValueError naming the scenario)."""
+    name = scenario["id"]
+    if not 1 <= scenario["racks"] <= MAX_SCENARIO_RACKS:
+        raise ValueError(f"{name}: racks must be between 1 and {MAX_SCENARIO_RACKS}")
+    if scenario["steps"] < 0 or scenario["repeat"] < 1:
+        raise ValueError(f"{name}: steps must be >= 0 and repeat >= 1")
+    if scenario["sample_every"] is not None and scenario["sample_every"] < 1:
+        raise ValueError(f"{name}: sample_every must be >= 1")
+    for fault in scenario["faults"]:
+        if fault.get("type") != "clear" and fault.get("type") not in FAULT_EFFECTS:
+            raise ValueError(f"{name}: unsupported fault type {fault.get('type')!r}")
+        if any(not 0 <= rack < scenario["racks"] for rack in _as_list(fault.get("racks", 0))):
+            raise ValueError(f"{name}: fault racks outside 0-{scenario['racks'] - 1}")
+
+
+def _as_list(value: Any) -> List:
+    return value if isinstance(value, list) else [value]
+
+
+def llm_budget_share(workers: int) -> Tuple[int, float]:
+    """
+    Split the run's LLM budget across worker processes.
+
+    Args:
+        workers: Worker processes
+
+    Returns:
+        (calls, estimated USD) each worker may spend per window
+    """
+    workers = max(1, workers)
+    return LLM_CALLS_PER_WINDOW // workers, LLM_COST_PER_WINDOW / workers
+
+
+def _init_worker(workers: int):
+    """Record how many workers share the LLM budget (runs in each worker process)."""
+    global _worker_count
+    _worker_count = workers
+
+
+def _get_worker(name: str):
+    """Shared instance for this process: engine, escalation, search or llm."""
+    if name not in _worker:
+        provider = os.getenv("LLM_PROVIDER", "gemini")
+        if name == "engine":
+            _worker[name] = DiagnosticsEngine()
+        elif name == "escalation":
+            calls, cost = llm_budget_share(_worker_count)
+            _worker[name] = EscalationPolicy(
+                provider,
+                max_calls_per_window=calls,
+                cost_budget_per_window=cost,
+                normal_ranges=NORMAL_RANGES
+            )
+        elif name == "search":
+            from embeddings.vector_search import VectorSearch
+            _worker[name] = VectorSearch()
+        elif name == "llm":
+            from llm.interface import LLMInterface
+            _worker[name] = LLMInterface(provider=provider)
+    return _worker[name]
+
+
+def run_scenario(scenario: Dict) -> Dict:
+    """
+    Simulate one scenario and diagnose its racks at each sample step.
+
+    Args:
+        scenario: Validated scenario (see load_scenarios)
+
+    Returns:
+        {"scenario": id, "records": [...], "seconds": float} or, if it failed,
+        {"scenario": id, "error": str, ...}
+    """
+    started = time.perf_counter()
+    try:
+        records = _simulate(scenario)
+    except Exception as e:
+        return {"scenario": scenario["id"], "error": str(e), "records": [],
+                "seconds": time.perf_counter() - started}
+    return {"scenario": scenario["id"], "records": records, "seconds": time.perf_counter() - started}
+
+
+def _simulate(scenario: Dict) -> List[Dict]:
+    """Run the fleet for the scenario's steps and collect sample records."""
+    fleet = FleetSimulator(scenario["racks"], seed=scenario["seed"])
+    schedule: Dict[int, List[Dict]] = {}
+    for fault in scenario["faults"]:
+        schedule.setdefault(fault.get("at_step", 0), []).append(fault)
+
+    steps, every = scenario["steps"], scenario["sample_every"]
+    records = []
+    for step in range(steps + 1):
+        for fault in schedule.get(step, []):
+            racks = _as_list(fault.get("racks", 0))
+            if fault["type"] == "clear":
+                fleet.clear_faults(racks)
+            else:
+                fleet.simulate_fault(racks, fault["type"])
+
+        if step == steps or (every and step and step % every == 0):
+            records.extend(_sample(scenario, fleet, step))
+        if step < steps:
+            fleet.step(1, scenario["fault_rate"])
+    return records
+
+
+def _sample(scenario: Dict, fleet: FleetSimulator, step: int) -> List[Dict]:
+    """Diagnose every rack at one step (plus search and LLM if enabled)."""
+    states = fleet.get_states()
+    results = _get_worker("engine").diagnose_many(states)
+
+    references: List[List[str]] = [list(result.source_references) for result in results]
+    contexts: List[List] = [[] for _ in results]
+    if scenario["retrieval"]:
+        # One search call covers every distinct diagnosis in the sample
+        queries = {(result.diagnosis, tuple(state["alarms"])) for state, result in zip(states, results)}
+        queries = sorted(queries)
+        found = _get_worker("search").get_diagnostic_contexts(
+            [{"diagnosis": diagnosis, "symptoms": list(alarms)} for diagnosis, alarms in queries]
+        )
+        by_query = dict(zip(queries, found))
+        for index, (state, result) in enumerate(zip(states, results)):
+            contexts[index] = by_query[(result.diagnosis, tuple(state["alarms"]))]
+            references[index] = [item.source_reference for item in contexts[index]]
+
+    records = []
+    for rack, (state, result) in enumerate(zip(states, results)):
+        record = {
+            "scenario": scenario["id"],
+            "seed": scenario["seed"],
+            "step": step,
+            "rack": rack,
+            "fault": FAULT_TYPES[fleet.faults[rack]],
+            **{name: round(state[name], 2) for name in SENSOR_FIELDS},
+            "alarms": state["alarms"],
+            "diagnosis": result.diagnosis,
+            "confidence": result.confidence,
+            "safety_warnings": result.safety_warnings,
+            "escalate": None,
+            "escalation_code": None,
+            "references": references[rack],
+            "llm_summary": None,
+        }
+        if scenario["llm"]:
+            _escalate(record, state, result, contexts[rack])
+        records.append(record)
+    return records
+
+
+def _escalate(record: Dict, state: Dict, result, context: List):
+    """Ask the LLM about one rack if the escalation policy agrees."""
+    llm = _get_worker("llm")
+    policy = _get_worker("escalation")
+    cached = llm.has_cached_response(state, context)
+    decision = policy.decide(state, result, cached=cached)
+    policy.commit(decision)
+    record["escalate"] = decision.escalate
+    record["escalation_code"] = decision.code
+    if not decision.escalate:
+        return
+
+    started = time.perf_counter()
+    try:
+        record["llm_summary"] = llm.ask_llm(state, context).text
+    except Exception as e:
+        record["llm_summary"] = f"LLM analysis unavailable: {str(e)}"
+        return
+    if not cached:
+        policy.record_latency(time.perf_counter() - started)
+
+
+class ResultWriter:
+    """Writes records as JSONL or CSV as they arrive."""
+
+    def __init__(self, output: TextIO, output_format: str):
+        self.output = output
+        self.output_format = output_format
+        self._csv = None
+        if output_format == "csv":
+            self._csv = csv.DictWriter(output, fieldnames=RECORD_FIELDS, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, records: List[Dict]):
+        if self._csv is None:
+            self.output.writelines(json.dumps(record) + "\n" for record in records)
+            return
+        for record in records:
+            self._csv.writerow({
+                key: "; ".join(value) if isinstance(value, list) else value
+                for key, value in record.items()
+            })
+
+
+def _completed(scenarios: List[Dict], workers: int) -> Iterator[Dict]:
+    """Run scenarios across workers, yielding results as they finish."""
+    if workers <= 1:
+        for scenario in scenarios:
+            yield run_scenario(scenario)
+        return
+
+    pending = iter(scenarios)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,)) as pool:
+        running: set[Future] = set()
+        while True:
+            # Keep a short queue per worker instead of submitting everything up front
+            while len(running) < workers * QUEUED_PER_WORKER:
+                scenario = next(pending, None)
+                if scenario is None:
+                    break
+                running.add(pool.submit(run_scenario, scenario))
+            if not running:
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def run_batch(scenarios: List[Dict], writer: ResultWriter, workers: int, quiet: bool = False) -> Dict:
+    """
+    Run all scenarios, write their records and report progress.
+
+    Args:
+        scenarios: Scenarios from load_scenarios
+        writer: Where records go
+        workers: Worker processes (1 runs in this process)
+        quiet: Suppress progress lines
+
+    Returns:
+        Summary with counts, throughput and detection statistics
+    """
+    started = last_progress = time.perf_counter()
+    done = records = 0
+    failures: List[Dict] = []
+    diagnoses: Counter = Counter()
+    detection: Counter = Counter()
+
+    for result in _completed(scenarios, workers):
+        done += 1
+        if "error" in result:
+            failures.append({"scenario": result["scenario"], "error": result["error"]})
+        writer.write(result["records"])
+        records += len(result["records"])
+        for record in result["records"]:
+            diagnoses[record["diagnosis"]] += 1
+            detection[(record["fault"] != "none", record["confidence"] > 0)] += 1
+
+        now = time.perf_counter()
+        if not quiet and now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            elapsed = now - started
+            remaining = elapsed / done * (len(scenarios) - done)
+            print(f"{done}/{len(scenarios)} scenarios, {records} records, "
+                  f"{records / elapsed:.0f} records/s, ~{remaining:.0f} s left", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    calls, cost = llm_budget_share(workers)
+    faulted = detection[(True, True)] + detection[(True, False)]
+    healthy = detection[(False, True)] + detection[(False, False)]
+    return {
+        "scenarios": done,
+        "failed": len(failures),
+        "failures": failures[:20],
+        "records": records,
+        "seconds": round(elapsed, 2),
+        "scenarios_per_second": round(done / elapsed, 2) if elapsed else None,
+        "records_per_second": round(records / elapsed, 1) if elapsed else None,
+        "workers": workers,
+        # Each worker process enforces its own share of the LLM budget
+        "llm_budget": {
+            "calls_per_window": LLM_CALLS_PER_WINDOW,
+            "cost_per_window": LLM_COST_PER_WINDOW,
+            "per_worker_calls": calls,
+            "per_worker_cost": round(cost, 4),
+        } if any(scenario["llm"] for scenario in scenarios) else None,
+        "diagnoses": dict(diagnoses.most_common()),
+        "detection_rate": round(detection[(True, True)] / faulted, 3) if faulted else None,
+        "false_alarm_rate": round(detection[(False, True)] / healthy, 3) if healthy else None,
+    }
+
+
+def main():
+    """Main function to run a scenario file from the command line."""
+    parser = argparse.ArgumentParser(description="Run simulation scenarios headlessly")
+    parser.add_argument("scenarios", type=Path, help="Scenario file (JSON list or JSONL)")
+    parser.add_argument("--output", "-o", type=Path, help="Results file (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from the file name, else jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--summary", type=Path, help="Also write the summary as JSON here")
+    parser.add_argument("--quiet", action="store_true", help="No progress lines")
+    args = parser.parse_args()
+
+    try:
+        scenarios = load_scenarios(args.scenarios)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load scenarios: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    output_format = args.format or ("csv" if args.output and args.output.suffix == ".csv" else "jsonl")
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        summary = run_batch(scenarios, ResultWriter(output, output_format), max(1, args.workers), args.quiet)
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"\n{summary['scenarios']} scenarios ({summary['failed']} failed), {summary['records']} records "
+          f"in {summary['seconds']} s: {summary['scenarios_per_second']} scenarios/s, "
+          f"{summary['records_per_second']} records/s on {summary['workers']} workers", file=sys.stderr)
+    if summary["llm_budget"] is not None:
+        budget = summary["llm_budget"]
+        print(f"LLM budget per hour: {budget['calls_per_window']} calls / ${budget['cost_per_window']:.2f}, "
+              f"split as {budget['per_worker_calls']} calls / ${budget['per_worker_cost']:.4f} per worker",
+              file=sys.stderr)
+    if summary["detection_rate"] is not None:
+        print(f"Detection rate {summary['detection_rate']:.1%}", file=sys.stderr)
+    if summary["false_alarm_rate"] is not None:
+        print(f"False alarm rate {summary['false_alarm_rate']:.1%}", file=sys.stderr)
+    for failure in summary["failures"]:
+        print(f"Failed {failure['scenario']}: {failure['error']}", file=sys.stderr)
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    if summary["failed"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
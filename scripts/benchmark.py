@@ -0,0 +1,556 @@
+"""
+Benchmark - Microbenchmarks for the hot paths, with regression gates.
+Covers state generation and fault application, single and batch diagnosis,
+manual filename classification, text chunking, vector search on a local
+index, LLM prompt formatting and history rollups. Inputs are synthetic and seeded, so runs
+are offline and repeatable; results are compared against stored baselines
+and any case slower than the threshold fails the run.
+
+    python scripts/benchmark.py --save            # record baselines
+    python scripts/benchmark.py                   # compare (exit 1 on regression)
+    python scripts/benchmark.py -k retrieval --threshold 0.3
+"""
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add project root to Python path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(PROJECT_ROOT))
+
+from utils import tracing
+
+
+# Stored baselines (relative to the project root)
+BASELINE_PATH = Path("config/benchmark_baselines.json")
+
+# A case is a regression when it is this much slower than its baseline
+DEFAULT_THRESHOLD = 0.2
+
+# ManualProcessor creates its directory layout here instead of under manuals/
+MANUALS_SCRATCH_DIR = Path(tempfile.gettempdir()) / "refrigeration-benchmark-manuals"
+
+# Seed for every synthetic input
+SEED = 1234
+
+# Timed repeats per case; the fastest is compared. Many short repeats give
+# the best chance of some landing between bursts of machine noise.
+DEFAULT_REPEATS = 20
+
+# Minimum seconds per timed repeat (calls are batched up to this)
+MIN_REPEAT_SECONDS = 0.05
+
+# Words the synthetic manual pages and queries are drawn from
+VOCABULARY = (
+    "compressor suction discharge pressure temperature superheat subcooling refrigerant charge "
+    "condenser evaporator fan motor valve expansion solenoid txv exv coil defrost oil level "
+    "amps voltage contactor overload sensor transducer controller setpoint alarm rack case "
+    "liquid line receiver filter drier sight glass leak check bypass capacity unloader "
+    "scroll reciprocating semi-hermetic crankcase heater high low limit trip reset psig "
+    "measure verify replace inspect adjust clean tighten service procedure warning caution"
+).split()
+
+# Queries like those built from diagnoses
+QUERIES = (
+    "low refrigerant charge high superheat low subcooling",
+    "high discharge temperature compressor overheating",
+    "low suction pressure evaporator frost",
+    "condenser fan failure high head pressure",
+    "expansion valve hunting superheat adjustment",
+    "compressor short cycling low pressure control",
+    "liquid line restriction filter drier pressure drop",
+    "oil level low crankcase heater check",
+)
+
+
+@dataclass
+class Benchmark:
+    """One benchmark case; setup builds its inputs and returns (run, items per run)."""
+    name: str
+    unit: str
+    description: str
+    setup: Callable[[], Tuple[Callable[[], Any], int]]
+
+
+# Registered cases, in run order
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, unit: str) -> Callable:
+    """
+    Register a setup function as a benchmark case.
+
+    Args:
+        name: Case name, "<area>.<operation>"
+        unit: What one item is (reported as items per second)
+    """
+    def register(setup: Callable) -> Callable:
+        BENCHMARKS[name] = Benchmark(name, unit, (setup.__doc__ or "").strip(), setup)
+        return setup
+    return register
+
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    """Manual-like text: sentences of vocabulary words with numbers mixed in."""
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        tokens = [rng.choice(VOCABULARY) for _ in range(length)]
+        tokens[rng.randrange(length)] = f"{rng.randint(1, 450)}"
+        sentences.append(" ".join(tokens).capitalize() + ".")
+        words -= length
+        if rng.random() < 0.15:
+            sentences.append("\n\n")
+    return " ".join(sentences)
+
+
+def synthetic_states(count: int) -> List[Dict]:
+    """Rack states cycling through normal operation and every simulated fault."""
+    from simulator.fleet import FAULT_TYPES
+    from simulator.rack_simulator import RackSimulator
+
+    simulator = RackSimulator(seed=SEED)
+    states = []
+    for index in range(count):
+        simulator.simulate_fault(FAULT_TYPES[index % len(FAULT_TYPES)])
+        states.append(simulator.get_current_state())
+    return states
+
+
+@benchmark("simulator.normal_state", unit="states")
+def bench_normal_state():
+    """Generate a normal rack state and read it as a dictionary."""
+    from simulator.rack_simulator import RackSimulator
+
+    simulator = RackSimulator(seed=SEED)
+    count = 1000
+
+    def run():
+        for _ in range(count):
+            simulator.current_state = simulator._generate_normal_state()
+            simulator.get_current_state()
+    return run, count
+
+
+@benchmark("simulator.fault", unit="states")
+def bench_fault():
+    """Apply each fault type in turn and read the state."""
+    from simulator.fleet import FAULT_TYPES
+    from simulator.rack_simulator import RackSimulator
+
+    simulator = RackSimulator(seed=SEED)
+    faults = [FAULT_TYPES[index % len(FAULT_TYPES)] for index in range(1000)]
+
+    def run():
+        for fault in faults:
+            simulator.simulate_fault(fault)
+            simulator.get_current_state()
+    return run, len(faults)
+
+
+@benchmark("diagnostics.diagnose", unit="states")
+def bench_diagnose():
+    """Diagnose states one call at a time."""
+    from diagnostics.engine import DiagnosticsEngine
+
+    engine = DiagnosticsEngine()
+    states = synthetic_states(512)
+
+    def run():
+        for state in states:
+            engine.diagnose(state)
+    return run, len(states)
+
+
+@benchmark("diagnostics.diagnose_many", unit="states")
+def bench_diagnose_many():
+    """Diagnose the same states in one batch call."""
+    from diagnostics.engine import DiagnosticsEngine
+
+    engine = DiagnosticsEngine()
+    states = synthetic_states(512)
+    return lambda: engine.diagnose_many(states), len(states)
+
+
+def synthetic_catalog(count: int) -> List[str]:
+    """Manual filenames built from the configured manufacturers, keywords and model styles."""
+    with open("config/manual_config.json", "r") as f:
+        config = json.load(f)
+    manufacturers = list(config["manufacturers"]) + ["acme", "generic"]
+    keywords = [keyword for settings in config["component_types"].values() for keyword in settings["keywords"]]
+    keywords += ["manual", "guide", "datasheet"]
+
+    rng = random.Random(SEED)
+    names = []
+    for _ in range(count):
+        model = rng.choice([
+            f"{rng.choice('ZDPR')}{rng.choice('RS')}{rng.randint(10, 999)}{rng.choice('KMT')}",
+            f"AK-CC{rng.randint(100, 999)}",
+            f"{rng.randint(2, 8)}{rng.choice(['EES', 'DES', 'FES'])}-{rng.randint(2, 9)}Y",
+            "",
+        ])
+        parts = [rng.choice(manufacturers), rng.choice(keywords), model, rng.choice(["", "rev", "en", "v2"])]
+        separator = rng.choice(["_", "-", " "])
+        names.append(separator.join(part for part in parts if part) + ".pdf")
+    return names
+
+
+@benchmark("manuals.extract_info", unit="files")
+def bench_extract_info():
+    """Classify a synthetic catalog with ManualProcessor._extract_manual_info, one file at a time."""
+    from scripts.manual_processor import ManualProcessor
+
+    processor = ManualProcessor(base_dir=str(MANUALS_SCRATCH_DIR))
+    names = synthetic_catalog(5000)
+
+    def run():
+        for name in names:
+            processor._extract_manual_info(name)
+    return run, len(names)
+
+
+@benchmark("manuals.extract_infos", unit="files")
+def bench_extract_infos():
+    """Classify the same catalog as one listing (ManualProcessor.extract_manual_infos)."""
+    from scripts.manual_processor import ManualProcessor
+
+    processor = ManualProcessor(base_dir=str(MANUALS_SCRATCH_DIR))
+    names = synthetic_catalog(5000)
+    return lambda: processor.extract_manual_infos(names), len(names)
+
+
+@benchmark("embedding.chunk", unit="pages")
+def bench_chunk():
+    """Split synthetic manual pages into 1000-character chunks with metadata."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_core.documents import Document
+    from embeddings.embedding_pipeline import chunk_pages
+
+    # Same splitter settings as EmbeddingPipeline's defaults
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len)
+    rng = random.Random(SEED)
+    pages = [
+        Document(page_content=synthetic_text(rng, 450), metadata={"page": page})
+        for page in range(200)
+    ]
+
+    def run():
+        chunk_pages(pages, splitter, "manuals/benchmark.pdf", "compressors", "benchmark manual")
+    return run, len(pages)
+
+
+def synthetic_search() -> Tuple[Any, List[str]]:
+    """VectorSearch over a local index of synthetic chunks, with hashing embeddings."""
+    from embeddings.clients import HashingEmbeddings
+    from embeddings.local_index import LocalVectorIndex
+    from embeddings.vector_search import VectorSearch
+
+    rng = random.Random(SEED)
+    component_types = ["compressors", "valves", "fans", "evaporators", "controls"]
+    embeddings = HashingEmbeddings()
+    contents = [synthetic_text(rng, 120) for _ in range(4000)]
+    metadatas = [
+        {
+            "chunk_id": f"benchmark-{row}",
+            "source": f"manual-{row // 40}",
+            "page": row % 40,
+            "component_type": component_types[(row // 40) % len(component_types)],
+        }
+        for row in range(len(contents))
+    ]
+    index = LocalVectorIndex()
+    index.add(embeddings.embed_documents(contents), contents, metadatas)
+
+    search = VectorSearch()
+    search.embeddings = embeddings
+    search.vector_store = index
+    queries = [f"{query} {rng.choice(VOCABULARY)}" for query in QUERIES for _ in range(8)]
+    return search, queries
+
+
+@benchmark("retrieval.search", unit="queries")
+def bench_search():
+    """Embed and search 64 queries one at a time, caches bypassed (4000-chunk local index)."""
+    search, queries = synthetic_search()
+
+    def run():
+        for query in queries:
+            search.search_manuals(query, max_results=5, use_cache=False)
+    return run, len(queries)
+
+
+@benchmark("retrieval.search_many", unit="queries")
+def bench_search_many():
+    """The same queries as one batched search_many call, caches bypassed."""
+    search, queries = synthetic_search()
+    return lambda: search.search_many(queries, max_results=5, use_cache=False), len(queries)
+
+
+@benchmark("llm.format_prompt", unit="prompts")
+def bench_format_prompt():
+    """Format prompts (state text plus budget-packed manual context) without calling a model."""
+    from embeddings.vector_search import SearchResult
+    from llm.interface import LLMInterface
+
+    llm = LLMInterface(provider="local", use_cache=False)
+    rng = random.Random(SEED)
+    requests = []
+    for state in synthetic_states(64):
+        context = [
+            SearchResult(
+                content=synthetic_text(rng, rng.randint(80, 250)),
+                metadata={"page": rng.randint(1, 40)},
+                similarity_score=rng.random(),
+                source_reference=f"manual-{rng.randint(1, 99)}"
+            )
+            for _ in range(8)
+        ]
+        requests.append((state, context))
+
+    def run():
+        for state, context in requests:
+            llm._format_prompt(state, context)
+    return run, len(requests)
+
+
+@benchmark("history.record", unit="fleet steps")
+def bench_history_record():
+    """Record one reading per channel of a 100-rack fleet into the rollups (1 s apart)."""
+    from simulator.fleet import FleetSimulator
+    from telemetry.history import RollupStore
+
+    fleet = FleetSimulator(100, seed=SEED)
+    store = RollupStore(len(fleet))
+    clock = {"now": 1_700_000_000.0}
+    count = 200
+
+    def run():
+        for _ in range(count):
+            clock["now"] += 1.0
+            store.record(fleet.values, clock["now"])
+    return run, count
+
+
+def synthetic_history(num_racks: int, days: int) -> Tuple[Any, float]:
+    """RollupStore backfilled with a random walk per rack channel, one sample a minute."""
+    import numpy as np
+    from simulator.fleet import FleetSimulator
+    from telemetry.history import RollupStore
+
+    fleet = FleetSimulator(num_racks, seed=SEED)
+    rng = np.random.default_rng(SEED)
+    store = RollupStore(num_racks)
+    start = 1_700_000_000.0
+    samples_per_day = 24 * 60
+    level = fleet.values
+    for day in range(days):
+        steps = rng.normal(0.0, 0.05, size=(samples_per_day,) + level.shape)
+        values = level + np.cumsum(steps, axis=0)
+        store.record_many(start + day * 86400 + np.arange(samples_per_day) * 60.0, values)
+        level = values[-1]
+    return store, start + days * 86400
+
+
+@benchmark("history.query_year", unit="queries")
+def bench_history_query_year():
+    """Year-long min/max/mean trends of one rack and of the whole fleet (at most 500 points)."""
+    store, end = synthetic_history(20, 365)
+
+    def run():
+        store.query(rack=7, start=end - 365 * 86400, end=end)
+        store.query(start=end - 365 * 86400, end=end)
+    return run, 2
+
+
+@benchmark("history.query_day", unit="queries")
+def bench_history_query_day():
+    """Last-day trends of one rack, all channels (15-minute buckets)."""
+    store, end = synthetic_history(20, 3)
+    return lambda: store.query(rack=7, start=end - 86400, end=end), 1
+
+
+def measure(run: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """
+    Time a case.
+
+    Args:
+        run: One call of the case
+        repeats: Timed repeats
+
+    Returns:
+        Fastest and median seconds per call
+    """
+    timer = timeit.Timer(run)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * MIN_REPEAT_SECONDS / elapsed)) if elapsed else number
+    timings = [total / number for total in timer.repeat(repeats, number)]
+    return {"best": min(timings), "median": statistics.median(timings)}
+
+
+def environment() -> Dict[str, Any]:
+    """Machine details saved with baselines (timings only compare on the same kind of machine)."""
+    import numpy as np
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def load_baselines(path: Path) -> Dict[str, Any]:
+    """
+    Load stored baselines.
+
+    Args:
+        path: Baseline file
+
+    Returns:
+        {"environment": {...}, "results": {case: {...}}} (empty if no file)
+    """
+    if not path.exists():
+        return {"environment": {}, "results": {}}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def run_benchmarks(names: List[str],
+                   baselines: Dict[str, Any],
+                   threshold: float,
+                   repeats: int) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Run cases and compare each with its baseline.
+
+    Args:
+        names: Cases to run
+        baselines: Stored baseline results per case
+        threshold: Allowed slowdown (0.2 = 20% slower)
+        repeats: Timed repeats per case
+
+    Returns:
+        Tuple of (results per case, names of regressed cases)
+    """
+    results = {}
+    regressions = []
+    print(f"{'case':<28}{'per item':>12}{'items/s':>13}{'baseline':>12}{'change':>9}  status")
+    for name in names:
+        case = BENCHMARKS[name]
+        run, items = case.setup()
+        timing = measure(run, repeats)
+
+        # Confirm an apparent regression with a second measurement before reporting it
+        baseline = baselines.get(name)
+        if baseline is not None and timing["best"] / items > baseline["seconds_per_item"] * (1 + threshold):
+            retry = measure(run, repeats)
+            if retry["best"] < timing["best"]:
+                timing = retry
+
+        per_item = timing["best"] / items
+        results[name] = {
+            "seconds_per_item": per_item,
+            "median_seconds_per_item": timing["median"] / items,
+            "items_per_call": items,
+            "unit": case.unit,
+        }
+
+        if baseline is None:
+            baseline_text, change_text, status = "-", "-", "new"
+        else:
+            change = per_item / baseline["seconds_per_item"] - 1
+            baseline_text = format_duration(baseline["seconds_per_item"])
+            change_text = f"{change:+.1%}"
+            if change > threshold:
+                status = "REGRESSION"
+                regressions.append(name)
+            elif change < -threshold:
+                status = "faster"
+            else:
+                status = "ok"
+        print(f"{name:<28}{format_duration(per_item):>12}{1 / per_item:>13,.0f}"
+              f"{baseline_text:>12}{change_text:>9}  {status}")
+    return results, regressions
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration with a readable unit."""
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    if seconds >= 1e-6:
+        return f"{seconds * 1e6:.2f} µs"
+    return f"{seconds * 1e9:.0f} ns"
+
+
+def select(patterns: Optional[List[str]]) -> List[str]:
+    """Cases whose name contains any of the patterns (all cases if none given)."""
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(pattern in name for pattern in patterns)]
+
+
+def main():
+    """Main function to run the benchmarks and gate on regressions."""
+    parser = argparse.ArgumentParser(description="Microbenchmarks with baseline regression checks")
+    parser.add_argument("-k", dest="patterns", action="append", help="Only run cases whose name contains this (repeatable)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a case fails (0.2 = 20%%)")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Timed repeats per case")
+    parser.add_argument("--save", action="store_true", help="Store these results as the new baselines")
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args()
+
+    # Inputs such as config/manual_config.json are read relative to the project root
+    os.chdir(PROJECT_ROOT)
+
+    names = select(args.patterns)
+    if args.list:
+        for name in names:
+            print(f"{name:<28}{BENCHMARKS[name].description}")
+        return
+    if not names:
+        print(f"No benchmark matches {args.patterns}")
+        sys.exit(2)
+
+    # Instrumentation stays out of the measurements
+    tracing.disable()
+
+    stored = load_baselines(args.baseline)
+    current_environment = environment()
+    if stored["results"] and stored["environment"] != current_environment:
+        print(f"Note: baselines were recorded on a different setup ({stored['environment']}); "
+              f"compare with care or re-run with --save.\n")
+
+    results, regressions = run_benchmarks(names, stored["results"], args.threshold, args.repeats)
+
+    if args.json:
+        args.json.write_text(json.dumps({"environment": current_environment, "results": results}, indent=2))
+
+    if args.save:
+        stored["environment"] = current_environment
+        stored["results"].update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(stored, f, indent=2)
+        print(f"\nSaved {len(results)} baselines to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} case(s) more than {args.threshold:.0%} slower than baseline: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Manual Classifier - Bulk filename classification for refrigeration manuals.
+Built once from config/manual_config.json: one keyword automaton for
+manufacturers and component types, and precompiled regexes for models.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import deque
+from dataclasses import dataclass
+import os
+import re
+
+
+# Priority used when no keyword of a kind matched
+_NO_MATCH = float("inf")
+
+
+@dataclass(frozen=True)
+class Classification:
+    """Manufacturer, component type and model identified from a filename."""
+    manufacturer: Optional[str]
+    component_type: Optional[str]
+    model: Optional[str]
+
+
+def _stem(filename: str) -> str:
+    """Lowercase file name without directory or extension."""
+    return os.path.splitext(os.path.basename(filename))[0].lower()
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over (kind, keyword, priority) entries.
+    One scan of a text reports, per kind, the matching keyword with the
+    lowest priority number, however many keywords are loaded.
+    """
+
+    def __init__(self, kinds: Tuple[str, ...]):
+        """
+        Initialize an empty automaton.
+
+        Args:
+            kinds: Names of the keyword groups (e.g. "manufacturer", "component_type")
+        """
+        self.kinds = kinds
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state and kind: lowest priority of any keyword ending here
+        self._best: List[List[float]] = [[_NO_MATCH] * len(kinds)]
+        self._values: List[Dict[float, str]] = [{} for _ in kinds]
+        self._first_output = 0
+
+    def add(self, kind: str, keyword: str, priority: int, value: str):
+        """
+        Add a keyword. Call build() after the last add().
+
+        Args:
+            kind: Keyword group the keyword belongs to
+            keyword: Text to find (matched as a substring)
+            priority: Lower numbers win when several keywords match
+            value: Value reported when this keyword wins
+        """
+        slot = self.kinds.index(kind)
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append([_NO_MATCH] * len(self.kinds))
+                self._goto[state][ch] = next_state
+            state = next_state
+
+        if priority < self._best[state][slot]:
+            self._best[state][slot] = priority
+        self._values[slot].setdefault(priority, value)
+
+    def build(self):
+        """Compute failure links and turn the trie into a full transition table."""
+        queue = deque()
+        for ch, state in self._goto[0].items():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            fail = self._fail[state]
+
+            # A state also reports everything its failure state reports
+            self._best[state] = [
+                min(own, inherited) for own, inherited in zip(self._best[state], self._best[fail])
+            ]
+
+            for ch, child in self._goto[state].items():
+                fallback = fail
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+
+            # Fill in missing transitions so scanning never follows failure links
+            for ch, target in self._goto[fail].items():
+                self._goto[state].setdefault(ch, target)
+
+        # Renumber so states where a keyword ends come last; scanning then
+        # only needs an integer comparison to know whether to check outputs
+        has_output = [any(p != _NO_MATCH for p in best) for best in self._best]
+        order = [state for state in range(len(self._goto)) if not has_output[state]]
+        self._first_output = len(order)
+        order += [state for state in range(len(self._goto)) if has_output[state]]
+        renumber = {old: new for new, old in enumerate(order)}
+
+        self._goto = [
+            {ch: renumber[target] for ch, target in self._goto[old].items()}
+            for old in order
+        ]
+        self._best = [self._best[old] for old in order]
+
+    def scan(self, text: str) -> List[Optional[str]]:
+        """
+        Find the winning keyword of each kind in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            One value per kind (None where nothing matched)
+        """
+        goto = self._goto
+        first_output = self._first_output
+        best = [_NO_MATCH] * len(self.kinds)
+
+        state = 0
+        for ch in text:
+            state = goto[state].get(ch, 0)
+            if state >= first_output:
+                for slot, priority in enumerate(self._best[state]):
+                    if priority < best[slot]:
+                        best[slot] = priority
+
+        return [
+            self._values[slot][priority] if priority != _NO_MATCH else None
+            for slot, priority in enumerate(best)
+        ]
+
+
+class ManualClassifier:
+    """
+    Classifies manual filenames by manufacturer, component type and model.
+
+    Priority rules (identical to a linear scan of the config):
+        manufacturer   - first key in "manufacturers" found in the name
+        component_type - first type in "component_types" with a keyword in the name
+        model          - leftmost match of the first "model_patterns" entry that matches
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Build the classifier.
+
+        Args:
+            config: Parsed config/manual_config.json
+        """
+        self.automaton = KeywordAutomaton(("manufacturer", "component_type"))
+
+        for priority, (key, name) in enumerate(config["manufacturers"].items()):
+            self.automaton.add("manufacturer", key, priority, name)
+
+        for priority, (type_name, type_info) in enumerate(config["component_types"].items()):
+            for keyword in type_info["keywords"]:
+                self.automaton.add("component_type", keyword, priority, type_name)
+
+        self.automaton.build()
+
+        # Compiled once, tried in priority order. Python's regex engine backtracks
+        # through an alternation, so one combined pattern is slower than these
+        self.model_patterns = [re.compile(pattern) for pattern in config["model_patterns"]]
+
+    def _match_model(self, name: str) -> Optional[str]:
+        """Get the leftmost match of the first model pattern that matches."""
+        for pattern in self.model_patterns:
+            match = pattern.search(name)
+            if match:
+                return match.group()
+        return None
+
+    def classify(self, filename: str) -> Classification:
+        """
+        Classify one manual filename.
+
+        Args:
+            filename: Name of the manual file
+
+        Returns:
+            Classification of the file
+        """
+        name = _stem(filename)
+        manufacturer, component_type = self.automaton.scan(name)
+        return Classification(
+            manufacturer=manufacturer,
+            component_type=component_type,
+            model=self._match_model(name)
+        )
+
+    def classify_many(self, filenames: Iterable[str]) -> Dict[str, Classification]:
+        """
+        Classify a whole directory listing in one pass.
+        Names repeated across subdirectories are only classified once.
+
+        Args:
+            filenames: Manual file names (or paths)
+
+        Returns:
+            Dictionary mapping each filename to its classification
+        """
+        by_stem: Dict[str, Classification] = {}
+        results = {}
+        for filename in filenames:
+            stem = _stem(filename)
+            classification = by_stem.get(stem)
+            if classification is None:
+                manufacturer, component_type = self.automaton.scan(stem)
+                classification = Classification(manufacturer, component_type, self._match_model(stem))
+                by_stem[stem] = classification
+            results[filename] = classification
+        return results
@@ -5,10 +5,12 @@ Handles file organization, component mapping, and manual processing.
 
 import os
 import shutil
+import stat
 from pathlib import Path
 import json
 from typing import Dict, List, Optional
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
 # Add project root to Python path
@@ -16,6 +18,86 @@ import sys
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from embeddings.embedding_pipeline import EmbeddingPipeline
+from embeddings.ingestion_pipeline import AsyncIngestionPipeline, ManualJob
+from embeddings.page_cache import PageCache
+from scripts.manual_classifier import Classification, ManualClassifier
+
+
+# Ways organize_manuals can place a manual under manuals/organized
+ORGANIZE_MODES = ("copy", "hardlink", "symlink")
+
+
+def _target_matches(source_stat: os.stat_result, target: Path, mode: str) -> bool:
+    """
+    Check whether an organized file already holds the source manual.
+    Uses only stat calls. In link modes only a link to the source counts,
+    so copies left by an earlier run are replaced with links.
+    
+    Args:
+        source_stat: os.stat() result of the source manual
+        target: Organized path
+        mode: "copy", "hardlink" or "symlink"
+    
+    Returns:
+        True if the target can be left alone
+    """
+    try:
+        target_lstat = target.lstat()
+        target_stat = target.stat() if stat.S_ISLNK(target_lstat.st_mode) else target_lstat
+    except OSError:
+        return False
+    
+    # Any link to the same inode is already the same file
+    same_file = (target_stat.st_ino, target_stat.st_dev) == (source_stat.st_ino, source_stat.st_dev)
+    if same_file:
+        return True
+    
+    # Copies keep size and mtime (copy2)
+    return (mode == "copy"
+            and not stat.S_ISLNK(target_lstat.st_mode)
+            and target_stat.st_size == source_stat.st_size
+            and target_stat.st_mtime_ns == source_stat.st_mtime_ns)
+
+
+def _place_manual(source: Path, source_stat: os.stat_result, target: Path, mode: str) -> str:
+    """
+    Place one manual at its organized path.
+    
+    Args:
+        source: Source manual
+        source_stat: os.stat() result of the source manual
+        target: Organized path
+        mode: "copy", "hardlink" or "symlink"
+    
+    Returns:
+        What was done: "unchanged", "copied", "hardlinked" or "symlinked"
+    """
+    if _target_matches(source_stat, target, mode):
+        return "unchanged"
+    
+    target.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Build next to the target, then rename over it so a stale file is replaced atomically
+    temp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    action = "copied"
+    try:
+        if mode == "hardlink":
+            os.link(source, temp_path)
+            action = "hardlinked"
+        elif mode == "symlink":
+            os.symlink(source.resolve(), temp_path)
+            action = "symlinked"
+    except OSError:
+        # Cross-device link or unsupported filesystem: copy instead, keeping
+        # a copy from an earlier run that fell back the same way
+        if _target_matches(source_stat, target, "copy"):
+            return "unchanged"
+        action = "copied"
+    
+    if action == "copied":
+        shutil.copy2(source, temp_path)
+    os.replace(temp_path, target)
+    return action
 
 
 @dataclass
@@ -50,6 +132,12 @@ class ManualProcessor:
         # Load configuration
         self.config = self._load_config()
         
+        # Filename classifier, compiled once from the configuration
+        self.classifier = ManualClassifier(self.config)
+        
+        # Memoized content hashes, shared with the page cache
+        self.hash_cache = PageCache(self.processed_dir / "pages")
+        
         # Create directory structure
         self._create_directory_structure()
 
@@ -105,68 +193,120 @@ class ManualProcessor:
         Returns:
             ManualInfo object with extracted information
         """
-        # Remove file extension and convert to lowercase
-        name = Path(filename).stem.lower()
-        
-        # Try to identify manufacturer
-        manufacturer = None
-        for key, value in self._get_manufacturers().items():
-            if key in name:
-                manufacturer = value
-                break
-        
-        # Try to identify component type
-        component_type = None
-        for type_name, type_info in self.config["component_types"].items():
-            if any(keyword in name for keyword in type_info["keywords"]):
-                component_type = type_name
-                break
-        
-        # Extract model number if present
-        model = None
-        for pattern in self.config["model_patterns"]:
-            model_match = re.search(pattern, name)
-            if model_match:
-                model = model_match.group()
-                break
+        return self._build_manual_info(filename, self.classifier.classify(filename))
+
+    def _build_manual_info(self, filename: str, classification: Classification) -> ManualInfo:
+        """
+        Build ManualInfo from a filename classification.
         
+        Args:
+            filename: Name of the manual file
+            classification: Result from ManualClassifier
+        
+        Returns:
+            ManualInfo object
+        """
+        component_type = classification.component_type or "unknown"
         return ManualInfo(
             filename=filename,
-            component_type=component_type or "unknown",
-            manufacturer=manufacturer or "Unknown",
-            model=model,
-            manual_reference=name,
-            file_path=str(self.organized_dir / (component_type or "unknown") / filename)
+            component_type=component_type,
+            manufacturer=classification.manufacturer or "Unknown",
+            model=classification.model,
+            manual_reference=Path(filename).stem.lower(),
+            file_path=str(self.organized_dir / component_type / filename)
         )
 
-    def organize_manuals(self, source_dir: str):
+    def extract_manual_infos(self, filenames: List[str]) -> Dict[str, ManualInfo]:
+        """
+        Extract information from a whole listing of manual filenames at once.
+        
+        Args:
+            filenames: Names of the manual files
+        
+        Returns:
+            Dictionary mapping each filename to its ManualInfo
+        """
+        return {
+            filename: self._build_manual_info(filename, classification)
+            for filename, classification in self.classifier.classify_many(filenames).items()
+        }
+
+    def organize_manuals(self, source_dir: str, mode: str = "copy", workers: int = 8):
         """
         Organize manuals into component-specific directories.
+        Files with identical content are organized once; files whose target
+        already matches are skipped, so re-organizing an unchanged library
+        only stats files.
         
         Args:
             source_dir: Directory containing unorganized manuals
+            mode: "copy", "hardlink" or "symlink"; links fall back to a copy
+                when the filesystem refuses them
+            workers: Threads used for hashing and placing files
         """
+        if mode not in ORGANIZE_MODES:
+            raise ValueError(f"Unsupported organize mode: {mode}")
+        
         source_path = Path(source_dir)
         
-        # Process each PDF file
-        for pdf_file in source_path.glob("**/*.pdf"):
-            # Extract information
-            manual_info = self._extract_manual_info(pdf_file.name)
+        # Classify the whole listing in one pass
+        pdf_files = sorted(source_path.glob("**/*.pdf"))
+        manual_infos = self.extract_manual_infos([pdf_file.name for pdf_file in pdf_files])
+        
+        # Content hashes, memoized by size and mtime so unchanged files are never read
+        def hash_file(pdf_file: Path):
+            file_stat = pdf_file.stat()
+            return file_stat, self.hash_cache.pdf_hash(str(pdf_file), save=False, stat=file_stat)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hashed = list(executor.map(hash_file, pdf_files))
+        self.hash_cache.save_hashes()
+        
+        # The first file (in path order) with a given content is the one organized
+        placements = []
+        organized_by_hash: Dict[str, ManualInfo] = {}
+        claimed_paths: Dict[str, Path] = {}
+        for pdf_file, (file_stat, sha) in zip(pdf_files, hashed):
+            original = organized_by_hash.get(sha)
+            if original is not None:
+                self.component_mapping[pdf_file.name] = original
+                print(f"Duplicate: {pdf_file.name} -> {original.filename}")
+                continue
             
-            # Copy to organized directory
-            target_dir = self.organized_dir / manual_info.component_type
-            target_dir.mkdir(exist_ok=True)
-            shutil.copy2(pdf_file, target_dir / pdf_file.name)
+            # Different manuals with the same filename would overwrite each other
+            manual_info = manual_infos[pdf_file.name]
+            if manual_info.file_path in claimed_paths:
+                print(f"Skipped: {pdf_file} has the same name as {claimed_paths[manual_info.file_path]}")
+                continue
+            claimed_paths[manual_info.file_path] = pdf_file
             
-            # Store mapping
+            organized_by_hash[sha] = manual_info
             self.component_mapping[pdf_file.name] = manual_info
-            
-            print(f"Organized: {pdf_file.name} -> {manual_info.component_type}")
+            placements.append((pdf_file, file_stat, manual_info))
+        
+        def place(placement):
+            pdf_file, file_stat, manual_info = placement
+            return _place_manual(pdf_file, file_stat, Path(manual_info.file_path), mode), manual_info
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for action, manual_info in executor.map(place, placements):
+                if action != "unchanged":
+                    print(f"Organized ({action}): {manual_info.filename} -> {manual_info.component_type}")
 
-    def process_manuals(self):
-        """Process organized manuals using the embedding pipeline."""
+    def process_manuals(self, pipelined: bool = False):
+        """
+        Process organized manuals using the embedding pipeline.
+        
+        Args:
+            pipelined: Overlap parsing, embedding and uploads across the
+                whole library instead of handling one file at a time
+        """
         pipeline = EmbeddingPipeline()
         
+        if pipelined:
+            self._process_manuals_pipelined(pipeline)
+            return
+        
         # Process each component type directory
         for component_dir in self.organized_dir.iterdir():
             if component_dir.is_dir():
@@ -185,6 +325,35 @@ class ManualProcessor:
                     component_mapping=dir_mapping
                 )
 
+    def _process_manuals_pipelined(self, pipeline: EmbeddingPipeline):
+        """
+        Ingest every organized manual through the async staged pipeline.
+        
+        Args:
+            pipeline: EmbeddingPipeline providing the embedding model and store
+        """
+        jobs = []
+        for component_dir in self.organized_dir.iterdir():
+            if not component_dir.is_dir():
+                continue
+            for pdf_file in component_dir.glob("**/*.pdf"):
+                info = self.component_mapping.get(pdf_file.name)
+                jobs.append(ManualJob(
+                    pdf_path=str(pdf_file),
+                    component_type=component_dir.name,
+                    manual_reference=info.manual_reference if info else None,
+                    manufacturer=info.manufacturer if info else None,
+                    model=info.model if info else None
+                ))
+        
+        ingestion = AsyncIngestionPipeline(pipeline)
+        ingestion.ingest(jobs)
+        
+        print(f"\nIngested {len(jobs)} manuals")
+        print(ingestion.format_metrics())
+        for failure in ingestion.failures:
+            print(f"Failed: {failure}")
+
     def update_component_specs(self, specs_path: str = "component_specs.json"):
         """
         Update component specifications with processed manual information.
@@ -240,7 +409,7 @@ def main():
     
     # Organize manuals
     print("Organizing manuals...")
-    processor.organize_manuals("manuals/raw")
+    processor.organize_manuals("manuals/raw", mode="hardlink")
     
     # Process manuals
     print("\nProcessing manuals...")
@@ -0,0 +1,46 @@
+"""
+Quantization Report - Compares compressed vector storage against exact search.
+Prints recall@k, memory use and query latency for each storage mode on the
+local vector index built by the embedding pipeline.
+"""
+
+import argparse
+from pathlib import Path
+import sys
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from embeddings.local_index import LOCAL_INDEX_DIR, LocalVectorIndex
+
+
+def main():
+    """Main function to print the recall-vs-memory report."""
+    parser = argparse.ArgumentParser(description="Recall vs memory report for the local vector index")
+    parser.add_argument("--index-dir", default=str(LOCAL_INDEX_DIR), help="Local vector index directory")
+    parser.add_argument("--k", type=int, default=10, help="Results per query used for recall@k")
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors sampled as queries")
+    args = parser.parse_args()
+
+    index = LocalVectorIndex.load(Path(args.index_dir))
+    if not len(index):
+        print(f"No local vector index found in {args.index_dir}. Run the manual processor first.")
+        sys.exit(1)
+
+    print(f"Index: {len(index)} chunks, {index.dimensions} dimensions")
+    report = index.recall_report(k=args.k, sample_size=args.queries)
+
+    print(f"\n{'storage':<10}{'recall@' + str(args.k):>12}{'memory (MB)':>14}{'vs float32':>12}{'ms/query':>10}")
+    float_bytes = report[0]["memory_bytes"]
+    for row in report:
+        print(
+            f"{row['storage']:<10}"
+            f"{row['recall_at_k']:>12.4f}"
+            f"{row['memory_bytes'] / 1e6:>14.2f}"
+            f"{row['memory_bytes'] / float_bytes:>11.1%}"
+            f"{row['ms_per_query']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
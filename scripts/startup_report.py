@@ -0,0 +1,123 @@
+"""
+Startup Report - Shows where CLI start-up time goes.
+Prints the import-time breakdown per module (from python -X importtime)
+and the wall time until the CLI shows its main menu.
+"""
+
+import argparse
+from collections import defaultdict
+from pathlib import Path
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Project root, used as the working directory for the measured runs
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Top-level packages that belong to this project
+PROJECT_PACKAGES = {"main", "diagnostics", "embeddings", "llm", "scripts", "simulator", "ui", "utils"}
+
+# One line of -X importtime output: self and cumulative microseconds, indented name
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def measure_imports(module: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module to import (e.g. "main")
+
+    Returns:
+        List of (name, self_us, cumulative_us, depth) in import order
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else f"Importing {module} failed")
+        sys.exit(1)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def time_to_menu(timeout: float = 30.0) -> float:
+    """
+    Start the CLI and measure the seconds until the main menu is printed.
+
+    Args:
+        timeout: Give up after this many seconds
+
+    Returns:
+        Seconds from process start to the menu
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "main.py"],
+        cwd=PROJECT_ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, text=True
+    )
+    elapsed = None
+    try:
+        for line in process.stdout:
+            if "Main Menu" in line:
+                elapsed = time.perf_counter() - started
+                break
+            if time.perf_counter() - started > timeout:
+                break
+    finally:
+        process.kill()
+        process.wait()
+    if elapsed is None:
+        print("The CLI did not reach its menu")
+        sys.exit(1)
+    return elapsed
+
+
+def main():
+    """Main function to print the startup report."""
+    parser = argparse.ArgumentParser(description="Import-time breakdown and time to CLI menu")
+    parser.add_argument("--module", default="main", help="Module whose imports are measured")
+    parser.add_argument("--top", type=int, default=10, help="Third-party packages to list")
+    parser.add_argument("--no-menu", action="store_true", help="Skip starting the CLI")
+    args = parser.parse_args()
+
+    entries = measure_imports(args.module)
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+
+    # Project modules with everything they pulled in
+    print(f"{'project module':<40}{'cumulative ms':>14}")
+    for name, _, cumulative_us, _ in entries:
+        if name.split(".")[0] in PROJECT_PACKAGES:
+            print(f"{name:<40}{cumulative_us / 1000:>14.1f}")
+
+    # Own import time of every other package, grouped by top-level name
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        top_level = name.split(".")[0]
+        if top_level not in PROJECT_PACKAGES:
+            packages[top_level] += self_us
+
+    print(f"\n{'package':<40}{'self ms':>14}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<40}{self_us / 1000:>14.1f}")
+
+    print(f"\nTotal import time: {total_us / 1000:.1f} ms ({len(entries)} modules)")
+
+    if not args.no_menu:
+        provider = os.getenv("LLM_PROVIDER", "gemini")
+        print(f"Time to CLI menu: {time_to_menu():.2f} s (LLM_PROVIDER={provider})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Telemetry Stand-in - Local MQTT broker or Modbus TCP server fed by a
+simulated fleet, plus an ingestion run that diagnoses what arrives.
+Lets the ingestion adapters be tried without a physical trainer rig:
+
+    python scripts/telemetry_standin.py mqtt --racks 50 --hz 5
+    python scripts/telemetry_standin.py modbus --racks 50 --hz 5 --port 5020
+    python scripts/telemetry_standin.py mqtt --serve-only --port 1883
+    python scripts/telemetry_standin.py mqtt --connect broker.local:1883 --racks 40
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from pathlib import Path
+import sys
+import time
+from typing import Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from diagnostics.engine import DiagnosticsEngine
+from simulator.fleet import FleetSimulator
+from telemetry.modbus import ModbusAdapter, StandInRegisterServer
+from telemetry.mqtt import MqttAdapter, MqttClient, StandInBroker, fleet_messages
+from telemetry.state import TelemetryState
+
+
+# Seconds between status lines (and diagnosis passes)
+REPORT_INTERVAL = 1.0
+
+# Topic prefix used by the stand-in publisher
+TOPIC_PREFIX = "site/racks"
+
+
+async def step_fleet(fleet: FleetSimulator, hz: float, fault_rate: float, client: Optional[MqttClient] = None):
+    """
+    Step the stand-in fleet at a fixed rate, publishing each step over MQTT if a client is given.
+
+    Args:
+        fleet: Simulated site
+        hz: Steps per second
+        fault_rate: Chance per rack and step of a new random fault
+        client: Publisher connected to the stand-in broker
+    """
+    faults = None
+    next_step = time.monotonic()
+    while True:
+        fleet.step(1, fault_rate)
+        if client is not None:
+            client.publish_many(fleet_messages(fleet, TOPIC_PREFIX, faults))
+            faults = fleet.faults.copy()
+        next_step = max(next_step + 1.0 / hz, time.monotonic())
+        await asyncio.sleep(next_step - time.monotonic())
+
+
+async def report(state: TelemetryState, adapter, seconds: Optional[float]):
+    """
+    Diagnose changed racks and print source metrics every REPORT_INTERVAL.
+
+    Args:
+        state: State the adapter feeds
+        adapter: MqttAdapter or ModbusAdapter
+        seconds: Stop after this long (run until interrupted if None)
+    """
+    engine = DiagnosticsEngine()
+    started = time.monotonic()
+    diagnosed = 0
+    while seconds is None or time.monotonic() - started < seconds:
+        await asyncio.sleep(REPORT_INTERVAL)
+        racks = state.take_changed()
+        results = engine.diagnose_many(state.get_states(racks))
+        diagnosed += len(results)
+        faults = Counter(result.diagnosis for result in results if result.confidence > 0)
+
+        metrics = adapter.metrics.summary()
+        print(f"{metrics['points_per_second']:>8.0f} points/s  lag {metrics['lag_ms']:>6.1f} ms "
+              f"(max {metrics['max_lag_ms']:.1f})  batches {metrics['batches']:>5}  "
+              f"errors {metrics['errors']}  dropped {metrics['dropped']}  "
+              f"{len(racks)} racks diagnosed, faults: {dict(faults) or 'none'}")
+    print(f"\n{adapter.metrics.summary()}\n{diagnosed} rack diagnoses")
+
+
+async def main_async(args: argparse.Namespace):
+    """Start the stand-in source and/or the ingestion run."""
+    fleet = FleetSimulator(args.racks, seed=args.seed)
+    tasks = []
+    stand_in = None
+    host, port = "127.0.0.1", args.port
+
+    if args.connect:
+        host, _, port_text = args.connect.rpartition(":")
+        port = int(port_text)
+    elif args.protocol == "mqtt":
+        stand_in = StandInBroker()
+        port = await stand_in.start(host, args.port)
+        publisher = await MqttClient.connect(host, port, client_id="standin-publisher")
+        tasks.append(asyncio.create_task(step_fleet(fleet, args.hz, args.fault_rate, publisher)))
+        print(f"Stand-in MQTT broker on {host}:{port}, publishing {args.racks} racks under {TOPIC_PREFIX}/")
+    else:
+        stand_in = StandInRegisterServer(fleet)
+        port = await stand_in.start(host, args.port)
+        tasks.append(asyncio.create_task(step_fleet(fleet, args.hz, args.fault_rate)))
+        print(f"Stand-in Modbus server on {host}:{port}, {args.racks} racks from register 0")
+
+    if args.serve_only:
+        await asyncio.gather(*tasks)
+        return
+
+    state = TelemetryState(args.racks)
+    if args.protocol == "mqtt":
+        adapter = MqttAdapter(state, host, port, topic_prefix=TOPIC_PREFIX)
+    else:
+        adapter = ModbusAdapter(state, host, port, poll_interval=1.0 / args.hz)
+    tasks.append(asyncio.create_task(adapter.run()))
+
+    await report(state, adapter, args.seconds)
+    adapter.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Let the stand-in see the adapter disconnect before it shuts down
+    await asyncio.sleep(0.1)
+    if stand_in is not None:
+        stand_in.close()
+
+
+def main():
+    """Main function to run a stand-in source from the command line."""
+    parser = argparse.ArgumentParser(description="Stand-in MQTT/Modbus telemetry source and ingestion check")
+    parser.add_argument("protocol", choices=["mqtt", "modbus"])
+    parser.add_argument("--racks", type=int, default=50, help="Racks at the simulated site")
+    parser.add_argument("--hz", type=float, default=5.0, help="Simulation steps (and polls) per second")
+    parser.add_argument("--fault-rate", type=float, default=0.001, help="Chance per rack and step of a new fault")
+    parser.add_argument("--port", type=int, default=0, help="Port for the stand-in (0 picks a free one)")
+    parser.add_argument("--seed", type=int, help="Random seed for the simulated site")
+    parser.add_argument("--seconds", type=float, help="Stop after this long")
+    parser.add_argument("--serve-only", action="store_true", help="Only run the stand-in source")
+    parser.add_argument("--connect", help="Ingest from a real source at host:port instead of a stand-in")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
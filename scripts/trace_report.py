@@ -0,0 +1,151 @@
+"""
+Trace Report - Shows where time goes in a diagnosis.
+Runs simulate -> diagnose -> retrieve -> LLM for a number of fault
+scenarios with tracing on, then prints time per stage, counters and one
+example trace. The metrics can also be written as Prometheus text or JSON.
+
+    LLM_PROVIDER=local VECTOR_BACKEND=local python scripts/trace_report.py --runs 20
+"""
+
+import argparse
+from pathlib import Path
+import json
+import os
+import sys
+import time
+from typing import Tuple
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from diagnostics.engine import DiagnosticsEngine
+from simulator.rack_simulator import RackSimulator
+from utils import tracing
+
+
+# Fault scenarios cycled through by the runs
+SCENARIOS = [None, "low_charge", "high_discharge_temp", "low_suction_pressure"]
+
+# Calls used to measure the cost of a traced call
+OVERHEAD_CALLS = 20000
+
+
+def run_pipeline(runs: int, retrieval: bool, llm_enabled: bool):
+    """
+    Run the diagnosis pipeline under a root span per run.
+
+    Args:
+        runs: Number of scenarios to run
+        retrieval: Include manual search
+        llm_enabled: Include the LLM call
+    """
+    simulator = RackSimulator(seed=1)
+    engine = DiagnosticsEngine()
+    search = llm = None
+    if retrieval:
+        from embeddings.vector_search import VectorSearch
+        search = VectorSearch()
+    if llm_enabled:
+        from llm.interface import LLMInterface
+        llm = LLMInterface(provider=os.getenv("LLM_PROVIDER", "gemini"))
+
+    for run in range(runs):
+        fault = SCENARIOS[run % len(SCENARIOS)]
+        with tracing.span("pipeline", fault=fault or "none"):
+            if fault:
+                simulator.simulate_fault(fault)
+            state = simulator.get_current_state()
+            result = engine.diagnose(state)
+
+            context = []
+            if search is not None:
+                try:
+                    context = search.get_diagnostic_context(result.diagnosis, state["alarms"])
+                except Exception as e:
+                    print(f"Manual search unavailable: {str(e)}")
+                    search = None
+            if llm is not None:
+                try:
+                    llm.ask_llm(state, context)
+                except Exception as e:
+                    print(f"LLM unavailable: {str(e)}")
+                    llm = None
+
+
+def measure_overhead() -> Tuple[float, float]:
+    """
+    Time DiagnosticsEngine.diagnose with tracing off and on.
+
+    Returns:
+        (nanoseconds per call with tracing off, nanoseconds per call with tracing on)
+    """
+    engine = DiagnosticsEngine()
+    state = RackSimulator(seed=1).get_current_state()
+
+    timings = []
+    for switch in (tracing.disable, tracing.enable):
+        switch()
+        best = float("inf")
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(OVERHEAD_CALLS):
+                engine.diagnose(state)
+            best = min(best, time.perf_counter() - started)
+        timings.append(best / OVERHEAD_CALLS * 1e9)
+    return timings[0], timings[1]
+
+
+def print_report(trace_example: bool):
+    """Print stage timings, counters and an example trace."""
+    data = tracing.metrics.to_dict(include_traces=True)
+    spans = [item for item in data["histograms"] if item["name"] == "span_duration_seconds"]
+    pipeline_total = sum(item["sum"] for item in spans if item["labels"]["span"] == "pipeline")
+
+    print(f"{'stage':<34}{'calls':>7}{'total ms':>11}{'mean ms':>10}{'p95 ≤ ms':>10}{'share':>8}")
+    for item in sorted(spans, key=lambda item: -item["sum"]):
+        labels = item["labels"]
+        name = labels["span"] + "".join(f" {key}={value}" for key, value in labels.items() if key != "span")
+        share = item["sum"] / pipeline_total if pipeline_total else 0
+        print(f"{name:<34}{item['count']:>7}{item['sum'] * 1000:>11.2f}{item['mean'] * 1000:>10.3f}"
+              f"{item['p95'] * 1000:>10.1f}{share:>8.1%}")
+
+    other = [item for item in data["histograms"] if item["name"] != "span_duration_seconds"]
+    if data["counters"] or other:
+        print()
+    for item in data["counters"]:
+        labels = "".join(f" {key}={value}" for key, value in item["labels"].items())
+        print(f"{item['name'] + labels:<50}{item['value']:>12g}")
+    for item in other:
+        labels = "".join(f" {key}={value}" for key, value in item["labels"].items())
+        print(f"{item['name'] + labels:<50}{'mean':>6} {item['mean']:.1f} over {item['count']}")
+
+    if trace_example and data["traces"]:
+        print("\nExample trace:")
+        print(json.dumps(data["traces"][-1], indent=2))
+
+
+def main():
+    """Main function to print the trace report."""
+    parser = argparse.ArgumentParser(description="Time each stage of the diagnosis pipeline")
+    parser.add_argument("--runs", type=int, default=20, help="Scenarios to run")
+    parser.add_argument("--no-retrieval", action="store_true", help="Skip manual search")
+    parser.add_argument("--no-llm", action="store_true", help="Skip the LLM call")
+    parser.add_argument("--prometheus", type=Path, help="Also write metrics in Prometheus text format here")
+    parser.add_argument("--json", type=Path, help="Also write metrics and traces as JSON here")
+    parser.add_argument("--trace", action="store_true", help="Print the last trace tree")
+    args = parser.parse_args()
+
+    tracing.enable()
+    run_pipeline(args.runs, not args.no_retrieval, not args.no_llm)
+    print_report(args.trace)
+    # Measured after the report so its calls stay out of the stage table
+    off, on = measure_overhead()
+    print(f"\ndiagnose() takes {off:.0f} ns per call with tracing off, {on:.0f} ns with it on")
+
+    if args.prometheus:
+        args.prometheus.write_text(tracing.export_prometheus(), encoding="utf-8")
+    if args.json:
+        args.json.write_text(tracing.export_json(include_traces=True), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
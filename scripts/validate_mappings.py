@@ -1,18 +1,244 @@
 """
 Validate Mappings - Validates and corrects manual component mappings.
-Provides interactive interface for reviewing and correcting mappings.
+Provides interactive interface for reviewing and correcting mappings,
+and a headless batch mode that writes a JSON report.
 """
 
+import argparse
+import hashlib
 import json
+import os
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 import sys
 from colorama import init, Fore, Style
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from scripts.manual_processor import ManualProcessor, ManualInfo
+
+# Fields every mapping entry must have
+REQUIRED_FIELDS = ("component_type", "manufacturer", "manual_reference")
+
+# Per-entry results from the last batch run, for incremental validation
+VALIDATION_CACHE_PATH = Path("manuals/processed/validation_cache.json")
+
+
+def load_catalog(config_path: str = "config/manual_config.json") -> Tuple[Set[str], Set[str]]:
+    """
+    Load the allowed manufacturers and component types.
+    
+    Args:
+        config_path: Path to manual_config.json
+    
+    Returns:
+        Tuple of (manufacturer names, component type names)
+    """
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    return set(config["manufacturers"].values()), set(config["component_types"])
+
+
+def check_mapping(mapping: Dict,
+                  manufacturers: Set[str],
+                  component_types: Set[str],
+                  existing_files: Set[str]) -> List[str]:
+    """
+    Check one mapping entry against the catalog.
+    
+    Args:
+        mapping: Mapping information for one manual
+        manufacturers: Allowed manufacturer names
+        component_types: Allowed component types
+        existing_files: Paths known to exist (see list_existing_files)
+    
+    Returns:
+        List of error messages (empty if the mapping is valid)
+    """
+    missing = [field for field in REQUIRED_FIELDS if field not in mapping]
+    if missing:
+        return [f"Missing required fields: {', '.join(missing)}"]
+    
+    errors = []
+    if mapping["component_type"] not in component_types:
+        errors.append(f"Invalid component type: {mapping['component_type']}")
+    if mapping["manufacturer"] not in manufacturers:
+        errors.append(f"Invalid manufacturer: {mapping['manufacturer']}")
+    file_path = mapping.get("file_path")
+    if not file_path or os.path.normpath(file_path) not in existing_files:
+        errors.append(f"File not found: {file_path}")
+    return errors
+
+
+def list_existing_files(directories: Set[str]) -> Set[str]:
+    """
+    List the files in each directory with one scandir call per directory,
+    instead of one stat call per mapped file.
+    
+    Args:
+        directories: Directories to list
+    
+    Returns:
+        Set of normalized paths of files in those directories
+    """
+    existing = set()
+    for directory in directories:
+        try:
+            with os.scandir(directory or ".") as entries:
+                for entry in entries:
+                    existing.add(os.path.normpath(os.path.join(directory, entry.name)))
+        except OSError:
+            continue
+    return existing
+
+
+def _directory_mtime(directory: str) -> Optional[int]:
+    """Modification time of a directory (changes when files are added or removed)."""
+    try:
+        return os.stat(directory or ".").st_mtime_ns
+    except OSError:
+        return None
+
+
+def _entry_key(mapping: Dict) -> str:
+    """Everything about a mapping entry that affects its validation result."""
+    return (f"{'component_type' in mapping:d}{'manufacturer' in mapping:d}{'manual_reference' in mapping:d}"
+            f"\x1f{mapping.get('component_type')}\x1f{mapping.get('manufacturer')}\x1f{mapping.get('file_path')}")
+
+
+class BatchValidator:
+    """
+    Headless validation of a whole mapping file.
+    Entries whose mapping, catalog and directory are unchanged since the
+    last run reuse their cached result.
+    """
+
+    def __init__(self,
+                 mapping_path: str = "manual_mapping.json",
+                 config_path: str = "config/manual_config.json",
+                 cache_path: Path = VALIDATION_CACHE_PATH):
+        """
+        Initialize the validator.
+        
+        Args:
+            mapping_path: Path to the mapping file
+            config_path: Path to manual_config.json
+            cache_path: Where per-entry results are kept between runs
+        """
+        self.mapping_path = mapping_path
+        self.config_path = config_path
+        self.cache_path = Path(cache_path)
+
+    def _load_cache(self) -> Dict:
+        """Load results from the last run (empty if missing or unreadable)."""
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache: Dict):
+        """Write results for the next run."""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            # json.dumps uses the C encoder; json.dump to a file does not
+            f.write(json.dumps(cache, separators=(",", ":")))
+        temp_path.replace(self.cache_path)
+
+    def validate(self, incremental: bool = True) -> Dict:
+        """
+        Validate every mapping entry.
+        
+        Args:
+            incremental: Reuse cached results for unchanged entries
+        
+        Returns:
+            Report dictionary: counts, errors by filename and timing
+        """
+        started = time.perf_counter()
+        
+        manufacturers, component_types = load_catalog(self.config_path)
+        
+        # Any catalog change invalidates every cached result
+        catalog_key = hashlib.sha1(
+            json.dumps([sorted(manufacturers), sorted(component_types)]).encode("utf-8")
+        ).hexdigest()
+        
+        cache = self._load_cache() if incremental else {}
+        if cache.get("catalog") != catalog_key:
+            cache = {}
+        cached_entries = cache.get("entries", {})
+        cached_dirs = cache.get("directories", {})
+        
+        mapping_stat = os.stat(self.mapping_path)
+        mapping_key = [mapping_stat.st_size, mapping_stat.st_mtime_ns]
+        
+        # Fast path: same mapping file and no directory listing changed
+        if cached_entries and cache.get("mapping") == mapping_key and all(
+            _directory_mtime(directory) == mtime for directory, mtime in cached_dirs.items()
+        ) and not cache.get("unlisted"):
+            return self._report(cached_entries, 0, started)
+        
+        with open(self.mapping_path, "r") as f:
+            mappings = json.load(f)
+        
+        # Directory of each entry's file, and which listings changed since the last run
+        entry_dirs = {
+            filename: os.path.normpath(mapping["file_path"]).rpartition(os.sep)[0]
+            for filename, mapping in mappings.items()
+            if isinstance(mapping, dict) and mapping.get("file_path")
+        }
+        directory_mtimes = {directory: _directory_mtime(directory) for directory in set(entry_dirs.values())}
+        changed_dirs = {
+            directory for directory, mtime in directory_mtimes.items()
+            if mtime is None or cached_dirs.get(directory) != mtime
+        }
+        
+        entries = {}
+        stale = {}
+        for filename, mapping in mappings.items():
+            if not isinstance(mapping, dict):
+                entries[filename] = ["", ["Mapping is not an object"]]
+                continue
+            
+            entry_key = _entry_key(mapping)
+            cached = cached_entries.get(filename)
+            if cached and cached[0] == entry_key and entry_dirs.get(filename) not in changed_dirs:
+                entries[filename] = cached
+            else:
+                stale[filename] = (entry_key, mapping)
+        
+        # Only directories holding re-checked entries are listed
+        existing_files = list_existing_files({
+            entry_dirs[filename] for filename in stale if filename in entry_dirs
+        })
+        for filename, (entry_key, mapping) in stale.items():
+            entries[filename] = [entry_key, check_mapping(mapping, manufacturers, component_types, existing_files)]
+        
+        self._save_cache({
+            "catalog": catalog_key,
+            "mapping": mapping_key,
+            "entries": entries,
+            "directories": {d: m for d, m in directory_mtimes.items() if m is not None},
+            # Missing directories can appear without any tracked mtime changing
+            "unlisted": any(m is None for m in directory_mtimes.values()),
+        })
+        return self._report(entries, len(stale), started)
+
+    def _report(self, entries: Dict[str, List], revalidated: int, started: float) -> Dict:
+        """Build the JSON report from per-entry [key, errors] results."""
+        errors = {filename: entry[1] for filename, entry in entries.items() if entry[1]}
+        return {
+            "mapping": str(self.mapping_path),
+            "checked": len(entries),
+            "revalidated": revalidated,
+            "valid": len(entries) - len(errors),
+            "invalid": len(errors),
+            "errors": errors,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
 
 
 class MappingValidator:
@@ -29,10 +255,19 @@ class MappingValidator:
             mapping_path: Path to the mapping file
         """
         self.mapping_path = mapping_path
-        self.processor = ManualProcessor()
+        self.manufacturers, self.component_types = load_catalog()
+        self._processor = None
         self.mappings: Dict[str, Dict] = {}
         self.load_mappings()
 
+    @property
+    def processor(self):
+        """ManualProcessor, only created when a correction needs it."""
+        if self._processor is None:
+            from scripts.manual_processor import ManualProcessor
+            self._processor = ManualProcessor()
+        return self._processor
+
     def load_mappings(self):
         """Load mappings from JSON file."""
         try:
@@ -59,18 +294,17 @@ class MappingValidator:
             True if mapping is valid, False otherwise
         """
         # Check required fields
-        required_fields = ["component_type", "manufacturer", "manual_reference"]
-        if not all(field in mapping for field in required_fields):
+        if not all(field in mapping for field in REQUIRED_FIELDS):
             print(f"{Fore.RED}Error: Missing required fields in mapping for {filename}{Style.RESET_ALL}")
             return False
         
         # Check component type
-        if mapping["component_type"] not in self.processor._get_component_types():
+        if mapping["component_type"] not in self.component_types:
             print(f"{Fore.RED}Error: Invalid component type '{mapping['component_type']}' for {filename}{Style.RESET_ALL}")
             return False
         
         # Check manufacturer
-        if mapping["manufacturer"] not in self.processor._get_manufacturers().values():
+        if mapping["manufacturer"] not in self.manufacturers:
             print(f"{Fore.RED}Error: Invalid manufacturer '{mapping['manufacturer']}' for {filename}{Style.RESET_ALL}")
             return False
         
@@ -88,17 +322,18 @@ class MappingValidator:
         Returns:
             Dictionary of validation errors by filename
         """
+        # One directory listing per directory instead of one stat per file
+        existing_files = list_existing_files({
+            os.path.dirname(os.path.normpath(mapping["file_path"]))
+            for mapping in self.mappings.values()
+            if mapping.get("file_path")
+        })
+        
         errors = {}
         for filename, mapping in self.mappings.items():
-            if not self.validate_mapping(filename, mapping):
-                errors[filename] = []
-                # Add specific error messages
-                if mapping["component_type"] not in self.processor._get_component_types():
-                    errors[filename].append(f"Invalid component type: {mapping['component_type']}")
-                if mapping["manufacturer"] not in self.processor._get_manufacturers().values():
-                    errors[filename].append(f"Invalid manufacturer: {mapping['manufacturer']}")
-                if not Path(mapping["file_path"]).exists():
-                    errors[filename].append(f"File not found: {mapping['file_path']}")
+            file_errors = check_mapping(mapping, self.manufacturers, self.component_types, existing_files)
+            if file_errors:
+                errors[filename] = file_errors
         
         return errors
 
@@ -197,9 +432,46 @@ class MappingValidator:
                 print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
 
 
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Validate the whole mapping file without prompts.
+    
+    Args:
+        args: Parsed command line arguments
+    
+    Returns:
+        Process exit code: 0 if every mapping is valid, 1 otherwise
+    """
+    validator = BatchValidator(args.mapping, args.config, args.cache)
+    report = validator.validate(incremental=not args.full)
+    
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output)
+        print(f"{report['valid']}/{report['checked']} mappings valid "
+              f"({report['revalidated']} re-checked, {report['duration_ms']:.1f} ms); report: {args.report}")
+    else:
+        print(output)
+    
+    return 1 if report["errors"] else 0
+
+
 def main():
     """Main function to run the validation process."""
-    validator = MappingValidator()
+    parser = argparse.ArgumentParser(description="Validate manual component mappings")
+    parser.add_argument("--batch", action="store_true", help="Validate everything without prompts and exit non-zero on errors")
+    parser.add_argument("--mapping", default="manual_mapping.json", help="Mapping file to validate")
+    parser.add_argument("--config", default="config/manual_config.json", help="Manual configuration with the allowed values")
+    parser.add_argument("--report", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--cache", default=str(VALIDATION_CACHE_PATH), help="Incremental validation cache")
+    parser.add_argument("--full", action="store_true", help="Ignore cached results and re-check every entry")
+    args = parser.parse_args()
+    
+    if args.batch:
+        sys.exit(run_batch(args))
+    
+    validator = MappingValidator(args.mapping)
     validator.interactive_validation()
 
 
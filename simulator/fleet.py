@@ -0,0 +1,221 @@
+"""
+FleetSimulator - Simulates many refrigeration racks at once.
+Keeps every rack's readings in one NumPy array (one column per sensor),
+so stepping a fleet of thousands of racks is a few array operations.
+"""
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Union
+import time
+
+import numpy as np
+
+from simulator.rack_simulator import NORMAL_RANGES
+from utils.tracing import traced
+
+if TYPE_CHECKING:
+    from telemetry.history import RollupStore
+
+
+# Sensor columns, in the order RackSimulator reports them
+SENSOR_FIELDS = list(NORMAL_RANGES)
+
+# Fault codes stored per rack (0 means no fault)
+FAULT_TYPES = ["none", "low_charge", "high_discharge_temp", "low_suction_pressure"]
+
+# Symptoms of each fault, matching RackSimulator: ("scale", factor) or ("set", value)
+FAULT_EFFECTS = {
+    "low_charge": {
+        "suction_pressure_psig": ("scale", 0.7),
+        "superheat_f": ("scale", 1.5),
+        "subcooling_f": ("scale", 0.5),
+        "discharge_temp_f": ("scale", 1.2),
+    },
+    "high_discharge_temp": {
+        "discharge_temp_f": ("set", 250),
+        "discharge_pressure_psig": ("scale", 1.3),
+        "condenser_fan_speed": ("set", 30),
+    },
+    "low_suction_pressure": {
+        "suction_pressure_psig": ("set", 25),
+        "superheat_f": ("set", 25),
+        "compressor_amps": ("scale", 0.8),
+    },
+}
+
+# Alarm raised by each fault
+FAULT_ALARMS = {
+    "low_charge": "low_suction_pressure",
+    "high_discharge_temp": "high_discharge_temp",
+    "low_suction_pressure": "low_suction_pressure",
+}
+
+# Share of the gap to the operating point closed per step
+STEP_REVERSION = 0.2
+
+# Per-step noise as a share of each sensor's normal range width
+STEP_NOISE = 0.02
+
+
+class FleetSimulator:
+    """
+    A fleet of racks in columnar form. Each rack drifts around its own
+    operating point; a fault moves the operating point the same way
+    RackSimulator.simulate_fault changes a single rack.
+    """
+
+    def __init__(self, num_racks: int, seed: Optional[int] = None):
+        """
+        Initialize the fleet with every rack in normal operation.
+
+        Args:
+            num_racks: Number of racks to simulate
+            seed: Random seed, for repeatable fleets
+        """
+        if num_racks < 1:
+            raise ValueError("A fleet needs at least one rack")
+
+        self.normal_ranges = dict(NORMAL_RANGES)
+        self._rng = np.random.default_rng(seed)
+        self._columns = {name: index for index, name in enumerate(SENSOR_FIELDS)}
+        self._low = np.array([NORMAL_RANGES[name][0] for name in SENSOR_FIELDS], dtype=float)
+        self._high = np.array([NORMAL_RANGES[name][1] for name in SENSOR_FIELDS], dtype=float)
+
+        self.num_racks = num_racks
+        self.step_count = 0
+        self.setpoints = self._normal_values(num_racks)
+        self.values = self.setpoints.copy()
+        self.faults = np.zeros(num_racks, dtype=np.int8)
+
+        # Rollup store that records the readings after every step (wall-clock time), if set
+        self.history: Optional["RollupStore"] = None
+
+    def __len__(self) -> int:
+        return self.num_racks
+
+    def _normal_values(self, count: int) -> np.ndarray:
+        """Random readings within the normal ranges, one row per rack."""
+        return self._rng.uniform(self._low, self._high, size=(count, len(SENSOR_FIELDS)))
+
+    def simulate_fault(self, racks: Union[int, Iterable[int]], fault_type: str):
+        """
+        Put racks into a fault condition, starting from normal operation.
+
+        Args:
+            racks: Rack index or indexes
+            fault_type: "low_charge", "high_discharge_temp" or "low_suction_pressure"
+        """
+        if fault_type not in FAULT_EFFECTS:
+            raise ValueError(f"Unsupported fault type: {fault_type}")
+
+        rows = np.atleast_1d(np.asarray(racks, dtype=np.intp))
+        setpoints = self._normal_values(len(rows))
+        for name, (operation, amount) in FAULT_EFFECTS[fault_type].items():
+            column = self._columns[name]
+            if operation == "scale":
+                setpoints[:, column] *= amount
+            else:
+                setpoints[:, column] = amount
+
+        self.setpoints[rows] = setpoints
+        self.values[rows] = setpoints
+        self.faults[rows] = FAULT_TYPES.index(fault_type)
+
+    def set_state(self, rack: int, state: Dict[str, Union[float, List[str]]], fault_type: Optional[str] = None):
+        """
+        Load one rack's readings (e.g. from RackSimulator.get_current_state).
+
+        Args:
+            rack: Rack index
+            state: Sensor readings; missing sensors keep their current value
+            fault_type: Active fault, if any
+        """
+        for name, column in self._columns.items():
+            if name in state:
+                self.values[rack, column] = self.setpoints[rack, column] = float(state[name])
+        self.faults[rack] = FAULT_TYPES.index(fault_type) if fault_type in FAULT_EFFECTS else 0
+
+    def clear_faults(self, racks: Optional[Union[int, Iterable[int]]] = None):
+        """
+        Return racks to normal operation.
+
+        Args:
+            racks: Rack index or indexes (all racks if omitted)
+        """
+        rows = np.arange(self.num_racks) if racks is None else np.atleast_1d(np.asarray(racks, dtype=np.intp))
+        self.setpoints[rows] = self._normal_values(len(rows))
+        self.faults[rows] = 0
+
+    @traced("simulator.fleet_step")
+    def step(self, steps: int = 1, fault_rate: float = 0.0) -> np.ndarray:
+        """
+        Advance the whole fleet.
+
+        Args:
+            steps: Number of time steps
+            fault_rate: Chance per rack and step that a healthy rack develops
+                a random fault
+
+        Returns:
+            Indexes of racks that developed a fault during these steps
+        """
+        width = self._high - self._low
+        new_faults = []
+        for _ in range(steps):
+            if fault_rate:
+                healthy = np.flatnonzero(self.faults == 0)
+                failing = healthy[self._rng.random(len(healthy)) < fault_rate]
+                if len(failing):
+                    kinds = self._rng.integers(1, len(FAULT_TYPES), size=len(failing))
+                    for code in np.unique(kinds):
+                        self.simulate_fault(failing[kinds == code], FAULT_TYPES[code])
+                    new_faults.append(failing)
+
+            noise = self._rng.normal(0.0, STEP_NOISE, size=self.values.shape) * width
+            self.values += STEP_REVERSION * (self.setpoints - self.values) + noise
+            self.step_count += 1
+
+        if self.history is not None:
+            self.history.record(self.values, time.time())
+        return np.concatenate(new_faults) if new_faults else np.array([], dtype=np.intp)
+
+    def get_state(self, rack: int) -> Dict[str, Union[float, List[str]]]:
+        """
+        Get one rack's state, in the same format as RackSimulator.get_current_state.
+
+        Args:
+            rack: Rack index
+
+        Returns:
+            Sensor values and alarms
+        """
+        return self.get_states([rack])[0]
+
+    def get_states(self, racks: Optional[Iterable[int]] = None) -> List[Dict[str, Union[float, List[str]]]]:
+        """
+        Get rack states as dictionaries.
+
+        Args:
+            racks: Rack indexes (all racks if omitted)
+
+        Returns:
+            One state dictionary per rack, in order
+        """
+        rows = np.arange(self.num_racks) if racks is None else np.asarray(list(racks), dtype=np.intp)
+        fan = self._columns["condenser_fan_speed"]
+        states = []
+        for values, fault in zip(self.values[rows].tolist(), self.faults[rows].tolist()):
+            state = dict(zip(SENSOR_FIELDS, values))
+            state["condenser_fan_speed"] = int(round(values[fan]))
+            state["alarms"] = [FAULT_ALARMS[FAULT_TYPES[fault]]] if fault else []
+            states.append(state)
+        return states
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Count racks per fault type.
+
+        Returns:
+            Dictionary of fault type to rack count
+        """
+        counts = np.bincount(self.faults, minlength=len(FAULT_TYPES))
+        return {name: int(count) for name, count in zip(FAULT_TYPES, counts)}
@@ -7,6 +7,21 @@ from typing import Dict, List, Optional, Union
 from dataclasses import dataclass
 import random
 
+from utils.tracing import traced
+
+
+# Normal operating ranges for R-448A
+NORMAL_RANGES = {
+    "suction_pressure_psig": (35, 45),
+    "discharge_pressure_psig": (180, 220),
+    "discharge_temp_f": (160, 200),
+    "superheat_f": (8, 15),
+    "subcooling_f": (8, 15),
+    "compressor_amps": (10, 15),
+    "condenser_fan_speed": (60, 100),
+    "liquid_line_temp_f": (90, 110)
+}
+
 
 @dataclass
 class RackState:
@@ -28,19 +43,16 @@ class RackSimulator:
     sensor behavior and equipment states.
     """
 
-    def __init__(self):
-        """Initialize the rack simulator with default values."""
-        # Normal operating ranges for R-448A
-        self.normal_ranges = {
-            "suction_pressure_psig": (35, 45),
-            "discharge_pressure_psig": (180, 220),
-            "discharge_temp_f": (160, 200),
-            "superheat_f": (8, 15),
-            "subcooling_f": (8, 15),
-            "compressor_amps": (10, 15),
-            "condenser_fan_speed": (60, 100),
-            "liquid_line_temp_f": (90, 110)
-        }
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Initialize the rack simulator with default values.
+        
+        Args:
+            seed: Random seed, for repeatable training scenarios
+        """
+        self.normal_ranges = dict(NORMAL_RANGES)
+        self._random = random.Random(seed)
+        self.fault_type: Optional[str] = None
         
         # Initialize with normal operating values
         self.current_state = self._generate_normal_state()
@@ -48,17 +60,18 @@ class RackSimulator:
     def _generate_normal_state(self) -> RackState:
         """Generate a normal operating state within acceptable ranges."""
         return RackState(
-            suction_pressure_psig=random.uniform(*self.normal_ranges["suction_pressure_psig"]),
-            discharge_pressure_psig=random.uniform(*self.normal_ranges["discharge_pressure_psig"]),
-            discharge_temp_f=random.uniform(*self.normal_ranges["discharge_temp_f"]),
-            superheat_f=random.uniform(*self.normal_ranges["superheat_f"]),
-            subcooling_f=random.uniform(*self.normal_ranges["subcooling_f"]),
-            compressor_amps=random.uniform(*self.normal_ranges["compressor_amps"]),
-            condenser_fan_speed=random.randint(*self.normal_ranges["condenser_fan_speed"]),
-            liquid_line_temp_f=random.uniform(*self.normal_ranges["liquid_line_temp_f"]),
+            suction_pressure_psig=self._random.uniform(*self.normal_ranges["suction_pressure_psig"]),
+            discharge_pressure_psig=self._random.uniform(*self.normal_ranges["discharge_pressure_psig"]),
+            discharge_temp_f=self._random.uniform(*self.normal_ranges["discharge_temp_f"]),
+            superheat_f=self._random.uniform(*self.normal_ranges["superheat_f"]),
+            subcooling_f=self._random.uniform(*self.normal_ranges["subcooling_f"]),
+            compressor_amps=self._random.uniform(*self.normal_ranges["compressor_amps"]),
+            condenser_fan_speed=self._random.randint(*self.normal_ranges["condenser_fan_speed"]),
+            liquid_line_temp_f=self._random.uniform(*self.normal_ranges["liquid_line_temp_f"]),
             alarms=[]
         )
 
+    @traced("simulator.simulate_fault")
     def simulate_fault(self, fault_type: str) -> RackState:
         """
         Simulate a specific fault condition in the rack system.
@@ -72,6 +85,7 @@ class RackSimulator:
         """
         # Start with normal state
         self.current_state = self._generate_normal_state()
+        self.fault_type = fault_type
         
         if fault_type == "low_charge":
             self._simulate_low_charge()
@@ -104,6 +118,7 @@ class RackSimulator:
         self.current_state.compressor_amps *= 0.8  # Reduce compressor load
         self.current_state.alarms.append("low_suction_pressure")
 
+    @traced("simulator.get_current_state")
     def get_current_state(self) -> Dict[str, Union[float, List[str]]]:
         """
         Get the current state of the rack system as a dictionary.
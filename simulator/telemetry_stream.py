@@ -0,0 +1,338 @@
+"""
+TelemetryStream - Live fleet telemetry for push clients (Server-Sent Events).
+Steps a fleet at a fixed tick rate and sends delta-encoded frames: only
+readings that changed at display precision are included. Clients watching
+the same racks at the same rate share one encoded frame per tick, and a
+client that falls behind gets one catch-up keyframe instead of a backlog.
+"""
+
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+
+from simulator.fleet import FAULT_ALARMS, FAULT_TYPES, SENSOR_FIELDS, FleetSimulator
+
+
+# Decimal places shown per channel; smaller changes are not sent
+CHANNEL_DECIMALS = {
+    "suction_pressure_psig": 1,
+    "discharge_pressure_psig": 0,
+    "discharge_temp_f": 0,
+    "superheat_f": 1,
+    "subcooling_f": 1,
+    "compressor_amps": 1,
+    "condenser_fan_speed": 0,
+    "liquid_line_temp_f": 0,
+}
+
+# Simulation steps per second while anyone is watching
+DEFAULT_TICK_HZ = 10.0
+
+# Most racks one client may watch
+MAX_STREAM_RACKS = 500
+
+# Seconds between keep-alive comments when nothing changes
+KEEPALIVE_SECONDS = 15.0
+
+# Alarm list for each fault code
+_FAULT_ALARM_LISTS = [[FAULT_ALARMS[name]] if name in FAULT_ALARMS else [] for name in FAULT_TYPES]
+
+_SCALES = np.array([10.0 ** CHANNEL_DECIMALS[name] for name in SENSOR_FIELDS])
+_WHOLE_CHANNELS = np.array([CHANNEL_DECIMALS[name] == 0 for name in SENSOR_FIELDS])
+
+
+def quantize(values: np.ndarray) -> np.ndarray:
+    """
+    Round readings to display precision as integers (value * 10^decimals).
+
+    Args:
+        values: Array of readings, one column per SENSOR_FIELDS entry
+
+    Returns:
+        Integer array of the same shape
+    """
+    return np.rint(values * _SCALES).astype(np.int64)
+
+
+def parse_racks(spec: Optional[str], num_racks: int) -> np.ndarray:
+    """
+    Parse a rack selection such as "0-9,12,40-45".
+
+    Args:
+        spec: Comma-separated indexes and ranges (first MAX_STREAM_RACKS racks if empty)
+        num_racks: Fleet size
+
+    Returns:
+        Sorted array of unique rack indexes
+
+    Raises:
+        ValueError: If the selection is malformed, out of range or too large
+    """
+    if not spec:
+        return np.arange(min(num_racks, MAX_STREAM_RACKS))
+
+    racks: Set[int] = set()
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            start = int(first)
+            stop = int(last) if last else start
+        except ValueError:
+            raise ValueError(f"Invalid rack selection: {part!r}")
+        if not 0 <= start <= stop < num_racks:
+            raise ValueError(f"Racks {part!r} outside 0-{num_racks - 1}")
+        racks.update(range(start, stop + 1))
+        if len(racks) > MAX_STREAM_RACKS:
+            raise ValueError(f"At most {MAX_STREAM_RACKS} racks per stream")
+    return np.array(sorted(racks), dtype=np.intp)
+
+
+def format_event(frame: Dict) -> bytes:
+    """Encode a frame as one Server-Sent Event."""
+    return f"id: {frame['seq']}\ndata: {json.dumps(frame, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+class _Group:
+    """Clients watching the same racks at the same rate; frames are built once for all."""
+
+    def __init__(self, racks: np.ndarray, interval: int):
+        self.racks = racks
+        self.interval = interval
+        self.subscribers: Set["Subscription"] = set()
+        self.sent: Optional[np.ndarray] = None  # Quantized readings as of the last frame
+        self.sent_faults: Optional[np.ndarray] = None
+        self.seq = 0
+        self._keyframe: Optional[bytes] = None
+
+    def delta(self, quantized: np.ndarray, faults: np.ndarray, step: int) -> Optional[bytes]:
+        """Encode the changes since the last frame (None if nothing changed)."""
+        current = quantized[self.racks]
+        current_faults = faults[self.racks]
+        if self.sent is None:
+            changed_rows, changed_cols = np.nonzero(np.ones_like(current, dtype=bool))
+            fault_rows = np.arange(len(self.racks))
+            keyframe = True
+        else:
+            changed_rows, changed_cols = np.nonzero(current != self.sent)
+            fault_rows = np.flatnonzero(current_faults != self.sent_faults)
+            keyframe = False
+            if not len(changed_rows) and not len(fault_rows):
+                return None
+
+        self.sent = current
+        self.sent_faults = current_faults
+        self.seq += 1
+        self._keyframe = None
+        return format_event(self._frame(changed_rows, changed_cols, fault_rows, step, keyframe))
+
+    def keyframe(self, step: int) -> bytes:
+        """Full state as of the last frame, for new or lagging clients."""
+        if self._keyframe is None:
+            rows, cols = np.nonzero(np.ones_like(self.sent, dtype=bool))
+            frame = self._frame(rows, cols, np.arange(len(self.racks)), step, True)
+            self._keyframe = format_event(frame)
+        return self._keyframe
+
+    def _frame(self,
+               rows: np.ndarray,
+               cols: np.ndarray,
+               fault_rows: np.ndarray,
+               step: int,
+               keyframe: bool) -> Dict:
+        """
+        Build a frame from cells of self.sent. Changes are [rack, channel, value]
+        triples; channel is an index into "channels", which keyframes carry.
+        """
+        values = self.sent[rows, cols] / _SCALES[cols]
+        whole = _WHOLE_CHANNELS[cols]
+        changes = [
+            [rack, col, int(value) if is_whole else value]
+            for rack, col, value, is_whole in zip(
+                self.racks[rows].tolist(), cols.tolist(), values.tolist(), whole.tolist()
+            )
+        ]
+        frame = {"seq": self.seq, "step": step, "key": keyframe, "d": changes}
+        if keyframe:
+            frame["channels"] = SENSOR_FIELDS
+        if len(fault_rows):
+            frame["alarms"] = {
+                str(self.racks[row]): _FAULT_ALARM_LISTS[self.sent_faults[row]]
+                for row in fault_rows.tolist()
+            }
+        return frame
+
+
+class Subscription:
+    """
+    One client's view of a stream. Holds at most one undelivered frame;
+    if another arrives first, the client is sent a keyframe instead.
+    """
+
+    def __init__(self, stream: "TelemetryStream", group: _Group):
+        self._stream = stream
+        self._group = group
+        self._pending: Optional[bytes] = None
+        self._needs_keyframe = group.sent is not None
+        self._ready = asyncio.Event()
+        if self._needs_keyframe:
+            self._ready.set()
+        self.frames_sent = 0
+        self.frames_coalesced = 0
+
+    def offer(self, frame: bytes):
+        """Hand the client a new frame (called by the stream)."""
+        if self._pending is not None or self._needs_keyframe:
+            # Client has not taken the previous frame: catch up with a keyframe later
+            self._pending = None
+            if not self._needs_keyframe:
+                self.frames_coalesced += 1
+            self._needs_keyframe = True
+        else:
+            self._pending = frame
+        self._ready.set()
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """
+        Yield encoded events until the stream closes.
+
+        Yields:
+            Server-Sent Event bytes (frames and keep-alive comments)
+        """
+        try:
+            while not self._stream.closed:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                self._ready.clear()
+                if self._needs_keyframe:
+                    self._needs_keyframe = False
+                    self._pending = None
+                    frame = self._group.keyframe(self._stream.fleet.step_count)
+                else:
+                    frame, self._pending = self._pending, None
+                if frame is not None:
+                    self.frames_sent += 1
+                    yield frame
+        finally:
+            self._stream.unsubscribe(self)
+
+
+class TelemetryStream:
+    """
+    Steps one fleet at a fixed rate while it has subscribers and fans
+    frames out to them. Work per tick grows with the number of distinct
+    (racks, rate) groups, not with the number of clients.
+    """
+
+    def __init__(self,
+                 fleet: FleetSimulator,
+                 lock: Optional[threading.Lock] = None,
+                 tick_hz: float = DEFAULT_TICK_HZ,
+                 fault_rate: float = 0.0):
+        """
+        Initialize the stream (the simulation loop starts with the first subscriber).
+
+        Args:
+            fleet: Fleet to simulate and publish
+            lock: Lock guarding the fleet against other writers
+            tick_hz: Simulation steps per second
+            fault_rate: Chance per rack and tick of a new random fault
+        """
+        self.fleet = fleet
+        self.lock = lock or threading.Lock()
+        self.tick_hz = tick_hz
+        self.fault_rate = fault_rate
+        self.closed = False
+        self.stats = {"ticks": 0, "frames_encoded": 0, "bytes_encoded": 0, "late_ticks": 0}
+        self._groups: Dict[Tuple[bytes, int], _Group] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(group.subscribers) for group in self._groups.values())
+
+    @property
+    def group_count(self) -> int:
+        return len(self._groups)
+
+    def subscribe(self, racks: Iterable[int], hz: float) -> Subscription:
+        """
+        Start watching racks at a given rate.
+
+        Args:
+            racks: Rack indexes (see parse_racks)
+            hz: Frames per second wanted (at most the tick rate)
+
+        Returns:
+            Subscription whose frames() feeds the HTTP response
+        """
+        racks = np.asarray(racks, dtype=np.intp)
+        interval = max(1, round(self.tick_hz / max(hz, 0.01)))
+        key = (racks.tobytes(), interval)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(racks, interval)
+
+        subscription = Subscription(self, group)
+        group.subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            self.closed = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop sending to a client; groups without clients are dropped."""
+        group = subscription._group
+        group.subscribers.discard(subscription)
+        if not group.subscribers:
+            self._groups.pop((group.racks.tobytes(), group.interval), None)
+
+    def close(self):
+        """Stop the simulation loop and end every subscription."""
+        self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+        for group in self._groups.values():
+            for subscription in group.subscribers:
+                subscription._ready.set()
+
+    async def _run(self):
+        """Fixed-rate loop: step, quantize once, send each due group's frame."""
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_hz
+        next_tick = time.monotonic()
+        while self._groups and not self.closed:
+            quantized, faults, step = await loop.run_in_executor(None, self._advance)
+            self.stats["ticks"] += 1
+
+            for group in list(self._groups.values()):
+                if step % group.interval and group.sent is not None:
+                    continue
+                frame = group.delta(quantized, faults, step)
+                if frame is None:
+                    continue
+                self.stats["frames_encoded"] += 1
+                self.stats["bytes_encoded"] += len(frame)
+                for subscription in list(group.subscribers):
+                    subscription.offer(frame)
+
+            # Keep a fixed rate; if a tick ran long, skip ahead instead of bursting
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                self.stats["late_ticks"] += 1
+                next_tick = time.monotonic()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def _advance(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Step the fleet and snapshot it at display precision."""
+        with self.lock:
+            self.fleet.step(1, self.fault_rate)
+            return quantize(self.fleet.values), self.fleet.faults.copy(), self.fleet.step_count
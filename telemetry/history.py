@@ -0,0 +1,427 @@
+"""
+History - Multi-resolution rollups of rack readings for trend charts.
+Each reading updates min/max/sum/count buckets at every resolution in
+RESOLUTIONS as it arrives, so queries never re-aggregate raw samples. Each
+resolution is a fixed ring of buckets (RETENTION), so memory stays bounded
+however long the store runs. query() picks the finest resolution that
+covers the range within max_points, so a chart of a year costs about the
+same as a chart of an hour. Whole-fleet rollups are kept alongside the
+per-rack ones, so fleet trends cost no more than a single rack's.
+"""
+
+from typing import Dict, List, Optional, Sequence
+from pathlib import Path
+import math
+import threading
+import time
+
+import numpy as np
+
+from simulator.fleet import SENSOR_FIELDS
+
+
+# Bucket widths in seconds, finest first
+RESOLUTIONS = (1, 60, 900, 3600)
+
+# Buckets kept per resolution: 15 minutes of seconds, a day of minutes,
+# 31 days of quarter hours and 400 days of hours (about 2.4 MB per rack)
+RETENTION = {1: 900, 60: 1440, 900: 2976, 3600: 9600}
+
+# Most points a range query returns unless told otherwise
+DEFAULT_MAX_POINTS = 500
+
+# Decimal places kept in query output
+OUTPUT_DECIMALS = 3
+
+
+class _Level:
+    """Ring of buckets at one resolution: min, max, sum and count per rack and channel."""
+
+    def __init__(self, resolution: int, capacity: int, num_racks: int, num_channels: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.first: Optional[int] = None  # Oldest and newest bucket ids written
+        self.newest = -1                  # (bucket id = timestamp // resolution)
+        self.bucket_ids = np.full(capacity, -1, dtype=np.int64)
+
+        # One row per rack plus a last row for the whole fleet; np.zeros
+        # memory is only committed as slots are first used
+        shape = (capacity, num_racks + 1, num_channels)
+        self.mins = np.zeros(shape, dtype=np.float32)
+        self.maxs = np.zeros(shape, dtype=np.float32)
+        self.sums = np.zeros(shape, dtype=np.float64)
+        self.counts = np.zeros(shape, dtype=np.uint32)
+
+    def oldest_time(self) -> float:
+        """Start of the oldest bucket still kept (-inf until the ring has dropped any data)."""
+        if self.first is None or self.newest - self.first < self.capacity:
+            return -math.inf
+        return (self.newest - self.capacity + 1) * self.resolution
+
+    def claim(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Point slots at new buckets, clearing whatever older bucket they held.
+
+        Args:
+            ids: Ascending, unique bucket ids about to be written
+
+        Returns:
+            Mask of ids that can be written (False for buckets already past retention)
+        """
+        self.first = int(ids[0]) if self.first is None else min(self.first, int(ids[0]))
+        self.newest = max(self.newest, int(ids[-1]))
+        slots = ids % self.capacity
+        current = self.bucket_ids[slots]
+        writable = (ids > self.newest - self.capacity) & (current <= ids)
+
+        stale = slots[writable & (current < ids)]
+        if len(stale):
+            self.mins[stale] = np.inf
+            self.maxs[stale] = -np.inf
+            self.sums[stale] = 0.0
+            self.counts[stale] = 0
+            self.bucket_ids[stale] = ids[writable & (current < ids)]
+        return writable
+
+    def add_fleet(self, slots, mins: np.ndarray, maxs: np.ndarray, sums: np.ndarray, counts: np.ndarray):
+        """Fold per-channel aggregates over the recorded racks into the fleet row of slots."""
+        self.mins[slots, -1] = np.fmin(self.mins[slots, -1], mins)
+        self.maxs[slots, -1] = np.fmax(self.maxs[slots, -1], maxs)
+        self.sums[slots, -1] += sums
+        self.counts[slots, -1] += counts
+
+
+def _ring_parts(array: np.ndarray, first: int, count: int) -> List[np.ndarray]:
+    """Views of count consecutive ring slots starting at first (two when the range wraps)."""
+    if first + count <= len(array):
+        return [array[first:first + count]]
+    return [array[first:], array[:first + count - len(array)]]
+
+
+class RollupStore:
+    """
+    Min/max/mean history of every rack channel at several resolutions.
+    Thread-safe; ingest and queries may run on different threads.
+    """
+
+    def __init__(self,
+                 num_racks: int,
+                 resolutions: Sequence[int] = RESOLUTIONS,
+                 retention: Optional[Dict[int, int]] = None):
+        """
+        Initialize an empty store.
+
+        Args:
+            num_racks: Racks at the site
+            resolutions: Bucket widths in seconds, finest first
+            retention: Buckets kept per resolution (defaults to RETENTION)
+        """
+        if num_racks < 1:
+            raise ValueError("A site needs at least one rack")
+        if list(resolutions) != sorted(set(resolutions)) or resolutions[0] < 1:
+            raise ValueError("Resolutions must be whole seconds, finest first")
+
+        retention = retention or RETENTION
+        self.num_racks = num_racks
+        self.channels = list(SENSOR_FIELDS)
+        self.levels = [
+            _Level(resolution, retention[resolution], num_racks, len(self.channels))
+            for resolution in resolutions
+        ]
+        self.lock = threading.Lock()
+        self.samples = 0
+
+    def __len__(self) -> int:
+        return self.num_racks
+
+    def memory_bytes(self) -> int:
+        """Size of the bucket arrays once every slot has been used."""
+        return sum(
+            level.mins.nbytes + level.maxs.nbytes + level.sums.nbytes + level.counts.nbytes + level.bucket_ids.nbytes
+            for level in self.levels
+        )
+
+    def record(self,
+               values: np.ndarray,
+               timestamp: Optional[float] = None,
+               racks: Optional[np.ndarray] = None):
+        """
+        Add one reading per rack and channel (a fleet step or a register poll).
+
+        Args:
+            values: One row of SENSOR_FIELDS readings per rack; NaN is skipped
+            timestamp: Unix time of the readings (now if omitted)
+            racks: Rack index per row (all racks, in order, if omitted)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        values = np.asarray(values, dtype=np.float64)
+        rows = slice(0, self.num_racks) if racks is None else np.asarray(racks, dtype=np.intp)
+        if values.shape != (self.num_racks if racks is None else len(racks), len(self.channels)):
+            raise ValueError(f"Expected values of shape (racks, {len(self.channels)})")
+        valid = ~np.isnan(values)
+        total = np.where(valid, values, 0.0)
+        fleet = (np.fmin.reduce(values, axis=0), np.fmax.reduce(values, axis=0),
+                 total.sum(axis=0), valid.sum(axis=0, dtype=np.uint32))
+
+        with self.lock:
+            for level in self.levels:
+                bucket = np.array([int(timestamp // level.resolution)])
+                if not level.claim(bucket)[0]:
+                    continue
+                slot = int(bucket[0] % level.capacity)
+                level.mins[slot, rows] = np.fmin(level.mins[slot, rows], values)
+                level.maxs[slot, rows] = np.fmax(level.maxs[slot, rows], values)
+                level.sums[slot, rows] += total
+                level.counts[slot, rows] += valid
+                level.add_fleet(slot, *fleet)
+            self.samples += int(valid.sum())
+
+    def record_many(self,
+                    timestamps: np.ndarray,
+                    values: np.ndarray,
+                    racks: Optional[np.ndarray] = None):
+        """
+        Add a run of readings in one pass (e.g. a backfill). Samples falling
+        in the same bucket are reduced together before they touch the store.
+
+        Args:
+            timestamps: Unix time per sample, ascending
+            values: Array of shape (samples, racks, channels); NaN is skipped
+            racks: Rack index per row of each sample (all racks if omitted)
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if racks is not None:
+            racks = np.asarray(racks, dtype=np.intp)
+        if values.shape != (len(timestamps), self.num_racks if racks is None else len(racks), len(self.channels)):
+            raise ValueError(f"Expected values of shape (samples, racks, {len(self.channels)})")
+        if not len(timestamps):
+            return
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError("Timestamps must be ascending")
+
+        valid = ~np.isnan(values)
+        low = np.where(valid, values, np.inf)
+        high = np.where(valid, values, -np.inf)
+        total = np.where(valid, values, 0.0)
+        present = valid.astype(np.uint32)
+
+        with self.lock:
+            for level in self.levels:
+                buckets = (timestamps // level.resolution).astype(np.int64)
+                starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+                ids = buckets[starts]
+                writable = level.claim(ids)
+                if not writable.any():
+                    continue
+
+                slots = ids[writable] % level.capacity
+                index = (slots, slice(0, self.num_racks)) if racks is None else np.ix_(slots, racks)
+                mins = np.minimum.reduceat(low, starts, axis=0)[writable]
+                maxs = np.maximum.reduceat(high, starts, axis=0)[writable]
+                sums = np.add.reduceat(total, starts, axis=0)[writable]
+                counts = np.add.reduceat(present, starts, axis=0)[writable]
+                level.mins[index] = np.fmin(level.mins[index], mins)
+                level.maxs[index] = np.fmax(level.maxs[index], maxs)
+                level.sums[index] += sums
+                level.counts[index] += counts
+                level.add_fleet(slots, mins.min(axis=1), maxs.max(axis=1), sums.sum(axis=1), counts.sum(axis=1))
+            self.samples += int(valid.sum())
+
+    def record_points(self,
+                      racks: np.ndarray,
+                      columns: np.ndarray,
+                      values: np.ndarray,
+                      timestamp: Optional[float] = None):
+        """
+        Add individual readings that arrived together (e.g. one MQTT batch).
+
+        Args:
+            racks: Rack index per reading
+            columns: SENSOR_FIELDS column per reading
+            values: Readings; NaN is skipped
+            timestamp: Unix time of the batch (now if omitted)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        keep = ~np.isnan(values) & (racks >= 0) & (racks < self.num_racks)
+        racks, columns, values = racks[keep], columns[keep], values[keep]
+        if not len(values):
+            return
+
+        # Every reading also lands in the fleet row
+        racks = np.concatenate([racks, np.full(len(racks), self.num_racks)])
+        columns = np.concatenate([columns, columns])
+        values = np.concatenate([values, values])
+
+        with self.lock:
+            for level in self.levels:
+                bucket = np.array([int(timestamp // level.resolution)])
+                if not level.claim(bucket)[0]:
+                    continue
+                slot = int(bucket[0] % level.capacity)
+                np.fmin.at(level.mins[slot], (racks, columns), values)
+                np.fmax.at(level.maxs[slot], (racks, columns), values)
+                np.add.at(level.sums[slot], (racks, columns), values)
+                np.add.at(level.counts[slot], (racks, columns), 1)
+            self.samples += len(values) // 2
+
+    def _choose_level(self, start: float, end: float, max_points: int) -> _Level:
+        """Finest level that still holds start and spans the range in at most max_points buckets."""
+        covering = [
+            level for level in self.levels
+            if level.oldest_time() <= start
+            and int(end // level.resolution) - int(start // level.resolution) < level.capacity
+        ] or self.levels[-1:]
+        for level in covering:
+            if (end - start) / level.resolution <= max_points:
+                return level
+        return covering[-1]
+
+    def query(self,
+              rack: Optional[int] = None,
+              channels: Optional[Sequence[str]] = None,
+              start: Optional[float] = None,
+              end: Optional[float] = None,
+              max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+        """
+        Get min/max/mean trends over a time range at an automatically chosen resolution.
+
+        Args:
+            rack: Rack index (the whole fleet's min/max/mean if omitted)
+            channels: SENSOR_FIELDS names (all if omitted)
+            start: Unix time of the range start (an hour before end if omitted)
+            end: Unix time of the range end (now if omitted)
+            max_points: Most points per series; adjacent buckets are merged
+                when even the coarsest resolution has more
+
+        Returns:
+            {"rack", "resolution", "bucket_seconds", "start", "end",
+             "timestamps": [bucket start, ...],
+             "series": {channel: {"min": [...], "max": [...], "mean": [...]}}}
+            with None where a channel had no readings; empty buckets are left out
+        """
+        if rack is not None and not 0 <= rack < self.num_racks:
+            raise ValueError(f"Rack {rack} is outside the site's {self.num_racks} racks")
+        channels = list(channels or self.channels)
+        unknown = [name for name in channels if name not in self.channels]
+        if unknown:
+            raise ValueError(f"Unknown channels: {', '.join(unknown)}")
+        if max_points < 1:
+            raise ValueError("max_points must be at least 1")
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        if start > end:
+            raise ValueError("start must not be after end")
+
+        columns = [self.channels.index(name) for name in channels]
+        level = self._choose_level(start, end, max_points)
+        resolution = level.resolution
+        ids = np.arange(int(start // resolution), int(end // resolution) + 1, dtype=np.int64)
+
+        with self.lock:
+            # Only buckets the ring can still hold: nothing older than its capacity, nothing after newest
+            ids = ids[(ids > level.newest - level.capacity) & (ids <= level.newest)]
+            first_slot = int(ids[0] % level.capacity) if len(ids) else 0
+
+            # Reduce each contiguous part of the ring in place, then join the small results
+            def gather(array: np.ndarray, reduce) -> np.ndarray:
+                return np.concatenate([reduce(part) for part in _ring_parts(array, first_slot, len(ids))])
+
+            row = self.num_racks if rack is None else rack
+            held = gather(level.bucket_ids, lambda part: part) == ids
+            mins = gather(level.mins[:, row], lambda part: part[:, columns])
+            maxs = gather(level.maxs[:, row], lambda part: part[:, columns])
+            sums = gather(level.sums[:, row], lambda part: part[:, columns])
+            counts = gather(level.counts[:, row], lambda part: part[:, columns].astype(np.int64))
+
+        # Slots still holding an older bucket count as empty
+        mins = np.where(held[:, np.newaxis], mins, np.inf)
+        maxs = np.where(held[:, np.newaxis], maxs, -np.inf)
+        sums = np.where(held[:, np.newaxis], sums, 0.0)
+        counts = np.where(held[:, np.newaxis], counts, 0)
+
+        # Merge neighbouring buckets when the range is too long even at this resolution
+        group = max(1, math.ceil(len(ids) / max_points))
+        if group > 1:
+            starts = np.arange(0, len(ids), group)
+            ids = ids[starts]
+            mins = np.minimum.reduceat(mins, starts, axis=0)
+            maxs = np.maximum.reduceat(maxs, starts, axis=0)
+            sums = np.add.reduceat(sums, starts, axis=0)
+            counts = np.add.reduceat(counts, starts, axis=0)
+
+        filled = counts.any(axis=1)
+        ids, mins, maxs, sums, counts = ids[filled], mins[filled], maxs[filled], sums[filled], counts[filled]
+        empty = counts == 0
+        means = sums / np.maximum(counts, 1)
+
+        def output(array: np.ndarray, column: int) -> List[Optional[float]]:
+            rounded = np.round(array[:, column].astype(np.float64), OUTPUT_DECIMALS).tolist()
+            if not empty[:, column].any():
+                return rounded
+            return [None if gap else value for value, gap in zip(rounded, empty[:, column])]
+
+        return {
+            "rack": rack,
+            "resolution": resolution,
+            "bucket_seconds": resolution * group,
+            "start": start,
+            "end": end,
+            "timestamps": (ids * resolution).tolist(),
+            "series": {
+                name: {"min": output(mins, column), "max": output(maxs, column), "mean": output(means, column)}
+                for column, name in enumerate(channels)
+            },
+        }
+
+    def save(self, path: Path):
+        """
+        Write the store to one .npz file.
+
+        Args:
+            path: Output file
+        """
+        arrays = {"resolutions": np.array([level.resolution for level in self.levels])}
+        with self.lock:
+            for level in self.levels:
+                prefix = f"level_{level.resolution}"
+                arrays[f"{prefix}_first"] = np.array(-1 if level.first is None else level.first)
+                arrays[f"{prefix}_newest"] = np.array(level.newest)
+                arrays[f"{prefix}_bucket_ids"] = level.bucket_ids
+                arrays[f"{prefix}_mins"] = level.mins
+                arrays[f"{prefix}_maxs"] = level.maxs
+                arrays[f"{prefix}_sums"] = level.sums
+                arrays[f"{prefix}_counts"] = level.counts
+            arrays["samples"] = np.array(self.samples)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "RollupStore":
+        """
+        Read a store written by save().
+
+        Args:
+            path: File written by save()
+
+        Returns:
+            RollupStore with the saved rollups
+        """
+        with np.load(path) as data:
+            resolutions = [int(resolution) for resolution in data["resolutions"]]
+            first = f"level_{resolutions[0]}"
+            retention = {resolution: len(data[f"level_{resolution}_bucket_ids"]) for resolution in resolutions}
+            store = cls(data[f"{first}_mins"].shape[1] - 1, resolutions, retention)
+            for level in store.levels:
+                prefix = f"level_{level.resolution}"
+                first_id = int(data[f"{prefix}_first"])
+                level.first = None if first_id < 0 else first_id
+                level.newest = int(data[f"{prefix}_newest"])
+                level.bucket_ids = data[f"{prefix}_bucket_ids"]
+                level.mins = data[f"{prefix}_mins"]
+                level.maxs = data[f"{prefix}_maxs"]
+                level.sums = data[f"{prefix}_sums"]
+                level.counts = data[f"{prefix}_counts"]
+            store.samples = int(data["samples"])
+        return store
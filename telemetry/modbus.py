@@ -0,0 +1,360 @@
+"""
+Modbus TCP Ingestion - Polls a site controller's holding registers.
+Each rack is a block of REGISTERS_PER_RACK signed 16-bit registers: one per
+SENSOR_FIELDS channel (scaled by 10^CHANNEL_DECIMALS) followed by an alarm
+bit word. ModbusAdapter sends every read of a poll at once (pipelined by
+transaction id) and decodes the whole response set with one NumPy call.
+StandInRegisterServer serves a simulated fleet the same way, for testing.
+"""
+
+from typing import Dict, Optional, Tuple
+import asyncio
+import struct
+import time
+
+import numpy as np
+
+from simulator.fleet import FAULT_ALARMS, FAULT_TYPES, SENSOR_FIELDS, FleetSimulator
+from simulator.telemetry_stream import CHANNEL_DECIMALS
+from telemetry.state import SourceMetrics, TelemetryState, alarm_bits
+
+
+# Function codes supported
+READ_HOLDING_REGISTERS = 3
+READ_INPUT_REGISTERS = 4
+
+# Protocol limit on registers per read
+MAX_REGISTERS_PER_READ = 125
+
+# Registers per rack: one per channel plus the alarm word
+REGISTERS_PER_RACK = len(SENSOR_FIELDS) + 1
+
+# Register value = reading * scale
+REGISTER_SCALES = np.array([10.0 ** CHANNEL_DECIMALS[name] for name in SENSOR_FIELDS])
+
+# Exception codes in error responses
+EXCEPTION_NAMES = {
+    1: "illegal function",
+    2: "illegal data address",
+    3: "illegal data value",
+    4: "server device failure",
+}
+
+# Alarm word for each fault code (used by the stand-in server)
+_FAULT_ALARM_BITS = np.array([
+    alarm_bits([FAULT_ALARMS[name]]) if name in FAULT_ALARMS else 0 for name in FAULT_TYPES
+], dtype=np.int64)
+
+
+def encode_registers(values: np.ndarray, alarms: np.ndarray) -> bytes:
+    """
+    Encode rack readings as register blocks.
+
+    Args:
+        values: One row of SENSOR_FIELDS readings per rack
+        alarms: Alarm bit word per rack
+
+    Returns:
+        Big-endian register bytes, REGISTERS_PER_RACK registers per rack
+    """
+    block = np.empty((len(values), REGISTERS_PER_RACK), dtype=">i2")
+    block[:, :-1] = np.clip(np.rint(values * REGISTER_SCALES), -32768, 32767)
+    block[:, -1] = alarms
+    return block.tobytes()
+
+
+def decode_registers(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode register blocks.
+
+    Args:
+        data: Big-endian register bytes for whole racks
+
+    Returns:
+        (readings with one row per rack, alarm word per rack)
+    """
+    block = np.frombuffer(data, dtype=">i2").reshape(-1, REGISTERS_PER_RACK)
+    return block[:, :-1] / REGISTER_SCALES, block[:, -1].astype(np.int64) & 0xFFFF
+
+
+class ModbusClient:
+    """
+    Modbus TCP client with pipelined requests: many reads can be in flight
+    on one connection, matched to responses by transaction id.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, unit: int):
+        self.unit = unit
+        self._reader = reader
+        self._writer = writer
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._read_task = asyncio.get_running_loop().create_task(self._read_responses())
+
+    @classmethod
+    async def connect(cls, host: str, port: int = 502, unit: int = 1, timeout: float = 10.0) -> "ModbusClient":
+        """
+        Open a connection.
+
+        Args:
+            host: Server host
+            port: Server port
+            unit: Unit (slave) id
+            timeout: Seconds to wait for the connection
+
+        Returns:
+            Connected client
+        """
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        return cls(reader, writer, unit)
+
+    async def read_registers(self,
+                             address: int,
+                             count: int,
+                             function: int = READ_HOLDING_REGISTERS,
+                             timeout: float = 5.0) -> bytes:
+        """
+        Read a run of registers.
+
+        Args:
+            address: First register
+            count: Registers to read (at most MAX_REGISTERS_PER_READ)
+            function: READ_HOLDING_REGISTERS or READ_INPUT_REGISTERS
+            timeout: Seconds to wait for the response
+
+        Returns:
+            Register bytes (big-endian, 2 per register)
+
+        Raises:
+            ValueError: If the server answers with a Modbus exception
+            ConnectionError: If the connection is lost
+        """
+        if not 1 <= count <= MAX_REGISTERS_PER_READ:
+            raise ValueError(f"Modbus reads are limited to 1-{MAX_REGISTERS_PER_READ} registers")
+
+        self._next_id = self._next_id % 0xFFFF + 1
+        transaction = self._next_id
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending[transaction] = waiter
+        self._writer.write(struct.pack("!HHHBBHH", transaction, 0, 6, self.unit, function, address, count))
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._pending.pop(transaction, None)
+
+    def close(self):
+        """Close the connection."""
+        self._read_task.cancel()
+        self._writer.close()
+
+    async def _read_responses(self):
+        """Match responses to waiting requests until the connection drops."""
+        error: Exception = ConnectionError("Modbus connection closed")
+        try:
+            while True:
+                header = await self._reader.readexactly(7)
+                transaction, _, length, _ = struct.unpack("!HHHB", header)
+                pdu = await self._reader.readexactly(length - 1)
+                waiter = self._pending.get(transaction)
+                if waiter is None or waiter.done():
+                    continue
+                if pdu[0] & 0x80:
+                    code = pdu[1]
+                    waiter.set_exception(ValueError(f"Modbus exception {code} ({EXCEPTION_NAMES.get(code, 'unknown')})"))
+                else:
+                    waiter.set_result(pdu[2:2 + pdu[1]])
+        except (asyncio.IncompleteReadError, OSError) as e:
+            error = ConnectionError(f"Modbus connection closed: {str(e)}")
+        finally:
+            for waiter in self._pending.values():
+                if not waiter.done():
+                    waiter.set_exception(error)
+
+
+class ModbusAdapter:
+    """
+    Feeds a TelemetryState by polling a Modbus TCP register map at a fixed rate.
+    """
+
+    def __init__(self,
+                 state: TelemetryState,
+                 host: str = "localhost",
+                 port: int = 502,
+                 unit: int = 1,
+                 base_address: int = 0,
+                 first_rack: int = 0,
+                 num_racks: Optional[int] = None,
+                 poll_interval: float = 1.0,
+                 function: int = READ_HOLDING_REGISTERS):
+        """
+        Initialize the adapter (run() connects).
+
+        Args:
+            state: State to write readings into
+            host: Server host
+            port: Server port
+            unit: Unit (slave) id
+            base_address: Register of the first rack's block
+            first_rack: State rack index of the first block
+            num_racks: Racks in the register map (defaults to the rest of the state)
+            poll_interval: Seconds between polls
+            function: READ_HOLDING_REGISTERS or READ_INPUT_REGISTERS
+        """
+        self.state = state
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.base_address = base_address
+        self.racks = np.arange(first_rack, first_rack + (num_racks or len(state) - first_rack))
+        if self.racks[-1] >= len(state):
+            raise ValueError(f"Register map covers racks past the state's {len(state)} racks")
+        self.poll_interval = poll_interval
+        self.function = function
+        self.metrics = SourceMetrics(f"modbus://{host}:{port}/{unit}")
+        self.client: Optional[ModbusClient] = None
+        self._stopped = False
+
+        # Reads of whole rack blocks, each within the per-read limit
+        racks_per_read = MAX_REGISTERS_PER_READ // REGISTERS_PER_RACK
+        self._reads = [
+            (base_address + start * REGISTERS_PER_RACK,
+             min(racks_per_read, len(self.racks) - start) * REGISTERS_PER_RACK)
+            for start in range(0, len(self.racks), racks_per_read)
+        ]
+
+    async def run(self, reconnect_delay: float = 2.0):
+        """
+        Poll until stop() (reconnects on errors).
+
+        Args:
+            reconnect_delay: Seconds to wait before reconnecting
+        """
+        while not self._stopped:
+            try:
+                self.client = await ModbusClient.connect(self.host, self.port, self.unit)
+                next_poll = time.monotonic()
+                while not self._stopped:
+                    await self.poll()
+                    # Fixed rate; a slow poll pushes the next one back instead of bursting
+                    next_poll = max(next_poll + self.poll_interval, time.monotonic())
+                    await asyncio.sleep(next_poll - time.monotonic())
+            except (OSError, ValueError, asyncio.TimeoutError) as e:
+                self.metrics.errors += 1
+                print(f"Modbus source {self.metrics.name} unavailable: {str(e)}")
+            finally:
+                if self.client is not None:
+                    self.client.close()
+            if not self._stopped:
+                await asyncio.sleep(reconnect_delay)
+
+    async def poll(self) -> int:
+        """
+        Read every rack block once and apply it to the state.
+
+        Returns:
+            Number of readings applied
+        """
+        started = time.monotonic()
+        responses = await asyncio.gather(*[
+            self.client.read_registers(address, count, self.function) for address, count in self._reads
+        ])
+        values, alarms = decode_registers(b"".join(responses))
+        received = time.monotonic()
+        self.state.apply_rows(self.racks, values, alarms, received=received)
+
+        self.metrics.round_trip_seconds = received - started
+        self.metrics.record_batch(values.size, len(responses), started, now=received)
+        return values.size
+
+    def stop(self):
+        """Stop run() and close the connection."""
+        self._stopped = True
+        if self.client is not None:
+            self.client.close()
+
+
+class StandInRegisterServer:
+    """
+    Modbus TCP server exposing a FleetSimulator as register blocks, for
+    testing without a site controller. Registers are re-encoded only when
+    the fleet has stepped.
+    """
+
+    def __init__(self, fleet: FleetSimulator, lock=None, unit: int = 1, base_address: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            fleet: Fleet whose readings are served
+            lock: Lock guarding the fleet against its stepping loop
+            unit: Unit id answered (0 answers any)
+            base_address: Register of the first rack's block
+        """
+        self.fleet = fleet
+        self.lock = lock
+        self.unit = unit
+        self.base_address = base_address
+        self.requests = 0
+        self._registers = b""
+        self._encoded_step = -1
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 502) -> int:
+        """
+        Start listening.
+
+        Args:
+            host: Interface to bind
+            port: Port (0 picks a free one)
+
+        Returns:
+            The port in use
+        """
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    def close(self):
+        """Stop the server."""
+        if self._server is not None:
+            self._server.close()
+
+    def _current_registers(self) -> bytes:
+        """Register bytes for the fleet's latest step."""
+        if self._encoded_step != self.fleet.step_count:
+            if self.lock is not None:
+                with self.lock:
+                    values, faults, step = self.fleet.values.copy(), self.fleet.faults.copy(), self.fleet.step_count
+            else:
+                values, faults, step = self.fleet.values, self.fleet.faults, self.fleet.step_count
+            self._registers = encode_registers(values, _FAULT_ALARM_BITS[faults])
+            self._encoded_step = step
+        return self._registers
+
+    def _respond(self, unit: int, function: int, data: bytes) -> bytes:
+        """Build the PDU answering one request."""
+        if function not in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            return bytes([function | 0x80, 1])
+        address, count = struct.unpack("!HH", data[:4])
+        registers = self._current_registers()
+        start = (address - self.base_address) * 2
+        end = start + count * 2
+        if not 1 <= count <= MAX_REGISTERS_PER_READ or start < 0 or end > len(registers):
+            return bytes([function | 0x80, 2])
+        return bytes([function, count * 2]) + registers[start:end]
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests on one connection."""
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction, protocol, length, unit = struct.unpack("!HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                if self.unit and unit != self.unit:
+                    continue
+                self.requests += 1
+                response = self._respond(unit, pdu[0], pdu[1:])
+                writer.write(struct.pack("!HHHB", transaction, protocol, len(response) + 1, unit) + response)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,626 @@
+"""
+MQTT Ingestion - Subscribes to a site controller's MQTT topics.
+A small MQTT 3.1.1 client (QoS 0) buffers PUBLISH packets as they arrive;
+MqttAdapter decodes everything buffered once per flush interval, so the
+per-message work is one dictionary lookup and the numbers are parsed and
+stored as arrays. StandInBroker is a minimal broker for local testing.
+
+Topics under the adapter's prefix:
+    <prefix>/<rack>/<channel>   number as text, e.g. site/racks/3/superheat_f -> "14.2"
+    <prefix>/<rack>/alarms      comma-separated alarm names ("" clears)
+    <prefix>/<rack>             JSON object of channels, optional "alarms" list
+                                and "ts" (Unix time the readings were taken)
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from simulator.fleet import FAULT_ALARMS, FAULT_TYPES, SENSOR_FIELDS, FleetSimulator
+from simulator.telemetry_stream import CHANNEL_DECIMALS
+from telemetry.state import CHANNEL_COLUMNS, SourceMetrics, TelemetryState, alarm_bits
+
+
+# MQTT control packet types
+CONNECT, CONNACK, PUBLISH, PUBACK, SUBSCRIBE, SUBACK = 1, 2, 3, 4, 8, 9
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+# Seconds between buffer flushes (decode batches) in MqttAdapter
+DEFAULT_FLUSH_INTERVAL = 0.05
+
+# Keep-alive interval sent to the broker, in seconds
+DEFAULT_KEEPALIVE = 60
+
+# Route markers for topics that are not a single channel
+_ROUTE_ALARMS = -1
+_ROUTE_OBJECT = -2
+_ROUTE_IGNORED = (-1, -3)
+
+
+def _string(value: str) -> bytes:
+    """Length-prefixed UTF-8 string."""
+    data = value.encode("utf-8")
+    return struct.pack("!H", len(data)) + data
+
+
+def encode_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    """
+    Frame an MQTT control packet.
+
+    Args:
+        packet_type: Control packet type (e.g. PUBLISH)
+        flags: Low four bits of the first byte
+        body: Variable header and payload
+
+    Returns:
+        Encoded packet
+    """
+    length = len(body)
+    header = bytearray([packet_type << 4 | flags])
+    while True:
+        byte, length = length % 128, length // 128
+        header.append(byte | (0x80 if length else 0))
+        if not length:
+            break
+    return bytes(header) + body
+
+
+def encode_publish(topic: str, payload: bytes) -> bytes:
+    """Encode a QoS 0 PUBLISH packet."""
+    return encode_packet(PUBLISH, 0, _string(topic) + payload)
+
+
+def split_packets(buffer: bytearray) -> Tuple[List[Tuple[int, int, bytes]], int]:
+    """
+    Split complete packets off the front of a receive buffer.
+
+    Args:
+        buffer: Bytes received so far
+
+    Returns:
+        ([(type, flags, body)], bytes consumed); a partial packet is left for later
+    """
+    packets = []
+    position, size = 0, len(buffer)
+    while position + 2 <= size:
+        length, multiplier, offset = 0, 1, position + 1
+        while True:
+            if offset >= size:
+                return packets, position
+            byte = buffer[offset]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            offset += 1
+            if not byte & 0x80:
+                break
+            if multiplier > 128 ** 3:
+                raise ValueError("Malformed MQTT remaining length")
+        end = offset + length
+        if end > size:
+            break
+        first = buffer[position]
+        packets.append((first >> 4, first & 0x0F, bytes(buffer[offset:end])))
+        position = end
+    return packets, position
+
+
+def parse_publish(flags: int, body: bytes) -> Tuple[str, bytes, Optional[int]]:
+    """
+    Decode a PUBLISH body.
+
+    Returns:
+        (topic, payload, packet id or None for QoS 0)
+    """
+    topic_length = struct.unpack_from("!H", body)[0]
+    topic = body[2:2 + topic_length].decode("utf-8")
+    position = 2 + topic_length
+    packet_id = None
+    if flags & 0x06:
+        packet_id = struct.unpack_from("!H", body, position)[0]
+        position += 2
+    return topic, body[position:], packet_id
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Check a topic against a filter with + and # wildcards."""
+    filter_levels = topic_filter.split("/")
+    levels = topic.split("/")
+    for index, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if index >= len(levels) or (level != "+" and level != levels[index]):
+            return False
+    return len(filter_levels) == len(levels)
+
+
+class MqttClient(asyncio.Protocol):
+    """
+    Minimal MQTT 3.1.1 client: QoS 0 subscribe and publish. Received
+    messages are buffered as (topic, payload, arrival time) until taken.
+    """
+
+    def __init__(self, client_id: str, keepalive: int = DEFAULT_KEEPALIVE):
+        self.client_id = client_id
+        self.keepalive = keepalive
+        self.closed = asyncio.get_running_loop().create_future()
+        self._transport: Optional[asyncio.Transport] = None
+        self._buffer = bytearray()
+        self._messages: List[Tuple[str, bytes, float]] = []
+        self._errors = 0
+        self._waiters: Dict[Tuple[int, int], asyncio.Future] = {}
+        self._next_id = 0
+        self._ping_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def connect(cls,
+                      host: str,
+                      port: int = 1883,
+                      client_id: Optional[str] = None,
+                      keepalive: int = DEFAULT_KEEPALIVE,
+                      timeout: float = 10.0) -> "MqttClient":
+        """
+        Connect to a broker and wait for it to accept the session.
+
+        Args:
+            host: Broker host
+            port: Broker port
+            client_id: Client identifier (random if omitted)
+            keepalive: Seconds between keep-alive pings
+            timeout: Seconds to wait for the broker
+
+        Returns:
+            Connected client
+
+        Raises:
+            ConnectionError: If the broker refuses the connection
+        """
+        loop = asyncio.get_running_loop()
+        client_id = client_id or f"rack-sim-{os.getpid()}-{id(loop) & 0xFFFF:x}"
+        _, client = await asyncio.wait_for(
+            loop.create_connection(lambda: cls(client_id, keepalive), host, port), timeout
+        )
+        body = _string("MQTT") + bytes([4, 0x02]) + struct.pack("!H", keepalive) + _string(client_id)
+        code = await client._request(CONNECT, 0, body, (CONNACK, 0), timeout)
+        if code != 0:
+            client.close()
+            raise ConnectionError(f"MQTT broker refused connection (code {code})")
+        client._ping_task = loop.create_task(client._ping())
+        return client
+
+    async def subscribe(self, topic_filters: Iterable[str], timeout: float = 10.0):
+        """
+        Subscribe to topic filters at QoS 0.
+
+        Args:
+            topic_filters: Filters such as "site/racks/#"
+            timeout: Seconds to wait for the broker
+        """
+        self._next_id = self._next_id % 0xFFFF + 1
+        payload = b"".join(_string(topic_filter) + b"\x00" for topic_filter in topic_filters)
+        codes = await self._request(SUBSCRIBE, 0x02, struct.pack("!H", self._next_id) + payload,
+                                    (SUBACK, self._next_id), timeout)
+        if any(code == 0x80 for code in codes):
+            raise ConnectionError("MQTT broker rejected a subscription")
+
+    def publish(self, topic: str, payload: bytes):
+        """Publish one QoS 0 message."""
+        self._transport.write(encode_publish(topic, payload))
+
+    def publish_many(self, messages: Iterable[Tuple[str, bytes]]):
+        """Publish QoS 0 messages in one socket write."""
+        self._transport.write(b"".join(encode_publish(topic, payload) for topic, payload in messages))
+
+    def take_messages(self) -> List[Tuple[str, bytes, float]]:
+        """
+        Take every message received since the last call.
+
+        Returns:
+            List of (topic, payload, arrival time) in arrival order
+        """
+        messages, self._messages = self._messages, []
+        return messages
+
+    def take_errors(self) -> int:
+        """Number of malformed packets dropped since the last call."""
+        errors, self._errors = self._errors, 0
+        return errors
+
+    def close(self):
+        """Disconnect from the broker."""
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+        if self._transport is not None and not self._transport.is_closing():
+            self._transport.write(encode_packet(DISCONNECT, 0, b""))
+            self._transport.close()
+
+    async def _request(self, packet_type: int, flags: int, body: bytes, reply: Tuple[int, int], timeout: float):
+        """Send a packet and wait for its acknowledgement."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[reply] = waiter
+        self._transport.write(encode_packet(packet_type, flags, body))
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._waiters.pop(reply, None)
+
+    async def _ping(self):
+        """Keep the session alive while idle."""
+        while True:
+            await asyncio.sleep(self.keepalive / 2)
+            self._transport.write(encode_packet(PINGREQ, 0, b""))
+
+    def connection_made(self, transport: asyncio.Transport):
+        self._transport = transport
+
+    def connection_lost(self, exc: Optional[Exception]):
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_exception(ConnectionError("MQTT connection closed"))
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        try:
+            packets, consumed = split_packets(self._buffer)
+        except ValueError:
+            # The stream can't be re-synchronised; drop the connection so run() reconnects
+            self._errors += 1
+            self._transport.close()
+            return
+        del self._buffer[:consumed]
+
+        received = time.monotonic()
+        for packet_type, flags, body in packets:
+            if packet_type == PUBLISH:
+                try:
+                    topic, payload, packet_id = parse_publish(flags, body)
+                except (ValueError, struct.error):
+                    self._errors += 1
+                    continue
+                self._messages.append((topic, payload, received))
+                if packet_id is not None:
+                    self._transport.write(encode_packet(PUBACK, 0, struct.pack("!H", packet_id)))
+            elif packet_type == CONNACK:
+                self._resolve((CONNACK, 0), body[1])
+            elif packet_type == SUBACK:
+                self._resolve((SUBACK, struct.unpack_from("!H", body)[0]), list(body[2:]))
+
+    def _resolve(self, key: Tuple[int, int], value):
+        waiter = self._waiters.get(key)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(value)
+
+
+class MqttAdapter:
+    """
+    Feeds a TelemetryState from MQTT. Messages are buffered by the client
+    and decoded in batches every flush interval.
+    """
+
+    def __init__(self,
+                 state: TelemetryState,
+                 host: str = "localhost",
+                 port: int = 1883,
+                 topic_prefix: str = "site/racks",
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 client_id: Optional[str] = None):
+        """
+        Initialize the adapter (run() connects).
+
+        Args:
+            state: State to write readings into
+            host: Broker host
+            port: Broker port
+            topic_prefix: Topic prefix the site publishes under
+            flush_interval: Seconds between batch decodes
+            client_id: MQTT client identifier
+        """
+        self.state = state
+        self.host = host
+        self.port = port
+        self.topic_prefix = topic_prefix.rstrip("/")
+        self.flush_interval = flush_interval
+        self.client_id = client_id
+        self.metrics = SourceMetrics(f"mqtt://{host}:{port}/{self.topic_prefix}")
+        self.client: Optional[MqttClient] = None
+        self._routes: Dict[str, Tuple[int, int]] = {}
+        self._stopped = False
+
+    async def run(self, reconnect_delay: float = 2.0):
+        """
+        Connect, subscribe and decode batches until stop() (reconnects on errors).
+
+        Args:
+            reconnect_delay: Seconds to wait before reconnecting
+        """
+        while not self._stopped:
+            try:
+                self.client = await MqttClient.connect(self.host, self.port, self.client_id)
+                await self.client.subscribe([f"{self.topic_prefix}/#"])
+                while not self._stopped and not self.client.closed.done():
+                    await asyncio.sleep(self.flush_interval)
+                    self._flush()
+            except (OSError, asyncio.TimeoutError) as e:
+                self.metrics.errors += 1
+                print(f"MQTT source {self.metrics.name} unavailable: {str(e)}")
+            finally:
+                if self.client is not None:
+                    self._flush()
+                    self.client.close()
+            if not self._stopped:
+                await asyncio.sleep(reconnect_delay)
+
+    def stop(self):
+        """Stop run() after the current batch."""
+        self._stopped = True
+        if self.client is not None:
+            self.client.close()
+
+    def _flush(self):
+        """Decode what the client has buffered; a batch that fails is counted, not fatal."""
+        messages = self.client.take_messages()
+        self.metrics.errors += self.client.take_errors()
+        try:
+            self.decode(messages)
+        except Exception as e:
+            self.metrics.errors += 1
+            self.metrics.dropped += len(messages)
+            print(f"MQTT source {self.metrics.name} dropped a batch of {len(messages)}: {str(e)}")
+
+    def decode(self, messages: List[Tuple[str, bytes, float]]) -> int:
+        """
+        Decode a batch of messages into the state.
+
+        Args:
+            messages: (topic, payload, arrival time) from MqttClient.take_messages
+
+        Returns:
+            Number of readings applied
+        """
+        if not messages:
+            return 0
+
+        routes = self._routes
+        racks: List[int] = []
+        columns: List[int] = []
+        payloads: List[bytes] = []
+        alarm_racks: List[int] = []
+        alarm_words: List[int] = []
+        oldest = messages[0][2]
+        dropped = 0
+
+        for topic, payload, _ in messages:
+            route = routes.get(topic)
+            if route is None:
+                route = routes[topic] = self._route(topic)
+            rack, column = route
+            if column >= 0:
+                racks.append(rack)
+                columns.append(column)
+                payloads.append(payload)
+            elif column == _ROUTE_ALARMS:
+                text = payload.decode("utf-8", "ignore")
+                alarm_racks.append(rack)
+                alarm_words.append(alarm_bits(name.strip() for name in text.split(",")))
+            elif column == _ROUTE_OBJECT:
+                oldest = min(oldest, self._decode_object(rack, payload, racks, columns, payloads, alarm_racks, alarm_words))
+            else:
+                dropped += 1
+
+        values = self._parse_numbers(payloads)
+        valid = ~np.isnan(values)
+        applied = self.state.apply(
+            np.asarray(racks, dtype=np.intp)[valid], np.asarray(columns, dtype=np.intp)[valid],
+            values[valid], received=messages[-1][2]
+        )
+        if alarm_racks:
+            self.state.set_alarms(np.asarray(alarm_racks, dtype=np.intp), np.asarray(alarm_words, dtype=np.int64))
+
+        self.metrics.dropped += dropped + int(valid.sum()) - applied
+        self.metrics.record_batch(applied, len(messages), oldest)
+        return applied
+
+    def _route(self, topic: str) -> Tuple[int, int]:
+        """Work out (rack, column or route marker) for a topic, once per topic."""
+        prefix = self.topic_prefix + "/"
+        if not topic.startswith(prefix):
+            return _ROUTE_IGNORED
+        parts = topic[len(prefix):].split("/")
+        try:
+            rack = int(parts[0])
+        except ValueError:
+            return _ROUTE_IGNORED
+        if len(parts) == 1:
+            return rack, _ROUTE_OBJECT
+        if len(parts) == 2 and parts[1] == "alarms":
+            return rack, _ROUTE_ALARMS
+        if len(parts) == 2 and parts[1] in CHANNEL_COLUMNS:
+            return rack, CHANNEL_COLUMNS[parts[1]]
+        return _ROUTE_IGNORED
+
+    def _decode_object(self, rack, payload, racks, columns, payloads, alarm_racks, alarm_words) -> float:
+        """Unpack a JSON rack message into the batch lists; returns when it was measured."""
+        now = time.monotonic()
+        try:
+            readings = json.loads(payload)
+        except ValueError:
+            self.metrics.errors += 1
+            return now
+        if not isinstance(readings, dict):
+            self.metrics.errors += 1
+            return now
+        for name, value in readings.items():
+            column = CHANNEL_COLUMNS.get(name)
+            if column is not None:
+                racks.append(rack)
+                columns.append(column)
+                payloads.append(str(value).encode())
+        if isinstance(readings.get("alarms"), list):
+            alarm_racks.append(rack)
+            alarm_words.append(alarm_bits(readings["alarms"]))
+        if isinstance(readings.get("ts"), (int, float)):
+            return now - max(0.0, time.time() - readings["ts"])
+        return now
+
+    def _parse_numbers(self, payloads: List[bytes]) -> np.ndarray:
+        """Parse numeric payloads in one call; bad ones become NaN and count as errors."""
+        if not payloads:
+            return np.empty(0)
+        try:
+            return np.array(payloads, dtype=np.bytes_).astype(float)
+        except ValueError:
+            values = np.empty(len(payloads))
+            for index, payload in enumerate(payloads):
+                try:
+                    values[index] = float(payload)
+                except ValueError:
+                    values[index] = np.nan
+                    self.metrics.errors += 1
+            return values
+
+
+class _BrokerSession(asyncio.Protocol):
+    """One client connection to the stand-in broker."""
+
+    def __init__(self, broker: "StandInBroker"):
+        self.broker = broker
+        self.filters: Set[str] = set()
+        self.transport: Optional[asyncio.Transport] = None
+        self._buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.broker._remove(self)
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        try:
+            packets, consumed = split_packets(self._buffer)
+        except ValueError:
+            self.transport.close()
+            return
+        del self._buffer[:consumed]
+
+        # Forwarded messages are collected per subscriber and written once
+        outgoing: Dict["_BrokerSession", List[bytes]] = {}
+        for packet_type, flags, body in packets:
+            if packet_type == PUBLISH:
+                topic, payload, packet_id = parse_publish(flags, body)
+                # Delivered at QoS 0, so only QoS 0 packets can be forwarded unchanged
+                packet = encode_publish(topic, payload) if flags else encode_packet(PUBLISH, 0, body)
+                for session in self.broker._subscribers(topic):
+                    outgoing.setdefault(session, []).append(packet)
+                if packet_id is not None:
+                    self.transport.write(encode_packet(PUBACK, 0, struct.pack("!H", packet_id)))
+                self.broker.messages += 1
+            elif packet_type == CONNECT:
+                self.transport.write(encode_packet(CONNACK, 0, b"\x00\x00"))
+            elif packet_type == SUBSCRIBE:
+                packet_id = body[:2]
+                position, codes = 2, bytearray()
+                while position < len(body):
+                    length = struct.unpack_from("!H", body, position)[0]
+                    self.filters.add(body[position + 2:position + 2 + length].decode("utf-8"))
+                    position += 3 + length
+                    codes.append(0)
+                self.broker._routes.clear()
+                self.transport.write(encode_packet(SUBACK, 0, packet_id + bytes(codes)))
+            elif packet_type == PINGREQ:
+                self.transport.write(encode_packet(PINGRESP, 0, b""))
+            elif packet_type == DISCONNECT:
+                self.transport.close()
+
+        for session, packets_out in outgoing.items():
+            if not session.transport.is_closing():
+                session.transport.write(b"".join(packets_out))
+
+
+class StandInBroker:
+    """
+    Minimal MQTT broker for local testing (QoS 0 delivery, no retained
+    messages or authentication). Not meant for production sites.
+    """
+
+    def __init__(self):
+        self.messages = 0
+        self._sessions: Set[_BrokerSession] = set()
+        self._routes: Dict[str, List[_BrokerSession]] = {}  # Subscribers per topic
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 1883) -> int:
+        """
+        Start listening.
+
+        Args:
+            host: Interface to bind
+            port: Port (0 picks a free one)
+
+        Returns:
+            The port in use
+        """
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(self._session, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    def close(self):
+        """Stop the broker and drop every client."""
+        if self._server is not None:
+            self._server.close()
+        for session in list(self._sessions):
+            session.transport.close()
+
+    def _session(self) -> _BrokerSession:
+        session = _BrokerSession(self)
+        self._sessions.add(session)
+        return session
+
+    def _remove(self, session: _BrokerSession):
+        self._sessions.discard(session)
+        self._routes.clear()
+
+    def _subscribers(self, topic: str) -> List[_BrokerSession]:
+        sessions = self._routes.get(topic)
+        if sessions is None:
+            sessions = self._routes[topic] = [
+                session for session in self._sessions
+                if any(topic_matches(topic_filter, topic) for topic_filter in session.filters)
+            ]
+        return sessions
+
+
+def fleet_messages(fleet: FleetSimulator,
+                   topic_prefix: str = "site/racks",
+                   previous_faults: Optional[np.ndarray] = None) -> List[Tuple[str, bytes]]:
+    """
+    Turn a fleet's current readings into point messages, as a site controller
+    would publish them (used by the stand-in publisher).
+
+    Args:
+        fleet: Fleet to publish
+        topic_prefix: Topic prefix
+        previous_faults: Faults at the last publish; alarms are only sent for changed racks
+
+    Returns:
+        List of (topic, payload)
+    """
+    messages = []
+    formats = [f"{{:.{CHANNEL_DECIMALS[name]}f}}" for name in SENSOR_FIELDS]
+    for rack, row in enumerate(fleet.values.tolist()):
+        for name, fmt, value in zip(SENSOR_FIELDS, formats, row):
+            messages.append((f"{topic_prefix}/{rack}/{name}", fmt.format(value).encode()))
+
+    changed = range(len(fleet)) if previous_faults is None else np.flatnonzero(fleet.faults != previous_faults)
+    for rack in changed:
+        fault = FAULT_TYPES[fleet.faults[rack]]
+        messages.append((f"{topic_prefix}/{rack}/alarms", FAULT_ALARMS.get(fault, "").encode()))
+    return messages
@@ -0,0 +1,223 @@
+"""
+TelemetryState - Live readings from a real site, in the simulator's layout.
+Ingestion adapters (MQTT, Modbus TCP) decode whole batches of points into
+one NumPy array with a column per SENSOR_FIELDS entry, the same layout as
+FleetSimulator.values, so diagnostics treat real and simulated racks alike.
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Union
+import threading
+import time
+
+import numpy as np
+
+from simulator.fleet import FAULT_ALARMS, SENSOR_FIELDS
+
+if TYPE_CHECKING:
+    from telemetry.history import RollupStore
+
+
+# Alarm names in bit order (bit i of an alarm word means ALARM_NAMES[i])
+ALARM_NAMES = sorted(set(FAULT_ALARMS.values()))
+
+# Weight of the newest sample in the rate and lag estimates
+METRIC_SMOOTHING = 0.2
+
+# Column of each channel
+CHANNEL_COLUMNS = {name: index for index, name in enumerate(SENSOR_FIELDS)}
+
+
+def alarm_bits(alarms: Sequence[str]) -> int:
+    """Encode alarm names as a bit word (unknown names are ignored)."""
+    return sum(1 << ALARM_NAMES.index(name) for name in alarms if name in ALARM_NAMES)
+
+
+def alarm_names(bits: int) -> List[str]:
+    """Decode an alarm bit word into alarm names."""
+    return [name for index, name in enumerate(ALARM_NAMES) if bits >> index & 1]
+
+
+class SourceMetrics:
+    """
+    Rate and lag of one telemetry source.
+    Lag is the time from a point arriving (or its source timestamp, when the
+    payload carries one) until it is applied to the state.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.points = 0
+        self.messages = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.points_per_second = 0.0
+        self.lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.round_trip_seconds: Optional[float] = None  # Modbus poll time
+        self.last_batch: Optional[float] = None
+
+    def record_batch(self, points: int, messages: int, oldest: float, now: Optional[float] = None):
+        """
+        Account for one applied batch.
+
+        Args:
+            points: Readings applied
+            messages: Messages or responses they came in
+            oldest: Arrival time (time.monotonic) of the oldest point in the batch
+            now: Time the batch was applied
+        """
+        now = time.monotonic() if now is None else now
+        if self.last_batch is not None and now > self.last_batch:
+            rate = points / (now - self.last_batch)
+            self.points_per_second += METRIC_SMOOTHING * (rate - self.points_per_second)
+        lag = max(0.0, now - oldest)
+        self.lag_seconds += METRIC_SMOOTHING * (lag - self.lag_seconds)
+        self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        self.points += points
+        self.messages += messages
+        self.batches += 1
+        self.last_batch = now
+
+    def summary(self) -> Dict:
+        """
+        Get the metrics as a dictionary.
+
+        Returns:
+            Counts, smoothed rate and lag, and seconds since the last batch
+        """
+        return {
+            "source": self.name,
+            "points": self.points,
+            "messages": self.messages,
+            "batches": self.batches,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "points_per_second": round(self.points_per_second, 1),
+            "lag_ms": round(self.lag_seconds * 1000, 1),
+            "max_lag_ms": round(self.max_lag_seconds * 1000, 1),
+            "round_trip_ms": None if self.round_trip_seconds is None else round(self.round_trip_seconds * 1000, 1),
+            "idle_seconds": None if self.last_batch is None else round(time.monotonic() - self.last_batch, 1),
+        }
+
+
+class TelemetryState:
+    """
+    Latest readings per rack from any number of sources. Channels that have
+    not been reported yet are NaN and left out of get_states().
+    """
+
+    def __init__(self, num_racks: int, history: Optional["RollupStore"] = None):
+        """
+        Initialize an empty state.
+
+        Args:
+            num_racks: Racks at the site (points for other racks are dropped)
+            history: Rollup store every applied reading is also recorded in
+        """
+        if num_racks < 1:
+            raise ValueError("A site needs at least one rack")
+
+        self.num_racks = num_racks
+        self.values = np.full((num_racks, len(SENSOR_FIELDS)), np.nan)
+        self.alarms = np.zeros(num_racks, dtype=np.int64)
+        self.updated = np.zeros(num_racks)  # time.monotonic of each rack's last update
+        self.lock = threading.Lock()
+        self.history = history
+        self._changed = np.zeros(num_racks, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.num_racks
+
+    def apply(self,
+              racks: np.ndarray,
+              columns: np.ndarray,
+              values: np.ndarray,
+              received: Optional[float] = None) -> int:
+        """
+        Write a batch of readings in one array operation.
+
+        Args:
+            racks: Rack index per reading
+            columns: SENSOR_FIELDS column per reading
+            values: Readings
+            received: Arrival time of the batch
+
+        Returns:
+            Number of readings kept (those for unknown racks are dropped)
+        """
+        keep = (racks >= 0) & (racks < self.num_racks)
+        racks, columns, values = racks[keep], columns[keep], values[keep]
+        with self.lock:
+            self.values[racks, columns] = values
+            self.updated[racks] = time.monotonic() if received is None else received
+            self._changed[racks] = True
+        if self.history is not None:
+            self.history.record_points(racks, columns, values)
+        return len(racks)
+
+    def apply_rows(self,
+                   racks: np.ndarray,
+                   rows: np.ndarray,
+                   alarms: Optional[np.ndarray] = None,
+                   received: Optional[float] = None):
+        """
+        Replace whole racks' readings (e.g. from a register block).
+
+        Args:
+            racks: Rack indexes
+            rows: One row of SENSOR_FIELDS readings per rack
+            alarms: Alarm bit word per rack
+            received: Arrival time of the batch
+        """
+        with self.lock:
+            self.values[racks] = rows
+            if alarms is not None:
+                self.alarms[racks] = alarms
+            self.updated[racks] = time.monotonic() if received is None else received
+            self._changed[racks] = True
+        if self.history is not None:
+            self.history.record(rows, racks=racks)
+
+    def set_alarms(self, racks: np.ndarray, bits: np.ndarray):
+        """Set the alarm bit word of racks."""
+        keep = (racks >= 0) & (racks < self.num_racks)
+        with self.lock:
+            self.alarms[racks[keep]] = bits[keep]
+            self._changed[racks[keep]] = True
+
+    def take_changed(self) -> np.ndarray:
+        """
+        Get the racks updated since the last call, and reset the marks.
+
+        Returns:
+            Rack indexes
+        """
+        with self.lock:
+            racks = np.flatnonzero(self._changed)
+            self._changed[:] = False
+        return racks
+
+    def get_states(self, racks: Optional[Sequence[int]] = None) -> List[Dict[str, Union[float, List[str]]]]:
+        """
+        Get rack states in the format of FleetSimulator.get_states.
+
+        Args:
+            racks: Rack indexes (all racks if omitted)
+
+        Returns:
+            One state dictionary per rack, in order
+        """
+        rows = np.arange(self.num_racks) if racks is None else np.asarray(racks, dtype=np.intp)
+        with self.lock:
+            values = self.values[rows].tolist()
+            alarms = self.alarms[rows].tolist()
+
+        states = []
+        for readings, bits in zip(values, alarms):
+            state = {name: value for name, value in zip(SENSOR_FIELDS, readings) if value == value}
+            if "condenser_fan_speed" in state:
+                state["condenser_fan_speed"] = int(round(state["condenser_fan_speed"]))
+            state["alarms"] = alarm_names(bits)
+            states.append(state)
+        return states
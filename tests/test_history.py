@@ -0,0 +1,90 @@
+"""
+History tests - Range queries on RollupStore near the edges of what each ring holds.
+Run with: python -m pytest tests
+"""
+
+import numpy as np
+import pytest
+
+from telemetry.history import RollupStore
+
+
+# Fixed clock so bucket boundaries are predictable
+NOW = 1_700_000_000.0
+
+
+def _young_store(seconds: int = 600, num_racks: int = 2) -> RollupStore:
+    """Store fed one reading per second for the last `seconds` seconds (the 1 s ring never wraps)."""
+    store = RollupStore(num_racks)
+    rng = np.random.default_rng(7)
+    for offset in range(seconds, 0, -1):
+        store.record(rng.normal(size=(num_racks, len(store.channels))), NOW - offset)
+    return store
+
+
+def test_young_store_long_range_uses_level_that_fits_its_ring():
+    store = _young_store()
+    result = store.query(rack=0, start=NOW - 3600, end=NOW, max_points=5000)
+
+    # An hour of seconds is more than the 1 s ring holds, so a coarser level answers
+    assert result["resolution"] == 60
+    assert 0 < len(result["timestamps"]) <= 11
+    for series in result["series"].values():
+        assert len(series["mean"]) == len(result["timestamps"])
+
+
+def test_young_store_short_range_stays_at_seconds():
+    store = _young_store()
+    result = store.query(rack=1, start=NOW - 300, end=NOW, max_points=5000)
+
+    assert result["resolution"] == 1
+    assert len(result["timestamps"]) == 300
+    assert result["timestamps"][-1] < NOW
+
+
+def test_future_end_stops_at_newest_bucket():
+    store = _young_store()
+    result = store.query(start=NOW - 300, end=NOW + 500, max_points=5000)
+
+    assert result["resolution"] == 1
+    assert result["timestamps"][-1] == NOW - 1
+    for series in result["series"].values():
+        assert len(series["min"]) == len(result["timestamps"])
+
+
+def test_range_entirely_in_the_future_is_empty():
+    store = _young_store()
+    result = store.query(start=NOW + 60, end=NOW + 120)
+
+    assert result["timestamps"] == []
+    assert all(series["mean"] == [] for series in result["series"].values())
+
+
+def test_stale_end_before_retention_is_empty():
+    store = _young_store(seconds=60)
+    # Move the store on by more than every ring holds
+    store.record(np.zeros((2, len(store.channels))), NOW + 500 * 86400)
+    result = store.query(rack=0, start=NOW - 120, end=NOW)
+
+    assert result["timestamps"] == []
+
+
+def test_stale_end_within_coarse_retention_is_served():
+    store = _young_store(seconds=60)
+    # Seconds and minutes have wrapped past NOW, quarter hours still hold it
+    store.record(np.zeros((2, len(store.channels))), NOW + 2 * 86400)
+    result = store.query(rack=0, start=NOW - 120, end=NOW)
+
+    assert result["resolution"] == 900
+    assert len(result["timestamps"]) == 1
+
+
+def test_unwritten_store_is_empty():
+    store = RollupStore(1)
+
+    assert store.query(start=NOW - 3600, end=NOW)["timestamps"] == []
+
+
+def test_rack_outside_site_is_rejected():
+    with pytest.raises(ValueError):
+        RollupStore(2).query(rack=5)
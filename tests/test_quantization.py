@@ -0,0 +1,53 @@
+"""
+Quantization tests - Product quantizer training as a LocalVectorIndex grows and reloads.
+Run with: python -m pytest tests
+"""
+
+import numpy as np
+
+from embeddings.local_index import LocalVectorIndex
+
+
+# Embedding size of the synthetic vectors
+DIMENSIONS = 64
+
+
+def _add(index: LocalVectorIndex, rows: int, start: int, seed: int):
+    """Add rows random vectors with chunk ids start, start + 1, ..."""
+    vectors = np.random.default_rng(seed).normal(size=(rows, DIMENSIONS))
+    ids = [f"chunk-{row}" for row in range(start, start + rows)]
+    index.add(vectors, ids, [{"chunk_id": chunk_id} for chunk_id in ids])
+
+
+def test_small_first_batch_is_relearned_with_every_centroid():
+    index = LocalVectorIndex(storage="pq")
+    _add(index, 40, 0, seed=1)
+    assert index.quantizer.codebooks.shape[1] == 40
+
+    _add(index, 3000, 40, seed=2)
+    assert index.quantizer.codebooks.shape[1] == 256
+    assert len(index.quantizer.codes) == 3040
+
+
+def test_relearning_after_reload_is_not_capped_by_the_saved_codebooks(tmp_path):
+    index = LocalVectorIndex(storage="pq")
+    _add(index, 40, 0, seed=1)
+    index.save(tmp_path)
+
+    reloaded = LocalVectorIndex.load(tmp_path, storage="pq")
+    assert reloaded.quantizer.codebooks.shape[1] == 40
+    _add(reloaded, 3000, 40, seed=2)
+
+    assert reloaded.quantizer.codebooks.shape[1] == 256
+    assert len(reloaded.quantizer.codes) == 3040
+
+
+def test_reload_keeps_a_fully_trained_quantizer(tmp_path):
+    index = LocalVectorIndex(storage="pq")
+    _add(index, 600, 0, seed=3)
+    index.save(tmp_path)
+
+    reloaded = LocalVectorIndex.load(tmp_path, storage="pq")
+
+    assert np.array_equal(reloaded.quantizer.codebooks, index.quantizer.codebooks)
+    assert np.array_equal(reloaded.quantizer.codes, index.quantizer.codes)
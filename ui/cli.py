@@ -4,10 +4,15 @@ Provides an interactive way to simulate faults and get AI-powered diagnoses.
 """
 
 from typing import Dict, List, Optional, Union
+import time
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.table import Table
-from rich.prompt import Prompt, Confirm
+from rich.text import Text
+from rich.prompt import Prompt, IntPrompt, Confirm
+
+from diagnostics.escalation import EscalationDecision, EscalationPolicy
 
 
 class SimulatorCLI:
@@ -16,7 +21,7 @@ class SimulatorCLI:
     Provides a user-friendly way to simulate faults and view diagnoses.
     """
 
-    def __init__(self, simulator, diagnostics, llm):
+    def __init__(self, simulator, diagnostics, llm, escalation: Optional[EscalationPolicy] = None):
         """
         Initialize the CLI with required components.
         
@@ -24,10 +29,16 @@ class SimulatorCLI:
             simulator: RackSimulator instance
             diagnostics: DiagnosticsEngine instance
             llm: LLMInterface instance
+            escalation: Policy deciding when a diagnosis goes to the LLM
+                (defaults to one for the LLM's provider)
         """
         self.simulator = simulator
         self.diagnostics = diagnostics
         self.llm = llm
+        self.escalation = escalation or EscalationPolicy(
+            provider=llm.provider,
+            normal_ranges=simulator.normal_ranges
+        )
         self.console = Console()
 
     def run(self):
@@ -40,7 +51,7 @@ class SimulatorCLI:
 
         while True:
             self._show_menu()
-            choice = Prompt.ask("Select an option", choices=["1", "2", "3", "q"])
+            choice = Prompt.ask("Select an option", choices=["1", "2", "3", "4", "q"])
             
             if choice == "q":
                 break
@@ -50,6 +61,8 @@ class SimulatorCLI:
                 self._show_current_state()
             elif choice == "3":
                 self._get_diagnosis()
+            elif choice == "4":
+                self._show_dashboard()
 
     def _show_menu(self):
         """Display the main menu options."""
@@ -57,6 +70,7 @@ class SimulatorCLI:
         self.console.print("1. Simulate Fault")
         self.console.print("2. Show Current State")
         self.console.print("3. Get Diagnosis")
+        self.console.print("4. Live Dashboard")
         self.console.print("q. Quit")
 
     def _simulate_fault(self):
@@ -99,6 +113,24 @@ class SimulatorCLI:
             for alarm in state["alarms"]:
                 self.console.print(f"• {alarm}")
 
+    def _show_dashboard(self):
+        """Run the live dashboard for this rack, or for a simulated fleet."""
+        # Imported here so NumPy is only loaded when the dashboard is used
+        from simulator.fleet import FleetSimulator
+        from ui.dashboard import FleetDashboard
+
+        racks = IntPrompt.ask("Number of racks", default=1)
+        while racks < 1:
+            self.console.print("[red]Enter at least one rack.[/red]")
+            racks = IntPrompt.ask("Number of racks", default=1)
+
+        fleet = FleetSimulator(racks)
+        # Rack 0 continues from the current simulator state
+        fleet.set_state(0, self.simulator.get_current_state(), self.simulator.fault_type)
+        fault_rate = 0.0005 if racks > 1 else 0.0
+
+        FleetDashboard(fleet, self.diagnostics, console=self.console, fault_rate=fault_rate).run()
+
     def _get_diagnosis(self):
         """Get AI-powered diagnosis for current state."""
         state = self.simulator.get_current_state()
@@ -132,24 +164,48 @@ class SimulatorCLI:
             for ref in result.source_references:
                 self.console.print(f"• {ref}")
         
-        # Ask if user wants to get LLM analysis
-        if Confirm.ask("\nWould you like AI analysis of this diagnosis?"):
-            self._get_llm_analysis(state, result)
+        # Only offer LLM analysis when the rule result needs a second opinion
+        manual_context = self._get_manual_context(state, result)
+        decision = self.escalation.decide(
+            state, result, cached=self.llm.has_cached_response(state, manual_context)
+        )
+        if not decision.escalate:
+            self.console.print(f"\n[dim]AI analysis not needed: {decision.reason}[/dim]")
+            return
+        
+        self.console.print(f"\n[dim]AI analysis suggested: {decision.reason}[/dim]")
+        if Confirm.ask("Would you like AI analysis of this diagnosis?", default=True):
+            self._get_llm_analysis(state, result, manual_context, decision)
 
-    def _get_llm_analysis(self, state: Dict, diagnosis_result):
-        """Get additional analysis from LLM."""
+    def _get_manual_context(self, state: Dict, diagnosis_result) -> List[str]:
+        """Manual sections to send with an LLM request."""
         # TODO: Implement vector search to get relevant manual sections
-        manual_context = ["Sample manual section 1", "Sample manual section 2"]
-        
+        return ["Sample manual section 1", "Sample manual section 2"]
+
+    def _get_llm_analysis(self, state: Dict, diagnosis_result, manual_context: List[str],
+                          decision: Optional[EscalationDecision] = None):
+        """Get additional analysis from LLM, charging the escalation budget for the call."""
+        if decision is not None:
+            self.escalation.commit(decision)
+        started = time.perf_counter()
         try:
-            llm_response = self.llm.ask_llm(state, manual_context)
+            # Stream the answer into the panel as it is generated
+            stream = self.llm.ask_llm_stream(state, manual_context)
             
             self.console.print("\n[bold]AI Analysis:[/bold]")
-            self.console.print(Panel(
-                llm_response.text,
-                title="LLM Response"
-            ))
+            text = ""
+            with Live(
+                Panel("[dim]Waiting for response...[/dim]", title="LLM Response"),
+                console=self.console,
+                refresh_per_second=15
+            ) as live:
+                for delta in stream:
+                    text += delta
+                    live.update(Panel(Text(text), title="LLM Response"))
             
+            llm_response = stream.response
+            if not stream.from_cache:
+                self.escalation.record_latency(time.perf_counter() - started)
             if llm_response.source_references:
                 self.console.print("\n[bold]Additional References:[/bold]")
                 for ref in llm_response.source_references:
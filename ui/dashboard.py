@@ -0,0 +1,348 @@
+"""
+FleetDashboard - Live terminal dashboard for a running rack or fleet simulation.
+The simulation runs on its own thread at a fixed step rate and publishes
+snapshots; the screen redraws from the latest snapshot at a capped frame
+rate, re-formatting only the cells whose displayed value changed.
+"""
+
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass
+import os
+import queue
+import select
+import sys
+import threading
+import time
+
+import numpy as np
+from rich.console import Console, Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+from simulator.fleet import FAULT_ALARMS, FAULT_TYPES, SENSOR_FIELDS, FleetSimulator
+from simulator.telemetry_stream import CHANNEL_DECIMALS, quantize
+
+
+# Screen redraws per second (upper bound; unchanged frames are skipped)
+DASHBOARD_FPS = 4
+
+# Simulation steps per second
+SIMULATION_HZ = 10
+
+# Racks listed in the table (racks with alarms first)
+MAX_VISIBLE_RACKS = 15
+
+# Samples kept for each sparkline, and the channel they show
+TREND_LENGTH = 30
+TREND_CHANNEL = "suction_pressure_psig"
+
+# Characters for sparkline levels, lowest first
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+# Table columns: channel and header
+COLUMNS = [
+    ("suction_pressure_psig", "Suction psig"),
+    ("discharge_pressure_psig", "Disch psig"),
+    ("discharge_temp_f", "Disch °F"),
+    ("superheat_f", "SH °F"),
+    ("subcooling_f", "SC °F"),
+    ("compressor_amps", "Amps"),
+    ("condenser_fan_speed", "Fan %"),
+]
+
+# Keys that inject a fault into the selected rack
+FAULT_KEYS = {
+    "1": "low_charge",
+    "2": "high_discharge_temp",
+    "3": "low_suction_pressure",
+}
+
+HELP_TEXT = "1-3 inject fault · c clear · n/p select rack · r random fault · q quit"
+
+_COLUMN_INDEX = {name: SENSOR_FIELDS.index(name) for name, _ in COLUMNS}
+_TREND_INDEX = SENSOR_FIELDS.index(TREND_CHANNEL)
+
+
+@dataclass
+class Snapshot:
+    """What the simulation thread publishes after each step."""
+    step: int
+    racks: np.ndarray  # Visible rack indexes
+    quantized: np.ndarray  # Display-precision readings of the visible racks
+    faults: np.ndarray  # Fault codes of the visible racks
+    trends: np.ndarray  # TREND_LENGTH recent TREND_CHANNEL values per visible rack
+    fault_counts: Dict[str, int]
+    selected: int
+    selected_state: Dict
+    diagnosis: object  # DiagnosticResult for the selected rack
+
+
+def sparkline(values: np.ndarray) -> str:
+    """
+    Render values as a one-line sparkline.
+
+    Args:
+        values: Samples, oldest first
+
+    Returns:
+        String of block characters
+    """
+    low, high = float(values.min()), float(values.max())
+    span = high - low or 1.0
+    levels = ((values - low) / span * (len(SPARK_BLOCKS) - 1)).astype(int)
+    return "".join(SPARK_BLOCKS[level] for level in levels)
+
+
+class FleetDashboard:
+    """
+    Rich Live view of a FleetSimulator: readings table, alarms, sparklines
+    and the selected rack's latest diagnosis, with single-key fault injection.
+    """
+
+    def __init__(self,
+                 fleet: FleetSimulator,
+                 diagnostics,
+                 console: Optional[Console] = None,
+                 fps: float = DASHBOARD_FPS,
+                 simulation_hz: float = SIMULATION_HZ,
+                 fault_rate: float = 0.0):
+        """
+        Initialize the dashboard.
+
+        Args:
+            fleet: Fleet to simulate and show (one rack for the single-rack view)
+            diagnostics: DiagnosticsEngine instance
+            console: Console to draw on
+            fps: Maximum redraws per second
+            simulation_hz: Simulation steps per second
+            fault_rate: Chance per rack and step of a new random fault
+        """
+        self.fleet = fleet
+        self.diagnostics = diagnostics
+        self.console = console or Console()
+        self.fps = fps
+        self.simulation_hz = simulation_hz
+        self.fault_rate = fault_rate
+        self.selected = int(np.flatnonzero(fleet.faults)[0]) if fleet.faults.any() else 0
+        self.stats = {"steps": 0, "late_steps": 0, "frames": 0, "frames_skipped": 0, "cells_formatted": 0}
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._keys: "queue.Queue[str]" = queue.Queue()
+        self._snapshot: Optional[Snapshot] = None
+        self._history = np.repeat(fleet.values[:, _TREND_INDEX][None, :], TREND_LENGTH, axis=0)
+        self._history_position = 0
+
+        # Formatted cells from earlier frames, keyed by (rack, channel)
+        self._shown: Dict[Tuple[int, str], int] = {}
+        self._cells: Dict[Tuple[int, str], Text] = {}
+
+    def run(self, duration: Optional[float] = None):
+        """
+        Show the dashboard until q is pressed (or duration seconds pass).
+
+        Args:
+            duration: Stop automatically after this many seconds
+        """
+        simulation = threading.Thread(target=self._simulate, name="dashboard-simulation", daemon=True)
+        keys = threading.Thread(target=self._read_keys, name="dashboard-keys", daemon=True)
+        simulation.start()
+        keys.start()
+
+        started = time.monotonic()
+        frame_interval = 1.0 / self.fps
+        rendered_step = -1
+        try:
+            with Live(console=self.console, auto_refresh=False, transient=False) as live:
+                while not self._stop.is_set():
+                    frame_started = time.monotonic()
+                    self._handle_keys()
+
+                    snapshot = self._snapshot
+                    if snapshot is not None and snapshot.step != rendered_step:
+                        live.update(self._render(snapshot), refresh=True)
+                        rendered_step = snapshot.step
+                        self.stats["frames"] += 1
+                    else:
+                        self.stats["frames_skipped"] += 1
+
+                    if duration is not None and time.monotonic() - started >= duration:
+                        break
+                    time.sleep(max(0.0, frame_interval - (time.monotonic() - frame_started)))
+        finally:
+            self._stop.set()
+            simulation.join()
+            # Give the key reader time to restore the terminal mode
+            keys.join(timeout=0.5)
+
+    def _simulate(self):
+        """Fixed-rate simulation loop; never waits for the screen."""
+        period = 1.0 / self.simulation_hz
+        next_step = time.monotonic()
+        while not self._stop.is_set():
+            with self._lock:
+                self.fleet.step(1, self.fault_rate)
+                self._history[self._history_position % TREND_LENGTH] = self.fleet.values[:, _TREND_INDEX]
+                self._history_position += 1
+                snapshot = self._take_snapshot()
+            snapshot.diagnosis = self.diagnostics.diagnose(snapshot.selected_state)
+            self._snapshot = snapshot
+            self.stats["steps"] += 1
+
+            next_step += period
+            delay = next_step - time.monotonic()
+            if delay < 0:
+                self.stats["late_steps"] += 1
+                next_step = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def _take_snapshot(self) -> Snapshot:
+        """Copy what the screen needs (called with the lock held)."""
+        faulted = np.flatnonzero(self.fleet.faults)
+        healthy = np.flatnonzero(self.fleet.faults == 0)
+        racks = np.concatenate([faulted, healthy])[:MAX_VISIBLE_RACKS]
+        if self.selected not in racks:
+            racks[-1] = self.selected
+
+        # Oldest sample first
+        order = (np.arange(TREND_LENGTH) + self._history_position) % TREND_LENGTH
+        return Snapshot(
+            step=self.fleet.step_count,
+            racks=racks,
+            quantized=quantize(self.fleet.values[racks]),
+            faults=self.fleet.faults[racks].copy(),
+            trends=self._history[order][:, racks].T.copy(),
+            fault_counts=self.fleet.summary(),
+            selected=self.selected,
+            selected_state=self.fleet.get_state(self.selected),
+            diagnosis=None
+        )
+
+    def _cell(self, rack: int, channel: str, quantized: int) -> Text:
+        """Formatted cell, re-created only when the displayed value changes."""
+        key = (rack, channel)
+        if self._shown.get(key) != quantized:
+            decimals = CHANNEL_DECIMALS[channel]
+            low, high = self.fleet.normal_ranges[channel]
+            value = quantized / 10 ** decimals
+            style = "red" if not low <= value <= high else ""
+            self._cells[key] = Text(f"{value:.{decimals}f}", style=style)
+            self._shown[key] = quantized
+            self.stats["cells_formatted"] += 1
+        return self._cells[key]
+
+    def _render(self, snapshot: Snapshot) -> Group:
+        """Build the screen from a snapshot."""
+        table = Table(title=f"Fleet — step {snapshot.step}", expand=True)
+        table.add_column("Rack", justify="right")
+        for _, header in COLUMNS:
+            table.add_column(header, justify="right")
+        table.add_column(f"{TREND_CHANNEL.split('_')[0].title()} trend")
+        table.add_column("Alarms", style="bold red")
+
+        for row, rack in enumerate(snapshot.racks.tolist()):
+            cells = [
+                self._cell(rack, channel, int(snapshot.quantized[row, _COLUMN_INDEX[channel]]))
+                for channel, _ in COLUMNS
+            ]
+            fault = FAULT_TYPES[snapshot.faults[row]]
+            marker = "▶ " if rack == snapshot.selected else ""
+            table.add_row(
+                f"{marker}{rack}", *cells,
+                sparkline(snapshot.trends[row]),
+                FAULT_ALARMS.get(fault, "")
+            )
+
+        counts = ", ".join(f"{name}: {count}" for name, count in snapshot.fault_counts.items())
+        result = snapshot.diagnosis
+        diagnosis = Text()
+        diagnosis.append(f"Rack {snapshot.selected}: ", style="bold")
+        diagnosis.append(f"{result.diagnosis} (confidence {result.confidence:.2f})\n")
+        for warning in result.safety_warnings:
+            diagnosis.append(f"⚠ {warning}\n", style="red")
+        if result.next_steps:
+            diagnosis.append("Next: " + "; ".join(result.next_steps[:2]), style="dim")
+
+        status = (
+            f"{len(self.fleet)} racks · {counts} · "
+            f"sim {self.stats['steps']} steps ({self.stats['late_steps']} late) · {HELP_TEXT}"
+        )
+        return Group(table, Panel(diagnosis, title="Latest Diagnosis"), Text(status, style="dim"))
+
+    def _handle_keys(self):
+        """Apply queued key presses."""
+        while True:
+            try:
+                key = self._keys.get_nowait()
+            except queue.Empty:
+                return
+            if key == "q":
+                self._stop.set()
+                return
+
+            with self._lock:
+                if key in FAULT_KEYS:
+                    self.fleet.simulate_fault(self.selected, FAULT_KEYS[key])
+                elif key == "c":
+                    self.fleet.clear_faults(self.selected)
+                elif key in ("n", "p"):
+                    self.selected = (self.selected + (1 if key == "n" else -1)) % len(self.fleet)
+                elif key == "r":
+                    rack = int(np.random.randint(len(self.fleet)))
+                    self.fleet.simulate_fault(rack, FAULT_KEYS[str(np.random.randint(1, 4))])
+
+    def _read_keys(self):
+        """
+        Read single key presses until the dashboard stops (line input when
+        stdin is not a terminal). Terminal keys are polled, so the reader ends
+        with the dashboard instead of taking the next menu's input.
+        """
+        stream = sys.stdin
+        if stream is None:
+            return
+        if not stream.isatty():
+            self._read_key_lines(stream)
+            return
+
+        try:
+            import termios
+            import tty
+        except ImportError:
+            self._read_console_keys()
+            return
+
+        descriptor = stream.fileno()
+        saved = termios.tcgetattr(descriptor)
+        try:
+            tty.setcbreak(descriptor)
+            while not self._stop.is_set():
+                ready, _, _ = select.select([descriptor], [], [], 0.1)
+                if ready:
+                    self._keys.put(os.read(descriptor, 1).decode("utf-8", "ignore").lower())
+        finally:
+            termios.tcsetattr(descriptor, termios.TCSADRAIN, saved)
+
+    def _read_key_lines(self, stream):
+        """Take the first character of each input line, stopping at q so later lines are left unread."""
+        while not self._stop.is_set():
+            line = stream.readline()
+            if not line:
+                return
+            key = line.strip()[:1].lower()
+            if key:
+                self._keys.put(key)
+            if key == "q":
+                return
+
+    def _read_console_keys(self):
+        """Poll the Windows console for key presses until the dashboard stops."""
+        import msvcrt
+
+        while not self._stop.is_set():
+            if msvcrt.kbhit():
+                self._keys.put(msvcrt.getwch().lower())
+            else:
+                self._stop.wait(0.05)
@@ -0,0 +1,63 @@
+"""
+RateLimiter - Token-bucket rate limiting for calls to remote services.
+Used to keep batched embedding and LLM requests under provider limits.
+"""
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for asyncio code.
+    Allows short bursts up to `capacity` calls, then refills at `rate` calls per second.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Initialize the bucket full.
+
+        Args:
+            rate: Tokens added per second (sustained calls per second)
+            capacity: Maximum burst size (defaults to one second of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None  # Created lazily inside the running event loop
+        self._lock_loop = None
+
+    def _refill(self):
+        """Add tokens for the time elapsed since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """
+        Wait until enough tokens are available, then take them.
+
+        Args:
+            tokens: Tokens this call costs (e.g. 1 per request)
+        """
+        # asyncio locks belong to one event loop; a bucket shared across
+        # asyncio.run() calls needs a fresh lock for each loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+
+        # A call larger than the bucket could never be served; cap it at a full bucket
+        tokens = min(tokens, self.capacity)
+
+        # Callers queue on the lock so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
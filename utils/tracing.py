@@ -0,0 +1,396 @@
+"""
+Tracing - Timing spans and metrics for simulate -> diagnose -> retrieve -> LLM.
+Spans feed a latency histogram per stage; counters and value histograms
+record cache hits, tokens and bytes. Everything exports as Prometheus text
+or JSON, and the most recent traces are kept as span trees.
+
+Tracing is off unless RACK_TRACING=1 is set or enable() is called. While
+off, methods decorated with @traced are the plain undecorated functions
+(enable() swaps the timing wrappers in), span() hands back one shared no-op
+object and count()/observe() return after a single flag check.
+"""
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+
+# Histogram bucket bounds for span durations, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Histogram bucket bounds for sizes (tokens, bytes, items)
+SIZE_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "refrigeration_"
+
+# Finished root spans (with their children) kept for inspection
+RECENT_TRACES = 100
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Settings:
+    enabled = os.getenv("RACK_TRACING", "").lower() in ("1", "true", "yes")
+
+
+# (class, attribute, plain function, timing wrapper) for every @traced method
+_traced_methods: List[Tuple[type, str, Callable, Callable]] = []
+
+# Span the current code runs inside (per thread and per asyncio task)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Histogram:
+    """Bucketed distribution with a running sum and count (Prometheus semantics)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, histograms and recent traces."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[_LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[_LabelKey, Histogram]] = {}
+        self.traces: Deque[Dict] = deque(maxlen=RECENT_TRACES)
+
+    def inc(self, name: str, value: float, labels: _LabelKey):
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name: str, value: float, labels: _LabelKey, buckets: Sequence[float]):
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_trace(self, trace: Dict):
+        with self._lock:
+            self.traces.append(trace)
+
+    def reset(self):
+        """Drop every metric and trace."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.traces.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Export in the Prometheus text exposition format.
+
+        Returns:
+            Metric families with HELP-less TYPE lines, one sample per line
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = METRIC_PREFIX + name
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {_format_number(value)}")
+
+            for name, series in sorted(self.histograms.items()):
+                metric = METRIC_PREFIX + name
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else _format_number(bound)
+                        lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {_format_number(histogram.sum)}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self, include_traces: bool = False) -> Dict:
+        """
+        Export as plain data.
+
+        Args:
+            include_traces: Also return the recent span trees
+
+        Returns:
+            {"counters": [...], "histograms": [...]} with labels, values and
+            count/sum/mean/p50/p95 per histogram series
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for name, series in sorted(self.counters.items())
+                for labels, value in sorted(series.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else None,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                }
+                for name, series in sorted(self.histograms.items())
+                for labels, histogram in sorted(series.items())
+            ]
+            result = {"enabled": _Settings.enabled, "counters": counters, "histograms": histograms}
+            if include_traces:
+                result["traces"] = list(self.traces)
+        return result
+
+
+def _format_labels(labels: _LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
+
+
+class Span:
+    """
+    One timed stage. Nested spans become children of the enclosing span;
+    a finished root span is stored as a trace.
+    """
+
+    __slots__ = ("name", "labels", "attributes", "children", "started", "duration", "error", "_token")
+
+    def __init__(self, name: str, labels: Dict[str, Any]):
+        self.name = name
+        self.labels = labels
+        self.attributes: Dict[str, Any] = {}
+        self.children: List["Span"] = []
+        self.started = 0.0
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, **attributes):
+        """Attach details to the span (e.g. cache_hit=True); they appear in traces."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        if parent is not None:
+            parent.children.append(self)
+        self._token = _current_span.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self.started
+        _current_span.reset(self._token)
+        labels = _label_key({"span": self.name, **self.labels})
+        metrics.observe("span_duration_seconds", self.duration, labels, LATENCY_BUCKETS)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+            metrics.inc("span_errors_total", 1, labels)
+        if _current_span.get() is None:
+            metrics.add_trace(self.to_dict())
+        return False
+
+    def to_dict(self) -> Dict:
+        """The span and its children as nested dictionaries (milliseconds)."""
+        result = {"name": self.name, "ms": round(self.duration * 1000, 3)}
+        if self.labels:
+            result["labels"] = {name: str(value) for name, value in self.labels.items()}
+        if self.attributes:
+            result["attributes"] = self.attributes
+        if self.error:
+            result["error"] = self.error
+        if self.children:
+            result["children"] = [child.to_dict() for child in self.children]
+        return result
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def enabled() -> bool:
+    """Whether tracing is on."""
+    return _Settings.enabled
+
+
+def enable():
+    """Turn tracing on for this process."""
+    _Settings.enabled = True
+    for owner, name, _, wrapper in _traced_methods:
+        setattr(owner, name, wrapper)
+
+
+def disable():
+    """Turn tracing off (collected metrics are kept)."""
+    _Settings.enabled = False
+    for owner, name, function, _ in _traced_methods:
+        setattr(owner, name, function)
+
+
+def span(name: str, **labels):
+    """
+    Time a block of code.
+
+    Args:
+        name: Stage name, e.g. "retrieval.search_manuals"
+        **labels: Low-cardinality labels (e.g. provider="gemini")
+
+    Returns:
+        Context manager; use span.set(...) inside to attach details
+    """
+    if not _Settings.enabled:
+        return _NOOP_SPAN
+    return Span(name, labels)
+
+
+class _TracedMethod:
+    """
+    What @traced returns for a method: when the class is created it installs
+    either the plain function or the timing wrapper, and registers both so
+    enable()/disable() can switch them.
+    """
+
+    def __init__(self, function: Callable, wrapper: Callable):
+        self.function = function
+        self.wrapper = wrapper
+
+    def __set_name__(self, owner: type, name: str):
+        _traced_methods.append((owner, name, self.function, self.wrapper))
+        setattr(owner, name, self.wrapper if _Settings.enabled else self.function)
+
+    def __call__(self, *args, **kwargs):
+        # Only reached if the decorated function is not a class attribute
+        return self.wrapper(*args, **kwargs)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator that wraps every call of a function (sync or async) in a span.
+    On methods it costs nothing while tracing is off; plain functions keep
+    a wrapper that checks the flag.
+
+    Args:
+        name: Stage name for the span
+    """
+    def decorate(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                if not _Settings.enabled:
+                    return await function(*args, **kwargs)
+                with Span(name, {}):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not _Settings.enabled:
+                    return function(*args, **kwargs)
+                with Span(name, {}):
+                    return function(*args, **kwargs)
+
+        # Methods have a qualified name like "Class.method"; module functions do not
+        if "." in function.__qualname__.replace("<locals>.", ""):
+            return _TracedMethod(function, wrapper)
+        return wrapper
+    return decorate
+
+
+def current_span():
+    """The active span (a no-op stand-in when tracing is off or outside any span)."""
+    if not _Settings.enabled:
+        return _NOOP_SPAN
+    return _current_span.get() or _NOOP_SPAN
+
+
+def count(name: str, value: float = 1, **labels):
+    """
+    Add to a counter, e.g. count("llm_cache_hits_total", provider="local").
+
+    Args:
+        name: Counter name (conventionally ending in _total)
+        value: Amount to add
+        **labels: Low-cardinality labels
+    """
+    if _Settings.enabled:
+        metrics.inc(name, value, _label_key(labels))
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = SIZE_BUCKETS, **labels):
+    """
+    Record a value in a histogram, e.g. prompt tokens or payload bytes.
+
+    Args:
+        name: Histogram name
+        value: Observed value
+        buckets: Bucket upper bounds
+        **labels: Low-cardinality labels
+    """
+    if _Settings.enabled:
+        metrics.observe(name, value, _label_key(labels), buckets)
+
+
+def export_prometheus() -> str:
+    """All metrics in the Prometheus text format."""
+    return metrics.to_prometheus()
+
+
+def export_json(include_traces: bool = False) -> str:
+    """All metrics (and optionally recent traces) as JSON."""
+    return json.dumps(metrics.to_dict(include_traces), indent=2)